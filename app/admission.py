@@ -0,0 +1,207 @@
+"""
+Admission control for the apply flow.
+
+In the last hour before an application_deadline, apply requests (uploads,
+autosaves, submits - all writes, SQLite takes one writer at a time) can fill
+every gthread thread of a worker, and reviewer / committee / admin pages wait
+behind them. Two limits keep them in their lane:
+
+  - a gate per endpoint group: at most ADMISSION_APPLY_CONCURRENCY requests
+    run at once, at most ADMISSION_APPLY_QUEUE more wait (first come, first
+    served) for up to ADMISSION_QUEUE_TIMEOUT seconds. Anything beyond that
+    is answered at once with 503, Retry-After and its queue position. With
+    the defaults (a quarter of WEB_THREADS each) half the threads of a
+    worker always stay free for the other roles.
+  - a token bucket per student: ADMISSION_USER_RATE requests per second,
+    bursts of ADMISSION_USER_BURST (a 30 MB resumable upload is 30 chunks).
+    Beyond that: 429 with Retry-After.
+
+Only writes are limited (GET / HEAD pass: the form itself and tus offset
+checks are cheap). Like app.metrics, the limits are per worker process.
+The apply page's autosave and uploads retry 503 / 429 on their own after
+Retry-After. A refused classic form post is redirected back to the form
+with a flash message (the refused post itself was not saved).
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+
+from flask import current_app, flash, g, jsonify, redirect, request, url_for
+from flask_login import current_user
+
+
+# gate name -> endpoints it admits
+APPLY_ENDPOINTS = (
+    "student.apply",
+    "student.patch_application_draft",
+    "student.upload_draft_document",
+    "student.create_resumable_upload",
+    "student.resumable_upload",
+    "student.submit_application_draft",
+)
+LIMITED_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+# endpoints posted by plain HTML forms (the rest are fetch() calls)
+FORM_ENDPOINTS = ("student.apply", "student.submit_application_draft")
+FORM_MIMETYPES = ("application/x-www-form-urlencoded", "multipart/form-data")
+MAX_BUCKETS = 10000
+
+
+class Gate:
+    """At most `limit` requests at once, a FIFO queue of at most `queue_size` waiting."""
+
+    def __init__(self, name, limit, queue_size):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = deque()
+        self._avg_seconds = 1.0   # moving average of the time a slot is held
+
+    def acquire(self, timeout):
+        """(True, 0) once admitted, else (False, queue position)."""
+        with self._cond:
+            if self._active < self.limit and not self._waiting:
+                self._active += 1
+                return True, 0
+            if len(self._waiting) >= self.queue_size:
+                return False, len(self._waiting) + 1
+
+            ticket = object()
+            self._waiting.append(ticket)
+            admitted = self._cond.wait_for(
+                lambda: self._waiting[0] is ticket and self._active < self.limit, timeout
+            )
+            if admitted:
+                self._waiting.popleft()
+                self._active += 1
+                self._cond.notify_all()
+                return True, 0
+
+            position = self._waiting.index(ticket) + 1
+            self._waiting.remove(ticket)
+            self._cond.notify_all()
+            return False, position
+
+    def release(self, held_seconds):
+        with self._cond:
+            self._active -= 1
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * held_seconds
+            self._cond.notify_all()
+
+    def retry_after(self, position) -> int:
+        return max(1, math.ceil(self._avg_seconds * position / self.limit))
+
+
+class TokenBuckets:
+    """One token bucket per key: `rate` tokens per second, at most `burst`."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._buckets = {}   # key -> (tokens, updated)
+
+    def take(self, key):
+        """0 when a token was taken, else the seconds until the next one."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / self.rate
+            self._buckets[key] = (tokens - 1, now)
+
+            if len(self._buckets) > MAX_BUCKETS:
+                # forget idle students (their bucket would be full again anyway)
+                idle = now - self.burst / self.rate
+                self._buckets = {k: v for k, v in self._buckets.items() if v[1] > idle}
+            return 0
+
+
+# =========================
+# REQUEST HOOKS
+# =========================
+def _refuse(status, message, retry_after, position=None):
+    headers = {"Retry-After": str(retry_after)}
+    if position is not None:
+        headers["X-Queue-Position"] = str(position)
+
+    if request.endpoint in FORM_ENDPOINTS and request.mimetype in FORM_MIMETYPES:
+        # classic form post (no JavaScript): nothing of it reached the view,
+        # so say so and send the student back to the form
+        if request.endpoint == "student.submit_application_draft":
+            flash(f"{message} Your saved draft is kept; please submit again in {retry_after} seconds.", "warning")
+        else:
+            flash(f"{message} This submission was NOT saved; please submit the form again "
+                  f"in {retry_after} seconds.", "warning")
+        return redirect(url_for("student.apply", scholarship_id=request.view_args["scholarship_id"]))
+
+    message = f"{message} Please retry in {retry_after} seconds."
+    if request.is_json or request.accept_mimetypes.best == "application/json":
+        body = jsonify(error=message, retry_after=retry_after, queue_position=position)
+    else:
+        body = current_app.response_class(message + "\n", mimetype="text/plain")
+    return body, status, headers
+
+
+def _admit():
+    if request.method not in LIMITED_METHODS:
+        return None
+    gate = current_app.extensions["admission_gates"].get(request.endpoint)
+    if gate is None:
+        return None
+
+    if current_user.is_authenticated:
+        wait = current_app.extensions["admission_buckets"].take(current_user.id)
+        if wait:
+            retry_after = max(1, math.ceil(wait))
+            return _refuse(429, "Too many requests.", retry_after)
+
+    admitted, position = gate.acquire(current_app.config["ADMISSION_QUEUE_TIMEOUT"])
+    if not admitted:
+        retry_after = gate.retry_after(position)
+        return _refuse(
+            503,
+            f"Many applications are being submitted right now (you are number {position} in the queue).",
+            retry_after, position,
+        )
+
+    g.admission_gate = gate
+    g.admission_start = time.perf_counter()
+    return None
+
+
+def _release(exc=None):
+    gate = g.pop("admission_gate", None)
+    if gate is not None:
+        gate.release(time.perf_counter() - g.pop("admission_start"))
+
+
+def init_admission(app) -> None:
+    threads = int(os.environ.get("WEB_THREADS", 4))
+    app.config.setdefault("ADMISSION_ENABLED", os.environ.get("ADMISSION_ENABLED", "1") == "1")
+    app.config.setdefault(
+        "ADMISSION_APPLY_CONCURRENCY", int(os.environ.get("ADMISSION_APPLY_CONCURRENCY", max(1, threads // 4)))
+    )
+    app.config.setdefault(
+        "ADMISSION_APPLY_QUEUE", int(os.environ.get("ADMISSION_APPLY_QUEUE", max(1, threads // 4)))
+    )
+    app.config.setdefault("ADMISSION_QUEUE_TIMEOUT", float(os.environ.get("ADMISSION_QUEUE_TIMEOUT", 5)))
+    app.config.setdefault("ADMISSION_USER_RATE", float(os.environ.get("ADMISSION_USER_RATE", 5)))
+    app.config.setdefault("ADMISSION_USER_BURST", int(os.environ.get("ADMISSION_USER_BURST", 40)))
+
+    if not app.config["ADMISSION_ENABLED"]:
+        return
+
+    apply_gate = Gate("apply", app.config["ADMISSION_APPLY_CONCURRENCY"], app.config["ADMISSION_APPLY_QUEUE"])
+    app.extensions["admission_gates"] = {endpoint: apply_gate for endpoint in APPLY_ENDPOINTS}
+    app.extensions["admission_buckets"] = TokenBuckets(
+        app.config["ADMISSION_USER_RATE"], app.config["ADMISSION_USER_BURST"]
+    )
+
+    app.before_request(_admit)
+    app.teardown_request(_release)
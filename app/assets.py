@@ -0,0 +1,234 @@
+"""
+Fingerprinted, precompressed static assets.
+
+`flask build-assets` copies every file under static/ (except uploads/ and
+the output folder itself) to static/dist/ under a content-hashed name,
+writes .gz (and .br when the brotli package is installed) next to each
+compressible file, and records logical -> hashed names in
+static/dist/manifest.json:
+
+    static/vendor/bootstrap/css/bootstrap.min.css
+      -> static/dist/vendor/bootstrap/css/bootstrap.min.3f2a9c1d0b7e.css (+ .gz / .br)
+
+Templates call asset_url("vendor/bootstrap/css/bootstrap.min.css"). When the
+file is in the manifest the URL points at /assets/<hashed name>, served with
+"Cache-Control: public, max-age=31536000, immutable" and the best
+precompressed variant the browser accepts, so repeat visits fetch nothing.
+Without a manifest entry asset_url falls back to the plain /static URL (or
+the given fallback URL, e.g. a CDN), so nothing breaks before the first
+build.
+
+base.html loads Bootstrap this way with the CDN as fallback; to serve it
+first-party, put bootstrap.min.css / bootstrap.bundle.min.js under
+static/vendor/bootstrap/css and static/vendor/bootstrap/js and rebuild.
+
+Uploaded documents stay under static/uploads and are never fingerprinted:
+they are not versioned build artifacts.
+
+Run the build as a deploy step, before starting the server:
+
+    flask --app run:create_app build-assets --prune
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+import click
+from flask import current_app, request, send_from_directory, url_for, abort
+from flask.cli import with_appcontext
+
+try:
+    import brotli
+except ImportError:  # optional dependency: gzip only
+    brotli = None
+
+
+DIST_DIR = "dist"
+MANIFEST = "manifest.json"
+EXCLUDED_DIRS = ("uploads", DIST_DIR)
+
+# text-like types worth precompressing (images/fonts/pdfs are compressed already)
+COMPRESSIBLE = (".css", ".js", ".mjs", ".map", ".svg", ".json", ".txt", ".html", ".xml", ".ico")
+MIN_COMPRESS_BYTES = 512
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def dist_folder(app=None) -> str:
+    app = app or current_app
+    return os.path.join(app.static_folder, DIST_DIR)
+
+
+def _hashed_name(rel_path: str, digest: str) -> str:
+    root, ext = os.path.splitext(rel_path)
+    return f"{root}.{digest[:12]}{ext}"
+
+
+# =========================
+# BUILD
+# =========================
+def _source_files(static_folder):
+    for dirpath, dirnames, filenames in os.walk(static_folder):
+        rel_dir = os.path.relpath(dirpath, static_folder)
+        if rel_dir == ".":
+            dirnames[:] = [d for d in dirnames if d not in EXCLUDED_DIRS]
+            rel_dir = ""
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            if not name.startswith("."):
+                yield os.path.join(rel_dir, name).replace(os.sep, "/")
+
+
+def _write_variants(path: str, data: bytes, brotli_quality: int) -> None:
+    # mtime=0: identical input -> identical .gz (reproducible builds)
+    with open(path + ".gz", "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=9, mtime=0) as gz:
+            gz.write(data)
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=brotli_quality))
+
+
+def build_assets(static_folder: str, brotli_quality: int = 11, prune: bool = False) -> dict:
+    """Fingerprint + precompress static/ into static/dist. Returns the manifest."""
+    out_dir = os.path.join(static_folder, DIST_DIR)
+    os.makedirs(out_dir, exist_ok=True)
+
+    manifest = {}
+    for rel in sorted(_source_files(static_folder)):
+        with open(os.path.join(static_folder, rel), "rb") as f:
+            data = f.read()
+        hashed = _hashed_name(rel, hashlib.sha256(data).hexdigest())
+        manifest[rel] = hashed
+
+        target = os.path.join(out_dir, hashed)
+        if os.path.exists(target):
+            continue  # same content, built before
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp = target + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        if rel.lower().endswith(COMPRESSIBLE) and len(data) >= MIN_COMPRESS_BYTES:
+            _write_variants(target, data, brotli_quality)
+        os.replace(tmp, target)
+
+    tmp = os.path.join(out_dir, MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST))
+
+    if prune:
+        prune_dist(out_dir, manifest)
+    return manifest
+
+
+def prune_dist(out_dir: str, manifest: dict) -> int:
+    """Delete built files no longer referenced by the manifest. Returns files removed."""
+    keep = {MANIFEST}
+    for hashed in manifest.values():
+        keep.update({hashed, hashed + ".gz", hashed + ".br"})
+
+    removed = 0
+    for dirpath, _, filenames in os.walk(out_dir):
+        for name in filenames:
+            rel = os.path.relpath(os.path.join(dirpath, name), out_dir).replace(os.sep, "/")
+            if rel not in keep:
+                os.remove(os.path.join(dirpath, name))
+                removed += 1
+    return removed
+
+
+# =========================
+# RUNTIME
+# =========================
+def load_manifest(app) -> dict:
+    path = os.path.join(dist_folder(app), MANIFEST)
+    try:
+        mtime = os.path.getmtime(path)
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        mtime, manifest = None, {}
+    app.extensions["asset_manifest"] = (mtime, manifest)
+    return manifest
+
+
+def _manifest() -> dict:
+    app = current_app
+    mtime, manifest = app.extensions.get("asset_manifest", (None, {}))
+    if app.debug:
+        # pick up rebuilds without a restart while developing
+        path = os.path.join(dist_folder(app), MANIFEST)
+        current = os.path.getmtime(path) if os.path.exists(path) else None
+        if current != mtime:
+            manifest = load_manifest(app)
+    return manifest
+
+
+def asset_url(filename: str, fallback: str = None) -> str:
+    """URL of a static asset: fingerprinted when built, else /static (or fallback)."""
+    hashed = _manifest().get(filename)
+    if hashed:
+        return url_for("assets", filename=hashed)
+    if fallback:
+        return fallback
+    return url_for("static", filename=filename)
+
+
+def _accepted_encodings():
+    accepted = request.headers.get("Accept-Encoding", "")
+    tokens = {part.split(";", 1)[0].strip().lower() for part in accepted.split(",")}
+    return [enc for enc in ("br", "gzip") if enc in tokens]
+
+
+def serve_asset(filename):
+    folder = dist_folder()
+    if filename.endswith((".gz", ".br")) or filename == MANIFEST:
+        abort(404)
+
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    encoding, served = None, filename
+    for enc in _accepted_encodings():
+        candidate = filename + (".br" if enc == "br" else ".gz")
+        if os.path.exists(os.path.join(folder, candidate)):
+            encoding, served = enc, candidate
+            break
+
+    resp = send_from_directory(folder, served, mimetype=mimetype, max_age=31536000)
+    resp.headers["Cache-Control"] = IMMUTABLE
+    resp.headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    return resp
+
+
+# =========================
+# CLI
+# =========================
+@click.command("build-assets")
+@click.option("--prune", is_flag=True, help="delete built files that are no longer in the manifest")
+@click.option("--clean", is_flag=True, help="wipe static/dist before building")
+@click.option("--brotli-quality", default=11, show_default=True)
+@with_appcontext
+def build_assets_command(prune, clean, brotli_quality):
+    """Fingerprint and precompress static assets into static/dist."""
+    app = current_app._get_current_object()
+    if clean:
+        shutil.rmtree(dist_folder(app), ignore_errors=True)
+
+    manifest = build_assets(app.static_folder, brotli_quality=brotli_quality, prune=prune)
+    load_manifest(app)
+
+    click.echo(f"✅ {len(manifest)} assets fingerprinted into {dist_folder(app)}")
+    if brotli is None:
+        click.echo("⚠️  brotli not installed: only .gz variants were written (pip install brotli)")
+
+
+def init_assets(app) -> None:
+    load_manifest(app)
+    app.add_url_rule("/assets/<path:filename>", endpoint="assets", view_func=serve_asset)
+    app.jinja_env.globals["asset_url"] = asset_url
+    app.cli.add_command(build_assets_command)
@@ -0,0 +1,286 @@
+"""
+Audit logging (log_event) with pluggable sinks.
+
+AUDIT_SINK=db    (default) one SystemLog row per event, as before
+AUDIT_SINK=file  structured JSON lines appended to instance/audit/audit.jsonl
+                 through a buffered writer: no database write at all
+
+File sink details:
+  - events are buffered in memory and written in one append every
+    AUDIT_FLUSH_INTERVAL seconds or AUDIT_BUFFER_SIZE events (and at exit)
+  - the file is rotated at AUDIT_MAX_BYTES into audit.jsonl.1 .. .N
+    (AUDIT_BACKUP_COUNT); the oldest file is dropped
+  - writers in several processes share the files through O_APPEND writes and
+    an flock()-ed lock file around rotation
+  - read_file_events() feeds admin/logs.html newest-first from a memory-mapped
+    line index that only scans bytes appended since the previous read
+"""
+import atexit
+import json
+import mmap
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+
+from app.extensions import db
+from app.models import SystemLog
+
+try:
+    import fcntl
+except ImportError:  # Windows: rotation is not guarded across processes
+    fcntl = None
+
+
+# max time an event can sit in another process' buffer before hitting the file
+FLUSH_SLACK = timedelta(minutes=1)
+
+DEFAULTS = {
+    "AUDIT_SINK": "db",
+    "AUDIT_BUFFER_SIZE": 50,
+    "AUDIT_FLUSH_INTERVAL": 1.0,
+    "AUDIT_MAX_BYTES": 10 * 1024 * 1024,
+    "AUDIT_BACKUP_COUNT": 10,
+}
+
+
+# =========================
+# PUBLIC API
+# =========================
+def log_event(level: str, action: str, message: str, user_id=None):
+    """Record one audit event in the configured sink. Never raises."""
+    writer = current_app.extensions.get("audit_writer") if has_app_context() else None
+    if writer is not None:
+        writer.write(level, action, message, user_id)
+        return
+
+    try:
+        db.session.add(SystemLog(
+            level=level,
+            action=action,
+            message=message,
+            user_id=user_id
+        ))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+
+
+def file_sink_enabled() -> bool:
+    return "audit_writer" in current_app.extensions
+
+
+# =========================
+# FILE SINK: WRITER
+# =========================
+class BufferedAuditWriter:
+    def __init__(self, folder, buffer_size, flush_interval, max_bytes, backup_count):
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.path = os.path.join(folder, "audit.jsonl")
+        self.lock_path = os.path.join(folder, ".audit.lock")
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+
+        self._buf = []
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="audit-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _next_id(self) -> int:
+        # microsecond timestamp, strictly increasing within this process
+        self._last_id = max(self._last_id + 1, time.time_ns() // 1000)
+        return self._last_id
+
+    def write(self, level, action, message, user_id=None):
+        with self._lock:
+            self._buf.append(json.dumps({
+                "id": self._next_id(),
+                "created_at": datetime.utcnow().isoformat(),
+                "level": level,
+                "action": action,
+                "message": message,
+                "user_id": user_id,
+                "pid": os.getpid(),
+            }, ensure_ascii=False) + "\n")
+            full = len(self._buf) >= self.buffer_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self._buf:
+                return
+            data = "".join(self._buf).encode("utf-8")
+            self._buf = []
+
+        with open(self.lock_path, "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) + len(data) > self.max_bytes:
+                    self._rotate()
+                fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                try:
+                    os.write(fd, data)
+                finally:
+                    os.close(fd)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception:
+                pass
+
+    def close(self):
+        self._stop.set()
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    def after_fork(self) -> None:
+        """In a forked worker: own buffer, lock and flush thread (threads do not survive fork)."""
+        self._buf = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="audit-flusher", daemon=True)
+        self._thread.start()
+
+    def files_newest_first(self):
+        files = [self.path] + [f"{self.path}.{i}" for i in range(1, self.backup_count + 1)]
+        return [f for f in files if os.path.exists(f)]
+
+
+# =========================
+# FILE SINK: READER (mmap tail index)
+# =========================
+class _TailIndex:
+    """Line start offsets of one file, extended incrementally as it grows."""
+
+    def __init__(self):
+        self.inode = None
+        self.size = 0
+        self.offsets = []
+
+    def refresh(self, mm, st):
+        """Index the complete lines appended since the last call."""
+        if st.st_ino != self.inode or st.st_size < self.size:
+            self.inode, self.size, self.offsets = st.st_ino, 0, []
+        pos = self.size
+        while True:
+            nl = mm.find(b"\n", pos, st.st_size)
+            if nl == -1:
+                break
+            self.offsets.append(pos)
+            pos = nl + 1
+        # a partial last line (writer mid-append) is picked up next time
+        self.size = pos
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _file_lines_newest_first(path):
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return
+    with f:
+        st = os.fstat(f.fileno())
+        if st.st_size == 0:
+            return
+        # the same open file is indexed and read, so a rotation in between is harmless
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with _indexes_lock:
+                idx = _indexes.setdefault(path, _TailIndex())
+                idx.refresh(mm, st)
+                # offsets only ever grow (or get replaced), so a length snapshot is enough
+                offsets, count, end = idx.offsets, len(idx.offsets), idx.size
+            for i in range(count - 1, -1, -1):
+                start = offsets[i]
+                yield mm[start:end].rstrip(b"\n")
+                end = start
+
+
+def iter_file_events():
+    """Every event of the file sink, newest first (flushes this process first)."""
+    writer = current_app.extensions["audit_writer"]
+    writer.flush()
+    for path in writer.files_newest_first():
+        for line in _file_lines_newest_first(path):
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def read_file_events(limit, level=None, action=None, user_id=None,
+                     date_from=None, date_to=None, before=None):
+    """
+    One page of file-sink events (dicts with datetime created_at), newest first.
+    before = (created_at, id) keyset cursor. Returns limit+1 rows at most so the
+    caller can tell whether there is a next page.
+    """
+    out = []
+    for ev in iter_file_events():
+        try:
+            ev["created_at"] = datetime.fromisoformat(ev["created_at"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if before and (ev["created_at"], ev.get("id", 0)) >= before:
+            continue
+        if date_from and ev["created_at"] < date_from:
+            # files are append-ordered; allow for events buffered by other workers
+            if ev["created_at"] < date_from - FLUSH_SLACK:
+                break
+            continue
+        if date_to and ev["created_at"] >= date_to:
+            continue
+        if level and ev.get("level") != level:
+            continue
+        if action and ev.get("action") != action:
+            continue
+        if user_id and ev.get("user_id") != user_id:
+            continue
+        out.append(ev)
+        if len(out) > limit:
+            break
+    return out
+
+
+# =========================
+# SETUP
+# =========================
+def init_audit(app) -> None:
+    for key, default in DEFAULTS.items():
+        env = os.environ.get(key)
+        app.config.setdefault(key, type(default)(env) if env is not None else default)
+
+    if app.config["AUDIT_SINK"] == "file":
+        app.extensions["audit_writer"] = BufferedAuditWriter(
+            folder=app.config.get("AUDIT_DIR") or os.path.join(app.instance_path, "audit"),
+            buffer_size=app.config["AUDIT_BUFFER_SIZE"],
+            flush_interval=app.config["AUDIT_FLUSH_INTERVAL"],
+            max_bytes=app.config["AUDIT_MAX_BYTES"],
+            backup_count=app.config["AUDIT_BACKUP_COUNT"],
+        )
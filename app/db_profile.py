@@ -0,0 +1,137 @@
+"""
+SQLite engine profiles.
+
+A profile is a set of PRAGMAs applied to every new SQLite connection plus
+SQLAlchemy pool settings. The "production" profile switches the database to
+WAL so readers never wait on writers, and gives writers a busy_timeout so they
+queue up instead of failing with "database is locked".
+
+Select a profile with SQLITE_PROFILE (app.config, else env); single values can
+be overridden with SQLITE_<PRAGMA> in app.config or the environment, e.g.
+SQLITE_BUSY_TIMEOUT=10000.
+
+foreign_keys stays OFF (SQLite's default) so deletes behave as before;
+SQLITE_FOREIGN_KEYS=ON turns enforcement on.
+"""
+import os
+
+from sqlalchemy import event
+
+
+SQLITE_PROFILES = {
+    # plain SQLite defaults (rollback journal), kept for debugging
+    "default": {
+        "pragmas": {},
+        "pool": {},
+    },
+    "production": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,          # ms
+            "mmap_size": 268435456,        # 256 MB
+            "cache_size": -65536,          # negative = KiB -> 64 MB
+            "temp_store": "MEMORY",
+            "foreign_keys": "OFF",         # opt in: SQLITE_FOREIGN_KEYS=ON
+        },
+        "pool": {
+            "pool_size": 10,
+            "max_overflow": 20,
+            "pool_timeout": 10,
+            "pool_recycle": 3600,
+        },
+    },
+}
+
+# values PRAGMA returns when read back (journal_mode etc. come back as text/ints)
+_READBACK = {
+    "synchronous": {"OFF": 0, "NORMAL": 1, "FULL": 2, "EXTRA": 3},
+    "temp_store": {"DEFAULT": 0, "FILE": 1, "MEMORY": 2},
+    "foreign_keys": {"OFF": 0, "ON": 1},
+}
+
+
+def is_sqlite_uri(uri: str) -> bool:
+    return (uri or "").startswith("sqlite")
+
+
+def resolve_profile(name: str, config=None) -> dict:
+    """
+    Return {"pragmas": {...}, "pool": {...}} for a profile name, with
+    SQLITE_<PRAGMA> overrides applied (from `config`, e.g. app.config, else env).
+    """
+    base = SQLITE_PROFILES.get(name)
+    if base is None:
+        raise ValueError(f"Unknown SQLITE_PROFILE {name!r}. Choose from: {', '.join(SQLITE_PROFILES)}")
+
+    config = config or {}
+    pragmas = dict(base["pragmas"])
+    for key in list(pragmas):
+        setting = f"SQLITE_{key.upper()}"
+        value = config.get(setting) or os.environ.get(setting)
+        if value:
+            pragmas[key] = value
+
+    return {"pragmas": pragmas, "pool": dict(base["pool"])}
+
+
+def engine_options(profile: dict) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS for a resolved profile."""
+    options = dict(profile["pool"])
+
+    busy_ms = int(profile["pragmas"].get("busy_timeout", 0) or 0)
+    options["connect_args"] = {
+        # sqlite3's own lock wait, in seconds (matches busy_timeout)
+        "timeout": busy_ms / 1000 if busy_ms else 5,
+        # pooled connections are handed to different request threads
+        "check_same_thread": False,
+    }
+    return options
+
+
+def install_pragmas(engine, pragmas: dict) -> None:
+    """Run the profile PRAGMAs on every new DBAPI connection of this engine."""
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cur = dbapi_connection.cursor()
+        try:
+            for key, value in pragmas.items():
+                cur.execute(f"PRAGMA {key}={value}")
+        finally:
+            cur.close()
+
+
+def pragma_report(engine, keys=None) -> dict:
+    """Read back the PRAGMAs active on a pooled connection."""
+    keys = keys or ["journal_mode", "synchronous", "busy_timeout", "mmap_size",
+                    "cache_size", "temp_store", "foreign_keys"]
+    report = {}
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        for key in keys:
+            cur.execute(f"PRAGMA {key}")
+            row = cur.fetchone()
+            report[key] = row[0] if row else None
+        cur.close()
+    finally:
+        raw.close()
+    return report
+
+
+def check_profile(engine, pragmas: dict) -> list:
+    """
+    Compare active PRAGMAs with the wanted ones.
+    Returns a list of (pragma, wanted, actual) mismatches (empty = all good).
+    """
+    actual = pragma_report(engine, list(pragmas) or None)
+    mismatches = []
+    for key, wanted in pragmas.items():
+        have = actual.get(key)
+        want = _READBACK.get(key, {}).get(str(wanted).upper(), wanted)
+        if str(have).lower() != str(want).lower():
+            mismatches.append((key, wanted, have))
+    return mismatches
@@ -0,0 +1,51 @@
+"""
+Retry helper for short write transactions.
+
+SQLite allows one writer at a time, so under load a commit can fail with
+"database is locked". With optimistic locking (version_id_col on Review /
+Application) a commit can also fail with StaleDataError when another request
+changed the same row first. Both are safe to retry: roll back, re-read, redo.
+"""
+import random
+import time
+
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
+
+from app.extensions import db
+
+
+DEFAULT_ATTEMPTS = 5
+DEFAULT_BACKOFF = 0.05  # seconds, doubled each attempt
+
+
+def is_busy_error(exc) -> bool:
+    """True for SQLite 'database is locked' / 'database is busy' errors."""
+    if not isinstance(exc, OperationalError):
+        return False
+    msg = str(getattr(exc, "orig", exc)).lower()
+    return "database is locked" in msg or "database is busy" in msg
+
+
+def run_with_retry(work, attempts: int = DEFAULT_ATTEMPTS, backoff: float = DEFAULT_BACKOFF):
+    """
+    Run work() (which must do its own reads AND commit) until it succeeds.
+
+    Retries on busy database and on optimistic-lock conflicts, with
+    exponential backoff plus jitter. Any other error is raised right away.
+    The last error is raised if every attempt fails.
+    """
+    for attempt in range(attempts):
+        try:
+            return work()
+        except StaleDataError:
+            db.session.rollback()
+            if attempt == attempts - 1:
+                raise
+        except OperationalError as e:
+            db.session.rollback()
+            if not is_busy_error(e) or attempt == attempts - 1:
+                raise
+
+        # rollback() already expired every loaded object, so work() re-reads
+        time.sleep(backoff * (2 ** attempt) + random.uniform(0, backoff))
@@ -0,0 +1,316 @@
+"""
+Server-side application drafts.
+
+The apply page keeps one ApplicationDraft per (student, scholarship):
+
+  - text fields are autosaved with small JSON Patch requests (RFC 6902
+    add / replace / remove / test on "/field" or "/list_field/<index>")
+    instead of re-posting the whole form
+  - each document is uploaded on its own as soon as it is picked and stays
+    attached to the draft, so a wrong file type or an expired session never
+    costs the other uploads
+  - submitting turns the draft into an Application in one short transaction:
+    no files travel with it
+
+The classic one-shot multipart POST of the apply form still works (no
+JavaScript); when it fails validation, what it carried is kept in the draft.
+
+Drafts untouched for DRAFT_TTL_DAYS are deleted with their files by the
+purge_drafts job (app.scheduler).
+"""
+import copy
+import os
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from werkzeug.utils import secure_filename
+
+from app.extensions import db
+from app.models import Application, ApplicationDraft
+from app.db_retry import run_with_retry
+
+
+# form_data keys of an application (see snapshot_export.FORM_TEXT_FIELDS);
+# cgpa is only kept so the eligibility check works on a restored draft
+FORM_TEXT_FIELDS = (
+    "full_name", "address", "ic_number", "dob", "age", "intake", "programme", "course",
+    "nationality", "race", "sex", "contact", "home_contact", "household_income", "cgpa",
+    "email", "school_name", "qualification", "statement",
+)
+FORM_LIST_FIELDS = (
+    "family_name", "relationship", "family_age", "occupation", "family_income",
+    "activity_type", "level", "year", "achievement",
+)
+
+# document field -> allowed extensions, in Application.documents order
+ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "pdf", "doc", "docx"}
+DOCUMENT_FIELDS = {
+    "photo": ALLOWED_EXTENSIONS,
+    "academic_doc": ALLOWED_EXTENSIONS,
+    "income_proof": {"pdf"},
+    "cgpa_proof": {"pdf"},
+}
+DOCUMENT_ERRORS = {
+    "photo": "Photo file type not allowed. Allowed: png, jpg, jpeg, pdf, doc, docx",
+    "academic_doc": "Document type not allowed. Allowed: png, jpg, jpeg, pdf, doc, docx",
+    "income_proof": "Income proof must be in PDF format.",
+    "cgpa_proof": "CGPA proof must be in PDF format.",
+}
+
+REQUIRED_FIELDS = ("full_name", "address", "ic_number", "dob", "age", "household_income", "cgpa", "statement")
+REQUIRED_DOCUMENTS = ("photo", "income_proof", "cgpa_proof")
+
+MAX_FIELD_LENGTH = 5000
+MAX_LIST_LENGTH = 20
+DEFAULT_TTL_DAYS = 30
+
+
+class DraftPatchError(ValueError):
+    """Invalid JSON Patch document (-> 400)."""
+
+
+def upload_folder() -> str:
+    folder = current_app.config.get("UPLOAD_FOLDER") or os.path.join(current_app.root_path, "static", "uploads")
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+# =========================
+# FORM DATA
+# =========================
+def form_data_from_request(form) -> dict:
+    """form_data of a classic (full) apply POST."""
+    data = {name: form.get(name) for name in FORM_TEXT_FIELDS}
+    data.update({name: form.getlist(f"{name}[]") for name in FORM_LIST_FIELDS})
+    return data
+
+
+def _clean_text(value):
+    if value is None:
+        return None
+    if not isinstance(value, (str, int, float)):
+        raise DraftPatchError("text fields take a string value")
+    return str(value)[:MAX_FIELD_LENGTH]
+
+
+def _clean_list(value):
+    if not isinstance(value, list) or len(value) > MAX_LIST_LENGTH:
+        raise DraftPatchError(f"list fields take a list of at most {MAX_LIST_LENGTH} strings")
+    return [_clean_text(v) or "" for v in value]
+
+
+def _pointer(path):
+    if not isinstance(path, str) or not path.startswith("/"):
+        raise DraftPatchError(f"invalid path {path!r}")
+    parts = [p.replace("~1", "/").replace("~0", "~") for p in path[1:].split("/")]
+    field = parts[0]
+    if field not in FORM_TEXT_FIELDS and field not in FORM_LIST_FIELDS:
+        raise DraftPatchError(f"unknown field {field!r}")
+    if len(parts) == 1:
+        return field, None
+    if len(parts) == 2 and field in FORM_LIST_FIELDS:
+        return field, parts[1]
+    raise DraftPatchError(f"invalid path {path!r}")
+
+
+def _index(items, token, allow_end=False):
+    if allow_end and token == "-":
+        return len(items)
+    if not token.isdigit():
+        raise DraftPatchError(f"invalid list index {token!r}")
+    i = int(token)
+    if i > len(items) or (i == len(items) and not allow_end) or i >= MAX_LIST_LENGTH:
+        raise DraftPatchError(f"list index {i} out of range")
+    return i
+
+
+def apply_patch(form_data, ops) -> dict:
+    """Apply a JSON Patch to a copy of form_data. Raises DraftPatchError."""
+    if not isinstance(ops, list):
+        raise DraftPatchError("a JSON Patch is a list of operations")
+
+    data = copy.deepcopy(form_data) if isinstance(form_data, dict) else {}
+    for op in ops:
+        if not isinstance(op, dict):
+            raise DraftPatchError("every operation must be an object")
+        kind = op.get("op")
+        field, token = _pointer(op.get("path"))
+
+        if token is None:
+            if kind in ("add", "replace"):
+                if "value" not in op:
+                    raise DraftPatchError(f"{kind} needs a value")
+                clean = _clean_list if field in FORM_LIST_FIELDS else _clean_text
+                data[field] = clean(op["value"])
+            elif kind == "remove":
+                data.pop(field, None)
+            elif kind == "test":
+                if data.get(field) != op.get("value"):
+                    raise DraftPatchError(f"test failed for {field!r}")
+            else:
+                raise DraftPatchError(f"unsupported op {kind!r}")
+            continue
+
+        items = data.setdefault(field, [])
+        if kind == "add":
+            items.insert(_index(items, token, allow_end=True), _clean_text(op.get("value")) or "")
+            if len(items) > MAX_LIST_LENGTH:
+                raise DraftPatchError(f"{field!r} has more than {MAX_LIST_LENGTH} entries")
+        elif kind == "replace":
+            items[_index(items, token)] = _clean_text(op.get("value")) or ""
+        elif kind == "remove":
+            del items[_index(items, token)]
+        elif kind == "test":
+            if items[_index(items, token)] != op.get("value"):
+                raise DraftPatchError(f"test failed for {op.get('path')!r}")
+        else:
+            raise DraftPatchError(f"unsupported op {kind!r}")
+    return data
+
+
+# =========================
+# DRAFTS
+# =========================
+def get_draft(student_id, scholarship_id):
+    return ApplicationDraft.query.filter_by(student_id=student_id, scholarship_id=scholarship_id).first()
+
+
+def _get_or_create(student_id, scholarship_id):
+    draft = get_draft(student_id, scholarship_id)
+    if draft is not None:
+        return draft
+    draft = ApplicationDraft(student_id=student_id, scholarship_id=scholarship_id, form_data={}, documents={})
+    db.session.add(draft)
+    try:
+        db.session.flush()
+    except IntegrityError:
+        # another request (second tab) created it first
+        db.session.rollback()
+        draft = get_draft(student_id, scholarship_id)
+    return draft
+
+
+def patch_draft(student_id, scholarship_id, ops):
+    """Apply a JSON Patch to the draft's form_data. Returns the saved draft."""
+    def work():
+        draft = _get_or_create(student_id, scholarship_id)
+        # re-applied on a fresh row when a concurrent save bumped the version
+        draft.form_data = apply_patch(draft.form_data, ops)
+        db.session.commit()
+        return draft
+
+    return run_with_retry(work)
+
+
+def save_form_data(student_id, scholarship_id, form_data):
+    """Store a whole form_data (classic POST that failed validation)."""
+    def work():
+        draft = _get_or_create(student_id, scholarship_id)
+        draft.form_data = {k: v for k, v in form_data.items() if v not in (None, "", [])}
+        db.session.commit()
+        return draft
+
+    return run_with_retry(work)
+
+
+# =========================
+# DOCUMENTS
+# =========================
+def document_error(field, filename):
+    """Error message for an upload that is not allowed in this field, else None."""
+    allowed = DOCUMENT_FIELDS.get(field)
+    if allowed is None:
+        return "Unknown document."
+    if "." not in filename or filename.rsplit(".", 1)[1].lower() not in allowed:
+        return DOCUMENT_ERRORS[field]
+    return None
+
+
+def document_name(filename, user_id) -> str:
+    # prevent overwrite by adding user_id + timestamp
+    return f"{user_id}_{int(time.time())}_{secure_filename(filename)}"
+
+
+def save_document(storage, user_id) -> str:
+    """Write an uploaded file to the upload folder. Returns its "uploads/<name>" path."""
+    name = document_name(storage.filename, user_id)
+    storage.save(os.path.join(upload_folder(), name))
+    return f"uploads/{name}"
+
+
+def _remove_file(path):
+    if path and path.startswith("uploads/"):
+        try:
+            os.remove(os.path.join(upload_folder(), path[len("uploads/"):]))
+        except OSError:
+            pass
+
+
+def attach_document(student_id, scholarship_id, field, path):
+    """Attach a saved upload to the draft, replacing (and deleting) the previous one."""
+    replaced = []
+
+    def work():
+        replaced.clear()
+        draft = _get_or_create(student_id, scholarship_id)
+        documents = dict(draft.documents or {})
+        if documents.get(field) and documents[field] != path:
+            replaced.append(documents[field])
+        documents[field] = path
+        draft.documents = documents
+        db.session.commit()
+        return draft
+
+    draft = run_with_retry(work)
+    for old in replaced:
+        _remove_file(old)
+    return draft
+
+
+# =========================
+# SUBMIT
+# =========================
+def missing_fields(draft) -> list:
+    data = draft.form_data or {}
+    documents = draft.documents or {}
+    missing = [f for f in REQUIRED_FIELDS if not (data.get(f) or "").strip()]
+    missing += [f for f in REQUIRED_DOCUMENTS if not documents.get(f)]
+    return missing
+
+
+def submit_draft(student_id, scholarship_id):
+    """Turn the draft into an Application (no file transfer). Returns it, or None without a draft."""
+    def work():
+        draft = get_draft(student_id, scholarship_id)
+        if draft is None:
+            return None
+        documents = draft.documents or {}
+        application = Application(
+            student_id=student_id,
+            scholarship_id=scholarship_id,
+            documents=",".join(documents[f] for f in DOCUMENT_FIELDS if documents.get(f)),
+            status="Pending",
+            form_data=draft.form_data or {},
+        )
+        db.session.add(application)
+        db.session.delete(draft)
+        db.session.commit()
+        return application
+
+    return run_with_retry(work)
+
+
+def purge_drafts(days=None) -> int:
+    """Delete drafts untouched for `days` days, with their uploaded files. Returns drafts removed."""
+    days = days if days is not None else current_app.config.get("DRAFT_TTL_DAYS", DEFAULT_TTL_DAYS)
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    stale = ApplicationDraft.query.filter(ApplicationDraft.updated_at < cutoff).limit(1000).all()
+    files = [p for d in stale for p in (d.documents or {}).values()]
+    for draft in stale:
+        db.session.delete(draft)
+    db.session.commit()
+    for path in files:
+        _remove_file(path)
+    return len(stale)
@@ -1,6 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 
-db = SQLAlchemy()
+from app.read_replica import RoutingSession
+
+# RoutingSession sends reads of @use_read_replica routes to the replica
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login_manager = LoginManager()
 login_manager.login_view = "auth.login"
@@ -0,0 +1,280 @@
+"""
+Live dashboard counters over server-sent events.
+
+The committee and admin dashboards open an EventSource on /live/dashboard
+and update their counters (and a short "recent activity" list) in place
+instead of being reloaded. Writes that change those numbers call publish()
+(reviewer_routes.review, committee_routes.decide_application,
+admin_routes.update_application_status), which records a LiveChange row.
+
+Each worker process runs ONE ChangeBus thread, started by the first watcher.
+It polls max(live_change.id) every LIVE_POLL_SECONDS (publish() in the same
+process wakes it at once), and only when that moved does it run the counter
+queries - once - and hand the result to every open stream of the process.
+N watchers therefore cost one computation per change, not N page renders,
+and a change made in one worker reaches the watchers of all the others.
+
+An open stream holds a server thread (gunicorn gthread), so streams are
+closed after LIVE_STREAM_SECONDS (the browser reconnects on its own) and at
+most LIVE_MAX_STREAMS are kept open per process - by default a quarter of
+WEB_THREADS, at most MAX_STREAMS_CAP (sizing: gunicorn.conf.py). Beyond that
+a request is answered at once with 503 and Retry-After, without waiting for
+a snapshot; the dashboard page reconnects after LIVE_BUSY_RETRY_MS.
+
+text/event-stream is not in app.streaming.GZIP_MIMETYPES, so the events are
+never held back by compression.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+from flask import Response, abort, current_app
+from flask_login import current_user, login_required
+from sqlalchemy import case, func, or_
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.extensions import db
+from app.models import Application, LiveChange, Scholarship, User
+from app.review_workflow import OPEN_STATUSES
+from app.db_retry import run_with_retry
+
+
+RECENT_SIZE = 10
+PRUNE_EVERY = 3600  # seconds between deletes of old live_change rows
+WATCHER_ROLES = ("committee", "admin")
+MAX_STREAMS_CAP = 16
+
+
+# =========================
+# PUBLISH (after a committed write)
+# =========================
+def publish(kind: str, application_id=None) -> None:
+    """Tell the live dashboards something changed. Never fails the caller."""
+    def work():
+        db.session.add(LiveChange(kind=kind, application_id=application_id))
+        db.session.commit()
+
+    try:
+        run_with_retry(work)
+    except SQLAlchemyError:
+        db.session.rollback()
+        return
+
+    bus = current_app.extensions.get("live_bus")
+    if bus is not None:
+        bus.notify()
+
+
+# =========================
+# SNAPSHOT (one computation per change)
+# =========================
+def dashboard_counters() -> dict:
+    status = Application.status
+    pending = or_(status.in_(OPEN_STATUSES), status.is_(None), status == "None")
+    total, pending_n, accepted, rejected = db.session.query(
+        func.count(Application.id),
+        func.sum(case((pending, 1), else_=0)),
+        func.sum(case((status == "Accepted", 1), else_=0)),
+        func.sum(case((status == "Rejected", 1), else_=0)),
+    ).one()
+    return {
+        "total": total or 0,
+        "pending": pending_n or 0,
+        "accepted": accepted or 0,
+        "rejected": rejected or 0,
+        "scholarships": db.session.query(func.count(Scholarship.id)).scalar() or 0,
+    }
+
+
+def _changes_since(last_id, limit=RECENT_SIZE):
+    rows = (
+        db.session.query(LiveChange.id, LiveChange.kind, LiveChange.application_id, LiveChange.created_at,
+                         Application.status, User.username)
+        .outerjoin(Application, Application.id == LiveChange.application_id)
+        .outerjoin(User, User.id == Application.student_id)
+        .filter(LiveChange.id > last_id)
+        .order_by(LiveChange.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return [{
+        "id": r.id, "kind": r.kind, "application_id": r.application_id,
+        "status": r.status, "student": r.username,
+        "at": r.created_at.strftime("%H:%M:%S") if r.created_at else None,
+    } for r in reversed(rows)]
+
+
+class ChangeBus:
+    """Per-process fan-out of dashboard snapshots to open SSE streams."""
+
+    def __init__(self, app, poll_interval=2.0, keep_hours=24):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.keep_hours = keep_hours
+        self._setup()
+
+    def _setup(self):
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._seq = 0              # bumped on every broadcast
+        self._snapshot = None      # {"id", "counters", "recent"}
+        self._last_id = None       # newest live_change id seen
+        self._recent = deque(maxlen=RECENT_SIZE)
+        self._watchers = 0
+        self._streams = 0
+        self._pruned_at = 0.0
+        self._thread = None
+
+    # ---- streams ----
+    def try_open_stream(self, limit) -> bool:
+        with self._cond:
+            if self._streams >= limit:
+                return False
+            self._streams += 1
+            return True
+
+    def close_stream(self) -> None:
+        with self._cond:
+            self._streams -= 1
+
+    def subscribe(self) -> None:
+        with self._cond:
+            self._watchers += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="live-bus", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def unsubscribe(self) -> None:
+        with self._cond:
+            self._watchers -= 1
+
+    def wait(self, seen, timeout):
+        """(seq, snapshot) once a broadcast newer than `seen` exists, or after timeout."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._snapshot is not None and self._seq != seen, timeout)
+            return self._seq, self._snapshot
+
+    def notify(self) -> None:
+        self._wake.set()
+
+    # ---- bus thread ----
+    def _run(self):
+        while True:
+            # idle (no watchers): sleep until someone subscribes or publishes
+            self._wake.wait(self.poll_interval if self._watchers else None)
+            self._wake.clear()
+            with self.app.app_context():
+                try:
+                    self._refresh()
+                except Exception:
+                    # a failed refresh must not kill the bus; next wake-up retries
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    def _refresh(self):
+        latest = db.session.query(func.max(LiveChange.id)).scalar() or 0
+        if self._snapshot is not None and latest == self._last_id:
+            return
+
+        self._recent.extend(_changes_since(self._last_id or 0))
+        snapshot = {"id": latest, "counters": dashboard_counters(), "recent": list(self._recent)[::-1]}
+        self._last_id = latest
+
+        with self._cond:
+            self._snapshot = snapshot
+            self._seq += 1
+            self._cond.notify_all()
+
+        now = time.monotonic()
+        if now - self._pruned_at > PRUNE_EVERY:
+            self._pruned_at = now
+            cutoff = datetime.utcnow() - timedelta(hours=self.keep_hours)
+            LiveChange.query.filter(LiveChange.created_at < cutoff).delete(synchronize_session=False)
+            db.session.commit()
+
+    def after_fork(self) -> None:
+        """In a forked worker: own lock and state; the thread restarts with the first watcher."""
+        self._setup()
+
+
+# =========================
+# SSE ENDPOINT
+# =========================
+def _event(snapshot) -> str:
+    return f"id: {snapshot['id']}\nevent: counters\ndata: {json.dumps(snapshot)}\n\n"
+
+
+def _stream(bus, seconds, heartbeat, retry_ms):
+    bus.subscribe()
+    try:
+        yield f"retry: {retry_ms}\n\n"
+        sent = 0
+        end = time.monotonic() + seconds
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            seq, snapshot = bus.wait(sent, min(heartbeat, remaining))
+            if snapshot is not None and seq != sent:
+                yield _event(snapshot)
+                sent = seq
+            else:
+                yield ": keep-alive\n\n"
+    finally:
+        bus.unsubscribe()
+
+
+def _sse_response(body):
+    return Response(body, mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",   # nginx: do not buffer the stream
+    })
+
+
+@login_required
+def live_dashboard():
+    if current_user.role not in WATCHER_ROLES:
+        abort(403)
+
+    cfg = current_app.config
+    bus = current_app.extensions["live_bus"]
+    if not bus.try_open_stream(cfg["LIVE_MAX_STREAMS"]):
+        # too many open streams in this process: free the thread at once
+        retry_after = max(1, cfg["LIVE_BUSY_RETRY_MS"] // 1000)
+        return Response("Too many live dashboards open, retry later.\n", status=503,
+                        mimetype="text/plain", headers={"Retry-After": str(retry_after)})
+
+    response = _sse_response(_stream(
+        bus,
+        cfg["LIVE_STREAM_SECONDS"],
+        cfg["LIVE_HEARTBEAT_SECONDS"],
+        cfg["LIVE_RETRY_MS"],
+    ))
+    # runs even when the client goes away before the generator started
+    response.call_on_close(bus.close_stream)
+    return response
+
+
+def init_live_updates(app) -> None:
+    threads = int(os.environ.get("WEB_THREADS", 4))
+    app.config.setdefault("LIVE_POLL_SECONDS", float(os.environ.get("LIVE_POLL_SECONDS", 2)))
+    app.config.setdefault("LIVE_STREAM_SECONDS", 55)
+    app.config.setdefault("LIVE_HEARTBEAT_SECONDS", 15)
+    app.config.setdefault(
+        "LIVE_MAX_STREAMS", int(os.environ.get("LIVE_MAX_STREAMS", max(1, min(threads // 4, MAX_STREAMS_CAP))))
+    )
+    app.config.setdefault("LIVE_RETRY_MS", 1000)
+    app.config.setdefault("LIVE_BUSY_RETRY_MS", 30000)
+    app.config.setdefault("LIVE_KEEP_HOURS", 24)
+
+    app.extensions["live_bus"] = ChangeBus(
+        app,
+        poll_interval=app.config["LIVE_POLL_SECONDS"],
+        keep_hours=app.config["LIVE_KEEP_HOURS"],
+    )
+    app.add_url_rule("/live/dashboard", endpoint="live_dashboard", view_func=live_dashboard)
@@ -0,0 +1,140 @@
+"""
+System log retention and archiving.
+
+Instead of one big DELETE on system_log, old rows are moved out in small
+batches: each batch is appended to a gzip JSON-lines file per month
+(instance/log_archive/system_log-YYYY-MM.jsonl.gz) and then deleted in its
+own short transaction, so the live table stays small without ever holding
+a long write lock.
+
+A batch is written to the archive before it is deleted; if the process dies
+in between, the next run archives those rows again (duplicates are possible,
+loss is not).
+
+Retention runs as the archive_logs scheduler job (app.scheduler, hourly,
+leased so one process at a time). The admin buttons move at most
+REQUEST_MAX_BATCHES batches per request and leave the rest to the job.
+
+    flask --app run:create_app archive-logs --days 90
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.extensions import db
+from app.models import SystemLog
+
+
+DEFAULT_RETENTION_DAYS = 90
+DEFAULT_BATCH_SIZE = 1000
+REQUEST_MAX_BATCHES = 5   # per admin request: a few seconds of work at most
+
+
+def archive_dir() -> str:
+    path = current_app.config.get("LOG_ARCHIVE_DIR") or os.path.join(current_app.instance_path, "log_archive")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _row_dict(log):
+    return {
+        "id": log.id,
+        "created_at": log.created_at.isoformat() if log.created_at else None,
+        "level": log.level,
+        "action": log.action,
+        "message": log.message,
+        "user_id": log.user_id,
+    }
+
+
+def archive_logs(cutoff: datetime, batch_size: int = DEFAULT_BATCH_SIZE, max_batches=None) -> int:
+    """
+    Archive + delete the logs created before cutoff, all of them or at most
+    max_batches batches. Returns number of rows moved.
+    """
+    folder = archive_dir()
+    moved = 0
+
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        batches += 1
+        batch = (
+            SystemLog.query
+            .filter(SystemLog.created_at < cutoff)
+            .order_by(SystemLog.created_at.asc(), SystemLog.id.asc())
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+
+        by_month = {}
+        for log in batch:
+            month = (log.created_at or cutoff).strftime("%Y-%m")
+            by_month.setdefault(month, []).append(_row_dict(log))
+
+        # appending a new gzip member keeps each file a valid .gz stream
+        for month, rows in by_month.items():
+            path = os.path.join(folder, f"system_log-{month}.jsonl.gz")
+            with gzip.open(path, "at", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+        ids = [log.id for log in batch]
+        db.session.query(SystemLog).filter(SystemLog.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        moved += len(ids)
+
+    return moved
+
+
+def retention_cutoff(days=None) -> datetime:
+    if days is None:
+        days = current_app.config.get("LOG_RETENTION_DAYS", DEFAULT_RETENTION_DAYS)
+    return datetime.utcnow() - timedelta(days=days)
+
+
+def apply_retention(days=None, batch_size: int = DEFAULT_BATCH_SIZE, max_batches=None) -> int:
+    """Archive logs older than LOG_RETENTION_DAYS (or days)."""
+    return archive_logs(retention_cutoff(days), batch_size, max_batches)
+
+
+def logs_before(cutoff: datetime) -> bool:
+    """True while logs older than cutoff are left to archive."""
+    return db.session.query(SystemLog.id).filter(SystemLog.created_at < cutoff).first() is not None
+
+
+def read_archive(month: str):
+    """Yield the archived rows (dicts) of one month, e.g. '2026-01'."""
+    path = os.path.join(archive_dir(), f"system_log-{month}.jsonl.gz")
+    if not os.path.exists(path):
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# =========================
+# CLI
+# =========================
+@click.command("archive-logs")
+@click.option("--days", type=int, default=None, help="retention in days (default: LOG_RETENTION_DAYS)")
+@click.option("--batch-size", default=DEFAULT_BATCH_SIZE, show_default=True)
+@with_appcontext
+def archive_logs_command(days, batch_size):
+    """Move old system logs into gzip JSONL archives."""
+    moved = apply_retention(days, batch_size)
+    click.echo(f"✅ archived {moved} log rows into {archive_dir()}")
+
+
+def init_log_archive_cli(app) -> None:
+    app.config.setdefault(
+        "LOG_RETENTION_DAYS", int(os.environ.get("LOG_RETENTION_DAYS", DEFAULT_RETENTION_DAYS))
+    )
+    app.cli.add_command(archive_logs_command)
@@ -0,0 +1,216 @@
+"""
+Request-level performance instrumentation.
+
+For every request we record, per endpoint (e.g. "admin.reports"):
+  - latency histogram
+  - number of SQL statements and total SQL time (SQLAlchemy cursor events)
+  - template render time (Flask template signals)
+  - response size
+
+The numbers are exposed in Prometheus text format by admin.metrics.
+Requests slower than METRICS_SLOW_REQUEST_MS are logged together with their
+slowest SQL statements (sampled with METRICS_SLOW_SAMPLE_RATE).
+
+Streamed pages (app.streaming) run their queries while the body is sent, so
+they are recorded when the body is closed: latency to the last byte, bytes
+actually sent.
+
+Metrics are kept per process; with several workers each one reports its own.
+"""
+import random
+import threading
+import time
+
+from flask import g, has_request_context, request, before_render_template, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# max SQL statements kept per request for the slow-request log
+MAX_SQL_SAMPLES = 50
+
+
+class _EndpointStats:
+    __slots__ = ("blueprint", "buckets", "count", "latency_sum",
+                 "sql_count", "sql_seconds", "template_seconds", "response_bytes")
+
+    def __init__(self, blueprint):
+        self.blueprint = blueprint
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.latency_sum = 0.0
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.response_bytes = 0
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def observe(self, endpoint, blueprint, latency, sql_count, sql_seconds, template_seconds, response_bytes):
+        with self._lock:
+            st = self._stats.get(endpoint)
+            if st is None:
+                st = self._stats[endpoint] = _EndpointStats(blueprint)
+            for i, le in enumerate(LATENCY_BUCKETS):
+                if latency <= le:
+                    st.buckets[i] += 1
+            st.count += 1
+            st.latency_sum += latency
+            st.sql_count += sql_count
+            st.sql_seconds += sql_seconds
+            st.template_seconds += template_seconds
+            st.response_bytes += response_bytes
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            items = sorted(self._stats.items())
+
+        def labels(endpoint, st, extra=""):
+            return f'endpoint="{endpoint}",blueprint="{st.blueprint}"{extra}'
+
+        lines = [
+            "# HELP http_request_duration_seconds Request latency per endpoint.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for endpoint, st in items:
+            for le, n in zip(LATENCY_BUCKETS, st.buckets):
+                le_label = ',le="%s"' % le
+                lines.append(f"http_request_duration_seconds_bucket{{{labels(endpoint, st, le_label)}}} {n}")
+            inf_label = ',le="+Inf"'
+            lines.append(f"http_request_duration_seconds_bucket{{{labels(endpoint, st, inf_label)}}} {st.count}")
+            lines.append(f"http_request_duration_seconds_sum{{{labels(endpoint, st)}}} {st.latency_sum:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels(endpoint, st)}}} {st.count}")
+
+        counters = (
+            ("http_sql_statements_total", "SQL statements executed.", "sql_count", "{}"),
+            ("http_sql_seconds_total", "Time spent in SQL.", "sql_seconds", "{:.6f}"),
+            ("http_template_render_seconds_total", "Time spent rendering templates.", "template_seconds", "{:.6f}"),
+            ("http_response_bytes_total", "Response body bytes.", "response_bytes", "{}"),
+        )
+        for name, help_text, attr, fmt in counters:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for endpoint, st in items:
+                lines.append(f"{name}{{{labels(endpoint, st)}}} {fmt.format(getattr(st, attr))}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# =========================
+# SQL HOOKS (every engine: primary and replica)
+# =========================
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+
+    if not has_request_context() or "metrics_start" not in g:
+        return
+    g.metrics_sql_count += 1
+    g.metrics_sql_seconds += elapsed
+    if len(g.metrics_sql) < MAX_SQL_SAMPLES:
+        g.metrics_sql.append((elapsed, statement))
+
+
+# =========================
+# TEMPLATE HOOKS
+# =========================
+def _before_render(sender, template, context, **extra):
+    if has_request_context() and "metrics_start" in g:
+        g.metrics_template_stack.append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    if has_request_context() and "metrics_start" in g and g.metrics_template_stack:
+        g.metrics_template_seconds += time.perf_counter() - g.metrics_template_stack.pop()
+
+
+# =========================
+# SETUP
+# =========================
+def init_metrics(app) -> None:
+    app.config.setdefault("METRICS_ENABLED", True)
+    app.config.setdefault("METRICS_SLOW_REQUEST_MS", 500)
+    app.config.setdefault("METRICS_SLOW_SAMPLE_RATE", 1.0)
+
+    if not app.config["METRICS_ENABLED"]:
+        return
+
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+
+    @app.before_request
+    def _metrics_start():
+        g.metrics_start = time.perf_counter()
+        g.metrics_sql_count = 0
+        g.metrics_sql_seconds = 0.0
+        g.metrics_sql = []
+        g.metrics_template_stack = []
+        g.metrics_template_seconds = 0.0
+
+    def _record(state, endpoint, blueprint, method, path, latency, size):
+        registry.observe(
+            endpoint, blueprint, latency,
+            state.metrics_sql_count, state.metrics_sql_seconds, state.metrics_template_seconds, size
+        )
+
+        slow_ms = app.config["METRICS_SLOW_REQUEST_MS"]
+        if latency * 1000 >= slow_ms and random.random() < app.config["METRICS_SLOW_SAMPLE_RATE"]:
+            worst = sorted(state.metrics_sql, key=lambda x: x[0], reverse=True)[:5]
+            sql_lines = "\n".join(f"  {t * 1000:.1f} ms  {' '.join(s.split())[:300]}" for t, s in worst)
+            app.logger.warning(
+                "SLOW REQUEST %s %s (%s) %.1f ms, %d SQL (%.1f ms), templates %.1f ms\n%s",
+                method, path, endpoint, latency * 1000,
+                state.metrics_sql_count, state.metrics_sql_seconds * 1000,
+                state.metrics_template_seconds * 1000, sql_lines
+            )
+
+    @app.after_request
+    def _metrics_finish(response):
+        if "metrics_start" not in g:
+            return response
+
+        # g of this request; stream_with_context keeps the same g while a
+        # streamed body runs, so its SQL and template time still land here
+        state = g._get_current_object()
+        args = (request.endpoint or "unmatched", request.blueprint or "app", request.method, request.path)
+
+        if not response.is_streamed:
+            _record(state, *args, time.perf_counter() - state.metrics_start, response.content_length or 0)
+            return response
+
+        # streamed pages (app.streaming) query and render while the body is
+        # sent: record once it is closed, with the bytes actually sent
+        sent = [0]
+
+        def counted(chunks, original):
+            try:
+                for chunk in chunks:
+                    sent[0] += len(chunk)
+                    yield chunk
+            finally:
+                if hasattr(original, "close"):
+                    original.close()
+
+        # bind the original body now, before response.response is replaced
+        response.response = counted(response.iter_encoded(), response.response)
+        response.call_on_close(
+            lambda: _record(state, *args, time.perf_counter() - state.metrics_start, sent[0])
+        )
+        return response
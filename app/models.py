@@ -1,7 +1,11 @@
 from app.extensions import db
 from flask_login import UserMixin
-from datetime import datetime
-from sqlalchemy.dialects.postgresql import JSON
+from datetime import datetime, time, timedelta
+from sqlalchemy.dialects.postgresql import JSONB
+
+
+# Plain JSON (TEXT) on SQLite, indexable JSONB on PostgreSQL
+JSONType = db.JSON().with_variant(JSONB(), "postgresql")
 
 
 # =========================
@@ -24,10 +28,26 @@ class Scholarship(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
-    eligibility_criteria = db.Column(db.JSON)
+    eligibility_criteria = db.Column(JSONType)
     application_deadline = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     documents_required = db.Column(db.Text)  # comma-separated list
+    # set by the close_deadlines job (app/scheduler.py)
+    closed_at = db.Column(db.DateTime, nullable=True)
+
+    @property
+    def closes_at(self):
+        """End of submissions: a date-only deadline includes the whole day."""
+        deadline = self.application_deadline
+        if deadline is None:
+            return None
+        if deadline.time() == time.min:
+            return deadline + timedelta(days=1)
+        return deadline
+
+    def accepting_applications(self, now=None) -> bool:
+        closes_at = self.closes_at
+        return closes_at is None or (now or datetime.utcnow()) < closes_at
 
 
 # =========================
@@ -35,7 +55,14 @@ class Scholarship(db.Model):
 # =========================
 class Application(db.Model):
     __tablename__ = 'application'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # GIN index for containment queries on form_data (PostgreSQL only)
+        db.Index(
+            'ix_application_form_data_gin', 'form_data',
+            postgresql_using='gin'
+        ).ddl_if(dialect='postgresql'),
+        {'extend_existing': True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -48,11 +75,16 @@ class Application(db.Model):
     status = db.Column(db.String(50), default="Pending")
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # optimistic locking: bumped on every UPDATE, stale writers get StaleDataError
+    version = db.Column(db.Integer, nullable=False, default=1)
+
     reviews = db.relationship('Review', backref='application', lazy=True)
     scholarship = db.relationship('Scholarship', backref='applications')
     student = db.relationship('User', foreign_keys=[student_id], backref='applications')
 
-    form_data = db.Column(JSON)
+    form_data = db.Column(JSONType)
+
+    __mapper_args__ = {'version_id_col': version}
 
 
 # =========================
@@ -74,13 +106,25 @@ class Review(db.Model):
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
     reviewed_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    version = db.Column(db.Integer, nullable=False, default=1)
+
     reviewer = db.relationship('User', backref='reviews')
 
+    __mapper_args__ = {'version_id_col': version}
+
 
 # =========================
 # SYSTEM LOGS
 # =========================
 class SystemLog(db.Model):
+    __table_args__ = (
+        # newest-first listing, keyset pagination on (created_at, id)
+        db.Index('ix_system_log_created', 'created_at', 'id'),
+        db.Index('ix_system_log_level_created', 'level', 'created_at'),
+        db.Index('ix_system_log_action_created', 'action', 'created_at'),
+        db.Index('ix_system_log_user_created', 'user_id', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
     level = db.Column(db.String(20), default="info", nullable=False)
@@ -91,3 +135,182 @@ class SystemLog(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
     user = db.relationship("User", backref="system_logs", lazy=True)
+
+
+# =========================
+# APPLICATION RANKING (precomputed, one row per application)
+# =========================
+class ApplicationRanking(db.Model):
+    __tablename__ = 'application_ranking'
+    __table_args__ = (
+        db.Index('ix_ranking_scholarship_rank', 'scholarship_id', 'rank'),
+        {'extend_existing': True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    scholarship_id = db.Column(db.Integer, db.ForeignKey('scholarship.id'), nullable=False)
+    application_id = db.Column(db.Integer, db.ForeignKey('application.id'), unique=True, nullable=False)
+
+    # score used for ordering: raw average, or mean z-score when normalized
+    score = db.Column(db.Float)
+    raw_avg = db.Column(db.Float)
+    review_count = db.Column(db.Integer, default=0, nullable=False)
+    fail_count = db.Column(db.Integer, default=0, nullable=False)
+    submitted_at = db.Column(db.DateTime)
+
+    rank = db.Column(db.Integer)
+    normalized = db.Column(db.Boolean, default=False, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    application = db.relationship('Application', backref=db.backref('ranking', uselist=False))
+
+
+# =========================
+# REPORT ROLLUPS (pre-aggregated admin reports)
+# =========================
+# dimension = "scholarship" (key_id = scholarship id, day = submission day),
+#             "reviewer"    (key_id = reviewer id,    day = review day),
+#             "all"         (key_id = 0,              day = submission day)
+class ReportDaily(db.Model):
+    __tablename__ = 'report_daily'
+    __table_args__ = (
+        db.UniqueConstraint('dimension', 'key_id', 'day', name='uq_report_daily_key'),
+        db.Index('ix_report_daily_dimension_day', 'dimension', 'day'),
+        {'extend_existing': True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    dimension = db.Column(db.String(20), nullable=False)
+    key_id = db.Column(db.Integer, nullable=False)
+    day = db.Column(db.Date, nullable=False)
+
+    submitted = db.Column(db.Integer, default=0, nullable=False)
+    accepted = db.Column(db.Integer, default=0, nullable=False)
+    rejected = db.Column(db.Integer, default=0, nullable=False)
+    reviews = db.Column(db.Integer, default=0, nullable=False)
+    # sum of (review.reviewed_at - application.submitted_at) over completed reviews
+    turnaround_seconds = db.Column(db.Float, default=0.0, nullable=False)
+
+
+class ReportTotal(db.Model):
+    __tablename__ = 'report_total'
+    __table_args__ = (
+        db.UniqueConstraint('dimension', 'key_id', name='uq_report_total_key'),
+        {'extend_existing': True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    dimension = db.Column(db.String(20), nullable=False)
+    key_id = db.Column(db.Integer, nullable=False)
+
+    submitted = db.Column(db.Integer, default=0, nullable=False)
+    accepted = db.Column(db.Integer, default=0, nullable=False)
+    rejected = db.Column(db.Integer, default=0, nullable=False)
+    reviews = db.Column(db.Integer, default=0, nullable=False)
+    turnaround_seconds = db.Column(db.Float, default=0.0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ReportDirtyKey(db.Model):
+    """Rollup keys touched by a write, waiting to be recomputed."""
+    __tablename__ = 'report_dirty_key'
+    __table_args__ = {'extend_existing': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    # "scholarship" / "reviewer" (day set) or "application" (key_id = application id)
+    dimension = db.Column(db.String(20), nullable=False)
+    key_id = db.Column(db.Integer, nullable=False)
+    day = db.Column(db.Date, nullable=True)
+
+
+# =========================
+# LIVE DASHBOARD CHANGES (app/live_updates.py)
+# =========================
+class LiveChange(db.Model):
+    """A write the live dashboards should hear about (shared by all worker processes)."""
+    __tablename__ = 'live_change'
+    __table_args__ = (
+        db.Index('ix_live_change_created_at', 'created_at'),
+        {'extend_existing': True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # "review" / "decision" / "status"
+    kind = db.Column(db.String(20), nullable=False)
+    application_id = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+# =========================
+# NOTIFICATION OUTBOX (app/notifications.py digests)
+# =========================
+class NotificationOutbox(db.Model):
+    """One line of a recipient's next digest mail."""
+    __tablename__ = 'notification_outbox'
+    __table_args__ = (
+        db.Index('ix_notification_outbox_pending', 'sent_at', 'recipient_id'),
+        {'extend_existing': True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipient_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    # "assignment" / "status"
+    kind = db.Column(db.String(20), nullable=False)
+    application_id = db.Column(db.Integer, nullable=True)
+    message = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+
+
+# =========================
+# SCHEDULED JOBS (app/scheduler.py)
+# =========================
+class ScheduledJob(db.Model):
+    """Persistent state and lease of one background job."""
+    __tablename__ = 'scheduled_job'
+    __table_args__ = {'extend_existing': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(64), unique=True, nullable=False)
+
+    next_run_at = db.Column(db.DateTime, nullable=False)
+    # lease: the process running the job and until when it may hold it
+    locked_by = db.Column(db.String(120), nullable=True)
+    locked_until = db.Column(db.DateTime, nullable=True)
+
+    last_started_at = db.Column(db.DateTime, nullable=True)
+    last_finished_at = db.Column(db.DateTime, nullable=True)
+    last_status = db.Column(db.String(20), nullable=True)   # "ok" / "error"
+    last_result = db.Column(db.Text, nullable=True)
+    last_duration = db.Column(db.Float, nullable=True)
+    run_count = db.Column(db.Integer, default=0, nullable=False)
+    error_count = db.Column(db.Integer, default=0, nullable=False)
+
+
+# =========================
+# APPLICATION DRAFTS (app/drafts.py)
+# =========================
+class ApplicationDraft(db.Model):
+    """A student's unsubmitted application: autosaved form data + uploaded documents."""
+    __tablename__ = 'application_draft'
+    __table_args__ = (
+        db.UniqueConstraint('student_id', 'scholarship_id', name='uq_application_draft_student_scholarship'),
+        db.Index('ix_application_draft_updated_at', 'updated_at'),
+        {'extend_existing': True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    scholarship_id = db.Column(db.Integer, db.ForeignKey('scholarship.id'), nullable=False)
+
+    form_data = db.Column(JSONType)
+    # document field -> stored path ("uploads/<file>"), e.g. {"photo": "uploads/7_..._me.jpg"}
+    documents = db.Column(JSONType)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    version = db.Column(db.Integer, nullable=False, default=1)
+
+    __mapper_args__ = {'version_id_col': version}
@@ -1,6 +1,288 @@
-from flask_mail import Message
-from app import mail
+"""
+Notification digests.
+
+Events are not mailed one by one. queue_notification() adds a line to the
+recipient's outbox (notification_outbox) in the caller's transaction:
+
+  - "assignment": a reviewer was assigned to an application (admin)
+  - "status":     a student's application changed status (admin / committee)
+
+send_due_digests() then sends ONE message per recipient with everything
+queued for them, once their oldest queued line is DIGEST_WINDOW_MINUTES old,
+so a bulk intake of thousands of assignments is one mail per reviewer. All
+digests of a run go through the same SMTP connection (reconnected every
+MAIL_MAX_PER_CONNECTION messages, or when the server drops it).
+
+Lines are marked sent right after their message went out; if the process
+dies in between, that digest is sent again (duplicates are possible, loss is
+not).
+
+Transports (MAIL_TRANSPORT):
+  smtp  MAIL_SERVER, MAIL_PORT, MAIL_USERNAME, MAIL_PASSWORD, MAIL_USE_TLS,
+        MAIL_USE_SSL, MAIL_DEFAULT_SENDER
+  file  every message is written as an .eml file to instance/mail_outbox/
+        (default when MAIL_SERVER is not set: local development and tests)
+
+Digests are sent by the send_digests job of app.scheduler every
+DIGEST_INTERVAL seconds, or by hand:
+
+    flask --app run:create_app send-digests [--all]
+"""
+import os
+import smtplib
+import uuid
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models import NotificationOutbox, User
+
+DEFAULT_WINDOW_MINUTES = 15
+DEFAULT_INTERVAL = 60
+DEFAULT_BATCH = 200            # recipients per run
+DEFAULT_MAX_PER_CONNECTION = 100
+MAX_ATTEMPTS = 5
+
+SECTIONS = (
+    ("assignment", "New review assignments"),
+    ("status", "Application status changes"),
+)
+
+
+# =========================
+# QUEUE
+# =========================
+def queue_notification(recipient_id, kind, message, application_id=None) -> None:
+    """Add a line to the recipient's next digest. Committed with the caller's transaction."""
+    if recipient_id is None:
+        return
+    db.session.add(NotificationOutbox(
+        recipient_id=recipient_id, kind=kind, message=message, application_id=application_id
+    ))
+
+
+# =========================
+# TRANSPORTS
+# =========================
+class FileTransport:
+    """Writes each message as an .eml file (development / tests)."""
+
+    def __init__(self, folder):
+        self.folder = folder
+
+    def open(self):
+        os.makedirs(self.folder, exist_ok=True)
+
+    def send(self, msg):
+        name = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.eml"
+        tmp = os.path.join(self.folder, name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(msg.as_bytes())
+        os.replace(tmp, os.path.join(self.folder, name))
+
+    def close(self):
+        pass
+
+
+class SmtpTransport:
+    """One SMTP connection reused for many messages."""
+
+    def __init__(self, host, port=25, username=None, password=None, use_tls=False, use_ssl=False,
+                 timeout=30, max_per_connection=DEFAULT_MAX_PER_CONNECTION):
+        self.host, self.port = host, port
+        self.username, self.password = username, password
+        self.use_tls, self.use_ssl = use_tls, use_ssl
+        self.timeout = timeout
+        self.max_per_connection = max_per_connection
+        self._conn = None
+        self._sent = 0
+
+    def open(self):
+        cls = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        self._conn = cls(self.host, self.port, timeout=self.timeout)
+        if self.use_tls and not self.use_ssl:
+            self._conn.starttls()
+        if self.username:
+            self._conn.login(self.username, self.password or "")
+        self._sent = 0
+
+    def send(self, msg):
+        if self._conn is None or self._sent >= self.max_per_connection:
+            self.close()
+            self.open()
+        try:
+            self._conn.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # idle / per-session limits: reconnect once
+            self.open()
+            self._conn.send_message(msg)
+        self._sent += 1
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.quit()
+            except OSError:   # smtplib.SMTPException included
+                pass
+            self._conn = None
+
+
+def make_transport(app=None):
+    app = app or current_app
+    cfg = app.config
+    if cfg["MAIL_TRANSPORT"] == "smtp":
+        return SmtpTransport(
+            cfg["MAIL_SERVER"], cfg["MAIL_PORT"], cfg.get("MAIL_USERNAME"), cfg.get("MAIL_PASSWORD"),
+            use_tls=cfg["MAIL_USE_TLS"], use_ssl=cfg["MAIL_USE_SSL"],
+            max_per_connection=cfg["MAIL_MAX_PER_CONNECTION"],
+        )
+    return FileTransport(cfg.get("MAIL_OUTBOX_DIR") or os.path.join(app.instance_path, "mail_outbox"))
+
+
+def _message(to, subject, body):
+    msg = EmailMessage()
+    msg["From"] = current_app.config["MAIL_DEFAULT_SENDER"]
+    msg["To"] = to
+    msg["Subject"] = subject
+    msg["Date"] = formatdate(localtime=True)
+    msg["Message-ID"] = make_msgid()
+    msg.set_content(body)
+    return msg
+
 
 def send_notification(user_email, subject, body):
-    msg = Message(subject, recipients=[user_email], body=body)
-    mail.send(msg)
+    """Send one message right away (prefer queue_notification for anything bulk)."""
+    transport = make_transport()
+    transport.open()
+    try:
+        transport.send(_message(user_email, subject, body))
+    finally:
+        transport.close()
+
+
+# =========================
+# DIGESTS
+# =========================
+def _digest_body(user, lines):
+    parts = [f"Hello {user.username},", ""]
+    for kind, title in SECTIONS:
+        seen, items = set(), []
+        for line in lines:
+            if line.kind == kind and line.message not in seen:
+                seen.add(line.message)
+                items.append(f"  - {line.message}")
+        if items:
+            parts += [f"{title} ({len(items)}):"] + items + [""]
+    parts.append("Log in to the Scholarship System for details.")
+    return "\n".join(parts)
+
+
+def due_recipients(now=None, window_minutes=None, limit=DEFAULT_BATCH, send_all=False):
+    """Recipients whose oldest unsent line is older than the digest window."""
+    now = now or datetime.utcnow()
+    if window_minutes is None:
+        window_minutes = current_app.config["DIGEST_WINDOW_MINUTES"]
+    q = (
+        db.session.query(NotificationOutbox.recipient_id)
+        .filter(NotificationOutbox.sent_at.is_(None), NotificationOutbox.attempts < MAX_ATTEMPTS)
+        .group_by(NotificationOutbox.recipient_id)
+        .order_by(func.min(NotificationOutbox.created_at))
+    )
+    if not send_all:
+        q = q.having(func.min(NotificationOutbox.created_at) <= now - timedelta(minutes=window_minutes))
+    return [r[0] for r in q.limit(limit).all()]
+
+
+def send_due_digests(transport=None, send_all=False, limit=DEFAULT_BATCH) -> dict:
+    """
+    Send one digest per due recipient. Returns {"recipients", "sent",
+    "lines", "failed"}; "recipients" also counts those without an address.
+    """
+    recipients = due_recipients(send_all=send_all, limit=limit)
+    result = {"recipients": len(recipients), "sent": 0, "lines": 0, "failed": 0}
+    if not recipients:
+        return result
+
+    users = {u.id: u for u in User.query.filter(User.id.in_(recipients)).all()}
+    transport = transport or make_transport()
+    transport.open()
+    try:
+        for recipient_id in recipients:
+            lines = (
+                NotificationOutbox.query
+                .filter(
+                    NotificationOutbox.recipient_id == recipient_id,
+                    NotificationOutbox.sent_at.is_(None),
+                    NotificationOutbox.attempts < MAX_ATTEMPTS,
+                )
+                .order_by(NotificationOutbox.id)
+                .all()
+            )
+            user = users.get(recipient_id)
+            now = datetime.utcnow()
+            if user is None or not user.email:
+                # nobody to send to: drop the lines instead of retrying forever
+                for line in lines:
+                    line.sent_at = now
+                db.session.commit()
+                continue
+
+            subject = f"Scholarship System: {len(lines)} update{'s' if len(lines) != 1 else ''}"
+            try:
+                transport.send(_message(user.email, subject, _digest_body(user, lines)))
+            except OSError:   # smtplib.SMTPException included
+                for line in lines:
+                    line.attempts += 1
+                db.session.commit()
+                result["failed"] += 1
+                continue
+
+            for line in lines:
+                line.sent_at = now
+            db.session.commit()
+            result["sent"] += 1
+            result["lines"] += len(lines)
+    finally:
+        transport.close()
+    return result
+
+
+# =========================
+# CLI
+# =========================
+@click.command("send-digests")
+@click.option("--all", "send_all", is_flag=True, help="ignore the digest window and send everything queued")
+@with_appcontext
+def send_digests_command(send_all):
+    """Send queued notifications as one digest mail per recipient."""
+    total = {"recipients": 0, "sent": 0, "lines": 0, "failed": 0}
+    while True:
+        result = send_due_digests(send_all=send_all)
+        for key in total:
+            total[key] += result[key]
+        if result["recipients"] < DEFAULT_BATCH:
+            break
+    click.echo(f"✅ {total['sent']} digests sent ({total['lines']} notifications), {total['failed']} failed")
+
+
+def init_notifications(app) -> None:
+    cfg = app.config
+    cfg.setdefault("MAIL_SERVER", os.environ.get("MAIL_SERVER"))
+    cfg.setdefault("MAIL_PORT", int(os.environ.get("MAIL_PORT", 25)))
+    cfg.setdefault("MAIL_USERNAME", os.environ.get("MAIL_USERNAME"))
+    cfg.setdefault("MAIL_PASSWORD", os.environ.get("MAIL_PASSWORD"))
+    cfg.setdefault("MAIL_USE_TLS", os.environ.get("MAIL_USE_TLS", "0") == "1")
+    cfg.setdefault("MAIL_USE_SSL", os.environ.get("MAIL_USE_SSL", "0") == "1")
+    cfg.setdefault("MAIL_DEFAULT_SENDER", os.environ.get("MAIL_DEFAULT_SENDER", "no-reply@scholarship.local"))
+    cfg.setdefault("MAIL_TRANSPORT", os.environ.get("MAIL_TRANSPORT") or ("smtp" if cfg["MAIL_SERVER"] else "file"))
+    cfg.setdefault("MAIL_MAX_PER_CONNECTION", int(os.environ.get("MAIL_MAX_PER_CONNECTION", DEFAULT_MAX_PER_CONNECTION)))
+    cfg.setdefault("DIGEST_WINDOW_MINUTES", int(os.environ.get("DIGEST_WINDOW_MINUTES", DEFAULT_WINDOW_MINUTES)))
+    cfg.setdefault("DIGEST_INTERVAL", int(os.environ.get("DIGEST_INTERVAL", DEFAULT_INTERVAL)))
+
+    app.cli.add_command(send_digests_command)
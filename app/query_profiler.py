@@ -0,0 +1,304 @@
+"""
+SQL query profiler: `flask query-plans`.
+
+Calls every GET route of every blueprint through the test client (logged in
+with an existing account of the matching role), captures each distinct SQL
+statement and runs EXPLAIN QUERY PLAN on it. Statements are flagged for:
+
+  - full table scans        ("SCAN <table>" without an index)
+  - temp B-trees            ("USE TEMP B-TREE FOR ORDER BY / GROUP BY / DISTINCT")
+  - correlated subqueries   ("CORRELATED ... SUBQUERY")
+
+and printed as a ranked report (worst first).
+
+CI gate:
+
+    flask --app run:create_app query-plans --update-baseline   # accept current scans
+    flask --app run:create_app query-plans --check             # exit 1 on a NEW scan
+
+A new scan = a full table scan on a hot table (--hot-table, repeatable) that
+is not listed in the baseline file for that route.
+
+Only read-only (GET) routes are exercised; SQLite only (EXPLAIN QUERY PLAN).
+"""
+import json
+import os
+import re
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.extensions import db
+from app.models import User, Application, Scholarship
+
+
+DEFAULT_HOT_TABLES = ("application", "review", "system_log", "user", "application_ranking")
+DEFAULT_BASELINE = "query_plan_baseline.json"
+
+# endpoints that must not be called (side effects)
+SKIP_ENDPOINTS = {"static", "assets", "auth.logout", "live_dashboard"}
+
+# extra query strings worth profiling (each is its own code path)
+EXTRA_QUERIES = {
+    "committee.applications": [
+        "status=Submitted", "status=Reviewed", "status=Accepted", "status=Rejected",
+        "fail=1", "sort=avg_score_desc", "sort=avg_score_asc",
+    ],
+    "reviewer.applications_list": ["sort=date", "sort=status"],
+}
+
+# blueprint -> role used to log in
+BLUEPRINT_ROLES = {
+    "student": "student",
+    "reviewer": "reviewer",
+    "committee": "committee",
+    "admin": "admin",
+}
+
+SEVERITY = {"full_scan": 10, "hot_scan": 20, "correlated": 5, "temp_btree": 3}
+
+_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(\w+)(.*)$")
+
+
+# =========================
+# CAPTURE
+# =========================
+class _Capture:
+    def __init__(self):
+        self.endpoint = None
+        self.statements = {}   # sql -> info dict
+
+    def before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("qp_start", []).append(time.perf_counter())
+
+    def after(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("qp_start")
+        elapsed = time.perf_counter() - starts.pop() if starts else 0.0
+        if executemany or self.endpoint is None:
+            return
+        if not statement.lstrip().upper().startswith("SELECT"):
+            return
+
+        info = self.statements.get(statement)
+        if info is None:
+            info = self.statements[statement] = {
+                "parameters": parameters, "engine": conn.engine,
+                "endpoints": set(), "count": 0, "seconds": 0.0,
+            }
+        info["endpoints"].add(self.endpoint)
+        info["count"] += 1
+        info["seconds"] += elapsed
+
+
+def _sample_ids():
+    """One existing id per path argument name, plus one user per role."""
+    def first(model):
+        return db.session.query(model.id).order_by(model.id).limit(1).scalar()
+
+    ids = {
+        "application_id": first(Application),
+        "app_id": first(Application),
+        "scholarship_id": first(Scholarship),
+        "user_id": first(User),
+    }
+    users = {}
+    for role in set(BLUEPRINT_ROLES.values()):
+        users[role] = db.session.query(User.id).filter(User.role == role).order_by(User.id).limit(1).scalar()
+    return ids, users
+
+
+def _urls_to_profile(app, ids):
+    """Yield (endpoint, blueprint, url) for every GET route we can fill in."""
+    with app.test_request_context():
+        from flask import url_for
+
+        for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.endpoint):
+            if rule.endpoint in SKIP_ENDPOINTS or "GET" not in rule.methods:
+                continue
+            args = {}
+            for name in rule.arguments:
+                if ids.get(name) is None:
+                    break
+                args[name] = ids[name]
+            else:
+                url = url_for(rule.endpoint, **args)
+                blueprint = rule.endpoint.split(".", 1)[0] if "." in rule.endpoint else None
+                yield rule.endpoint, blueprint, url
+                for qs in EXTRA_QUERIES.get(rule.endpoint, []):
+                    yield f"{rule.endpoint}?{qs}", blueprint, f"{url}?{qs}"
+
+
+# =========================
+# ANALYSIS
+# =========================
+def explain(engine, statement, parameters):
+    """EXPLAIN QUERY PLAN rows as plain 'detail' strings (SQLite only)."""
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute("EXPLAIN QUERY PLAN " + statement, parameters or ())
+        rows = cur.fetchall()
+        cur.close()
+    finally:
+        raw.close()
+    return [row[-1] for row in rows]
+
+
+def classify(plan, hot_tables):
+    """Return a list of (flag, detail) for one query plan."""
+    flags = []
+    for detail in plan:
+        text = detail.strip()
+        m = _SCAN_RE.match(text)
+        if m and "INDEX" not in m.group(2) and "VIRTUAL TABLE" not in m.group(2):
+            table = m.group(1)
+            flags.append(("hot_scan" if table in hot_tables else "full_scan", table))
+        if "TEMP B-TREE" in text:
+            flags.append(("temp_btree", text))
+        if "CORRELATED" in text:
+            flags.append(("correlated", text))
+    return flags
+
+
+def profile_routes(app, hot_tables=DEFAULT_HOT_TABLES):
+    """Exercise every GET route and return the ranked list of analysed statements."""
+    capture = _Capture()
+    ids, users = _sample_ids()
+    errors = []
+
+    # listen on every engine: replica-routed views run on their own engine
+    event.listen(Engine, "before_cursor_execute", capture.before)
+    event.listen(Engine, "after_cursor_execute", capture.after)
+    try:
+        for endpoint, blueprint, url in list(_urls_to_profile(app, ids)):
+            client = app.test_client()
+            role = BLUEPRINT_ROLES.get(blueprint)
+            if role:
+                if users.get(role) is None:
+                    errors.append(f"{endpoint}: no '{role}' account to log in with")
+                    continue
+                with client.session_transaction() as sess:
+                    sess["_user_id"] = str(users[role])
+                    sess["_fresh"] = True
+
+            # a fresh app context (and g) per request: the CLI's own context
+            # would keep flask_login's cached user from the first request
+            with app.app_context():
+                capture.endpoint = endpoint
+                resp = client.get(url)
+                # read the body inside: streamed pages (app.streaming) query while it is sent
+                resp.get_data()
+                resp.close()
+                capture.endpoint = None
+            if not 200 <= resp.status_code < 300:
+                errors.append(f"{endpoint}: HTTP {resp.status_code}")
+    finally:
+        event.remove(Engine, "before_cursor_execute", capture.before)
+        event.remove(Engine, "after_cursor_execute", capture.after)
+
+    report = []
+    for sql, info in capture.statements.items():
+        if info["engine"].dialect.name != "sqlite":
+            continue
+        try:
+            plan = explain(info["engine"], sql, info["parameters"])
+        except Exception as e:
+            plan = [f"(explain failed: {e})"]
+        flags = classify(plan, hot_tables)
+        score = sum(SEVERITY[f] for f, _ in flags) * len(info["endpoints"]) + info["seconds"] * 1000
+        report.append({
+            "sql": " ".join(sql.split()),
+            "endpoints": sorted(info["endpoints"]),
+            "count": info["count"],
+            "ms": round(info["seconds"] * 1000, 2),
+            "plan": plan,
+            "flags": flags,
+            "score": round(score, 2),
+        })
+
+    report.sort(key=lambda r: r["score"], reverse=True)
+    return report, errors
+
+
+def hot_scans(report):
+    """{endpoint: sorted [table, ...]} of full scans on hot tables."""
+    scans = {}
+    for r in report:
+        tables = {t for flag, t in r["flags"] if flag == "hot_scan"}
+        for ep in r["endpoints"]:
+            scans.setdefault(ep, set()).update(tables)
+    return {ep: sorted(t) for ep, t in scans.items() if t}
+
+
+def new_hot_scans(report, baseline):
+    found = hot_scans(report)
+    new = {}
+    for ep, tables in found.items():
+        extra = sorted(set(tables) - set(baseline.get(ep, [])))
+        if extra:
+            new[ep] = extra
+    return new
+
+
+# =========================
+# CLI
+# =========================
+@click.command("query-plans")
+@click.option("--hot-table", "hot_tables", multiple=True, help="tables where a scan fails --check")
+@click.option("--baseline", default=None, help=f"baseline file (default: instance/{DEFAULT_BASELINE})")
+@click.option("--update-baseline", is_flag=True, help="accept the current hot-table scans")
+@click.option("--check", is_flag=True, help="exit 1 when a new hot-table scan appears")
+@click.option("--json", "json_path", default=None, help="write the full report as JSON")
+@click.option("--limit", default=30, show_default=True, help="statements shown in the report")
+@with_appcontext
+def query_plans_command(hot_tables, baseline, update_baseline, check, json_path, limit):
+    """Profile SQL of every GET route with EXPLAIN QUERY PLAN."""
+    app = current_app._get_current_object()
+    hot_tables = tuple(hot_tables) or DEFAULT_HOT_TABLES
+    baseline = baseline or os.path.join(app.instance_path, DEFAULT_BASELINE)
+
+    report, errors = profile_routes(app, hot_tables)
+
+    click.echo(f"{len(report)} distinct SELECT statements\n")
+    for i, r in enumerate(report[:limit], start=1):
+        flags = ", ".join(sorted({f"{flag}:{t}" if flag.endswith("scan") else flag for flag, t in r["flags"]})) or "ok"
+        click.echo(f"#{i}  score={r['score']}  {r['count']}x  {r['ms']} ms  [{flags}]")
+        click.echo(f"    routes: {', '.join(r['endpoints'])}")
+        click.echo(f"    sql:    {r['sql'][:400]}")
+        for line in r["plan"]:
+            click.echo(f"      {line}")
+        click.echo("")
+
+    for e in errors:
+        click.echo(f"⚠️  {e}")
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+    if update_baseline:
+        with open(baseline, "w") as f:
+            json.dump(hot_scans(report), f, indent=2, sort_keys=True)
+        click.echo(f"baseline written to {baseline}")
+        return
+
+    if check:
+        known = {}
+        if os.path.exists(baseline):
+            with open(baseline) as f:
+                known = json.load(f)
+        new = new_hot_scans(report, known)
+        if new:
+            click.echo("\n❌ NEW FULL SCANS ON HOT TABLES:")
+            for ep, tables in sorted(new.items()):
+                click.echo(f"   {ep}: {', '.join(tables)}")
+            raise SystemExit(1)
+        click.echo("✅ no new full scans on hot tables")
+
+
+def init_query_profiler_cli(app) -> None:
+    app.cli.add_command(query_plans_command)
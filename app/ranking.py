@@ -0,0 +1,330 @@
+"""
+Per-scholarship ranking of applications.
+
+Scores from every reviewer are combined into one precomputed table
+(ApplicationRanking) so the committee can ask for the top-K of a scholarship
+or the rank of one application without aggregating reviews on each request.
+
+Ordering (deterministic, no two applications share a rank):
+  1) higher score first (applications without any score go last)
+  2) more reviews first
+  3) fewer fails first
+  4) earlier submission first
+  5) lower application id first
+
+With RANKING_NORMALIZE enabled, every reviewer's scores are turned into
+z-scores within the scholarship before averaging, so harsh and lenient
+reviewers count the same.
+"""
+from datetime import datetime
+from math import sqrt
+
+from flask import current_app
+from sqlalchemy import and_, func, or_
+
+from app.extensions import db
+from app.models import Application, Review, ApplicationRanking
+
+
+def _normalize_enabled() -> bool:
+    return bool(current_app.config.get("RANKING_NORMALIZE", False))
+
+
+def _is_fail(score, decision) -> bool:
+    return (score is not None and score < 50) or decision == "Fail"
+
+
+def _sort_key(row):
+    """row: (application_id, score, review_count, fail_count, submitted_at)"""
+    app_id, score, review_count, fail_count, submitted_at = row
+    return (
+        score is None,
+        -(score or 0.0),
+        -review_count,
+        fail_count,
+        submitted_at or datetime.max,
+        app_id,
+    )
+
+
+def _reviewer_stats(review_rows):
+    """Return {reviewer_id: (mean, std)} from (app_id, reviewer_id, score, decision) rows."""
+    sums = {}
+    for _, reviewer_id, score, _ in review_rows:
+        if score is None:
+            continue
+        n, s, sq = sums.get(reviewer_id, (0, 0.0, 0.0))
+        sums[reviewer_id] = (n + 1, s + score, sq + score * score)
+
+    stats = {}
+    for reviewer_id, (n, s, sq) in sums.items():
+        mean = s / n
+        var = max(sq / n - mean * mean, 0.0)
+        stats[reviewer_id] = (mean, sqrt(var))
+    return stats
+
+
+def _aggregate(review_rows, stats=None):
+    """
+    Combine review rows into {app_id: (score, raw_avg, review_count, fail_count)}.
+    If stats is given, score is the mean z-score, otherwise the raw average.
+    """
+    acc = {}
+    for app_id, reviewer_id, score, decision in review_rows:
+        raw, norm, fails = acc.setdefault(app_id, ([], [], [0]))
+        if _is_fail(score, decision):
+            fails[0] += 1
+        if score is None:
+            continue
+        raw.append(score)
+        if stats is not None:
+            mean, std = stats[reviewer_id]
+            norm.append((score - mean) / std if std > 0 else 0.0)
+
+    result = {}
+    for app_id, (raw, norm, fails) in acc.items():
+        raw_avg = sum(raw) / len(raw) if raw else None
+        if stats is not None:
+            score = sum(norm) / len(norm) if norm else None
+        else:
+            score = raw_avg
+        result[app_id] = (score, raw_avg, len(raw), fails[0])
+    return result
+
+
+def _assign_ranks(rankings):
+    """Sort ranking rows and update rank only where it actually changed."""
+    rankings.sort(key=lambda r: _sort_key(
+        (r.application_id, r.score, r.review_count, r.fail_count, r.submitted_at)
+    ))
+    changed = 0
+    for pos, r in enumerate(rankings, start=1):
+        if r.rank != pos:
+            r.rank = pos
+            changed += 1
+    return changed
+
+
+# =========================
+# FULL REFRESH (one scholarship)
+# =========================
+def refresh_scholarship(scholarship_id: int, normalize=None) -> int:
+    """Recompute every ranking row of a scholarship. Returns number of ranked applications."""
+    if normalize is None:
+        normalize = _normalize_enabled()
+
+    apps = (
+        db.session.query(Application.id, Application.submitted_at)
+        .filter(Application.scholarship_id == scholarship_id)
+        .all()
+    )
+    review_rows = (
+        db.session.query(Review.application_id, Review.reviewer_id, Review.score, Review.decision)
+        .join(Application, Application.id == Review.application_id)
+        .filter(Application.scholarship_id == scholarship_id)
+        .all()
+    )
+
+    stats = _reviewer_stats(review_rows) if normalize else None
+    agg = _aggregate(review_rows, stats)
+
+    existing = {
+        r.application_id: r
+        for r in ApplicationRanking.query.filter_by(scholarship_id=scholarship_id).all()
+    }
+
+    rankings = []
+    for app_id, submitted_at in apps:
+        score, raw_avg, review_count, fail_count = agg.get(app_id, (None, None, 0, 0))
+        r = existing.pop(app_id, None)
+        if r is None:
+            r = ApplicationRanking(scholarship_id=scholarship_id, application_id=app_id)
+            db.session.add(r)
+        r.score = score
+        r.raw_avg = raw_avg
+        r.review_count = review_count
+        r.fail_count = fail_count
+        r.submitted_at = submitted_at
+        r.normalized = bool(normalize)
+        rankings.append(r)
+
+    # applications that were deleted / moved
+    for r in existing.values():
+        db.session.delete(r)
+
+    _assign_ranks(rankings)
+    db.session.commit()
+    return len(rankings)
+
+
+# =========================
+# INCREMENTAL REFRESH (one application changed)
+# =========================
+def _ranked_before(score, review_count, fail_count, submitted_at, application_id):
+    """SQL condition: an ApplicationRanking row sorts before this key (see _sort_key)."""
+    R = ApplicationRanking
+    if submitted_at is None:
+        sub_before, sub_equal = R.submitted_at.isnot(None), R.submitted_at.is_(None)
+    else:
+        sub_before = and_(R.submitted_at.isnot(None), R.submitted_at < submitted_at)
+        sub_equal = R.submitted_at == submitted_at
+
+    tail = or_(
+        R.review_count > review_count,
+        and_(R.review_count == review_count, or_(
+            R.fail_count < fail_count,
+            and_(R.fail_count == fail_count, or_(
+                sub_before,
+                and_(sub_equal, R.application_id < application_id),
+            )),
+        )),
+    )
+    if score is None:
+        return or_(R.score.isnot(None), and_(R.score.is_(None), tail))
+    return or_(R.score > score, and_(R.score == score, tail))
+
+
+def refresh_application(application_id: int) -> None:
+    """
+    Update the ranking after the reviews of one application changed.
+
+    Raw mode only re-aggregates this application's reviews, counts the rows
+    that now sort before it (its new rank) and shifts the ranks between its
+    old and new position with one UPDATE. Normalized mode has to recompute
+    the whole scholarship because the reviewer's mean/std moved too.
+    """
+    app_obj = Application.query.get(application_id)
+    if app_obj is None:
+        return
+
+    normalize = _normalize_enabled()
+    sid = app_obj.scholarship_id
+
+    first = ApplicationRanking.query.filter_by(scholarship_id=sid).first()
+    if normalize or first is None or first.normalized != normalize:
+        refresh_scholarship(sid, normalize=normalize)
+        return
+
+    review_rows = (
+        db.session.query(Review.application_id, Review.reviewer_id, Review.score, Review.decision)
+        .filter(Review.application_id == application_id)
+        .all()
+    )
+    score, raw_avg, review_count, fail_count = _aggregate(review_rows).get(
+        application_id, (None, None, 0, 0)
+    )
+
+    R = ApplicationRanking
+    row = R.query.filter_by(application_id=application_id).first()
+    if row is not None and (row.scholarship_id != sid or row.rank is None):
+        # moved to another scholarship / never ranked: a full refresh closes the gaps
+        refresh_scholarship(sid, normalize=normalize)
+        return
+
+    new_rank = 1 + (
+        db.session.query(func.count(R.id))
+        .filter(
+            R.scholarship_id == sid,
+            R.application_id != application_id,
+            _ranked_before(score, review_count, fail_count, app_obj.submitted_at, application_id),
+        )
+        .scalar()
+    )
+
+    shift = db.session.query(R).filter(R.scholarship_id == sid)
+    if row is None:
+        # new application: everything from its position down moves one place
+        shift.filter(R.rank >= new_rank).update({R.rank: R.rank + 1}, synchronize_session=False)
+        row = R(scholarship_id=sid, application_id=application_id, normalized=False)
+        db.session.add(row)
+    elif new_rank < row.rank:
+        shift.filter(R.rank >= new_rank, R.rank < row.rank).update(
+            {R.rank: R.rank + 1}, synchronize_session=False
+        )
+    elif new_rank > row.rank:
+        shift.filter(R.rank > row.rank, R.rank <= new_rank).update(
+            {R.rank: R.rank - 1}, synchronize_session=False
+        )
+
+    row.score = score
+    row.raw_avg = raw_avg
+    row.review_count = review_count
+    row.fail_count = fail_count
+    row.submitted_at = app_obj.submitted_at
+    row.rank = new_rank
+    db.session.commit()
+
+
+def refresh_application_safe(application_id: int) -> None:
+    """Same as refresh_application, but never breaks the calling request."""
+    try:
+        refresh_application(application_id)
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("ranking refresh failed for application %s", application_id)
+
+
+# =========================
+# MAINTENANCE
+# =========================
+def stale_scholarships():
+    """
+    Scholarships whose ranking is missing rows, has rows too many, or was
+    built in the other RANKING_NORMALIZE mode - applications written without
+    refresh_application (bulk Core inserts such as flask seed-data, deletes).
+    """
+    R = ApplicationRanking
+    normalize = _normalize_enabled()
+    applied = dict(
+        db.session.query(Application.scholarship_id, func.count(Application.id))
+        .group_by(Application.scholarship_id)
+        .all()
+    )
+    ranked = dict(
+        db.session.query(R.scholarship_id, func.count(R.id))
+        .group_by(R.scholarship_id)
+        .all()
+    )
+    other_mode = {
+        sid for (sid,) in
+        db.session.query(R.scholarship_id).filter(R.normalized != normalize).distinct()
+    }
+
+    stale = {
+        sid for sid in set(applied) | set(ranked)
+        if ranked.get(sid, 0) != applied.get(sid, 0)
+    }
+    stale |= other_mode
+    return sorted(stale)
+
+
+def refresh_stale_rankings() -> int:
+    """Rebuild every stale ranking (scheduler job refresh_rankings, flask seed-data)."""
+    stale = stale_scholarships()
+    for sid in stale:
+        refresh_scholarship(sid)
+    return len(stale)
+
+
+# =========================
+# LOOKUPS (read-only: rankings are built by refresh_* above)
+# =========================
+def top_k(scholarship_id: int, k: int = 10):
+    """Top-K ranking rows of a scholarship (uses the (scholarship_id, rank) index)."""
+    return (
+        ApplicationRanking.query
+        .filter_by(scholarship_id=scholarship_id)
+        .order_by(ApplicationRanking.rank.asc())
+        .limit(k)
+        .all()
+    )
+
+
+def rank_of(application_id: int):
+    """Return (rank, total) for an application, or (None, 0) if it is not ranked (yet)."""
+    row = ApplicationRanking.query.filter_by(application_id=application_id).first()
+    if row is None:
+        return None, 0
+
+    total = ApplicationRanking.query.filter_by(scholarship_id=row.scholarship_id).count()
+    return row.rank, total
@@ -0,0 +1,207 @@
+"""
+Read-replica routing for heavy read-only pages.
+
+Routes decorated with @use_read_replica send their SELECTs to a replica
+engine; everything else (and every flush/commit) goes to the primary.
+
+Two kinds of replica:
+
+  READ_REPLICA_URL=postgresql://...   a real replica; if its replay lag is
+                                      above the staleness bound we fall back
+                                      to the primary
+  READ_REPLICA_SNAPSHOT=1             SQLite only: a copy of the database file
+                                      in the instance folder, re-copied (online
+                                      backup API) in a background thread once it
+                                      is older than the staleness bound; until
+                                      the new copy is in place reads go to the
+                                      primary, never to a copy past the bound
+
+READ_REPLICA_MAX_STALENESS (seconds, default 60) is the staleness bound.
+"""
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+
+
+# =========================
+# SESSION: route reads of opted-in requests to the replica
+# =========================
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get("use_read_replica"):
+            replica = current_app.extensions.get("read_replica")
+            engine = replica.engine_for_read() if replica else None
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def use_read_replica(view):
+    """Opt a route in to read-replica routing (only for read-only views)."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_read_replica = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.use_read_replica = False
+    return wrapper
+
+
+# =========================
+# REPLICA BACKENDS
+# =========================
+class SnapshotReplica:
+    """Periodically refreshed copy of the primary SQLite file."""
+
+    def __init__(self, primary_path: str, snapshot_path: str, max_staleness: float, logger=None):
+        self.primary_path = primary_path
+        self.snapshot_path = snapshot_path
+        self.max_staleness = max_staleness
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._engine = None
+        self._loaded_mtime = None
+        self._refreshing = False
+
+    def _age(self):
+        """(age in seconds, mtime) of the snapshot file, or (None, None) if missing."""
+        try:
+            mtime = os.path.getmtime(self.snapshot_path)
+        except OSError:
+            return None, None
+        return time.time() - mtime, mtime
+
+    def refresh(self) -> None:
+        """Copy the primary into a temp file, then atomically swap it in."""
+        tmp = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        src = sqlite3.connect(self.primary_path)
+        dst = sqlite3.connect(tmp)
+        try:
+            src.backup(dst)
+            # the copy is read-only: no WAL / -shm files next to it
+            dst.execute("PRAGMA journal_mode=DELETE")
+            dst.commit()
+        finally:
+            dst.close()
+            src.close()
+        os.replace(tmp, self.snapshot_path)
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception:
+            if self.logger is not None:
+                self.logger.exception("read replica snapshot refresh failed")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def engine_for_read(self):
+        """The snapshot engine, or None (-> primary) while the snapshot is missing
+        or older than the staleness bound. Refreshes run in the background."""
+        with self._lock:
+            age, mtime = self._age()
+            if age is None or age > self.max_staleness:
+                if not self._refreshing:
+                    self._refreshing = True
+                    threading.Thread(target=self._refresh_in_background, name="replica-refresh", daemon=True).start()
+                return None
+
+            # another process (or our refresh) replaced the file: reopen connections
+            if self._engine is None or mtime != self._loaded_mtime:
+                if self._engine is not None:
+                    self._engine.dispose()
+                self._engine = _snapshot_engine(self.snapshot_path)
+                self._loaded_mtime = mtime
+
+            return self._engine
+
+    def after_fork(self) -> None:
+        """In a forked worker: drop the parent's connections and lock (no refresh thread survives)."""
+        self._lock = threading.Lock()
+        self._refreshing = False
+        if self._engine is not None:
+            self._engine.dispose(close=False)
+
+
+class UrlReplica:
+    """A real database replica with a replay-lag check."""
+
+    LAG_CHECK_INTERVAL = 5  # seconds
+
+    def __init__(self, url: str, max_staleness: float, engine_options=None):
+        self.engine = create_engine(url, **(engine_options or {}))
+        self.max_staleness = max_staleness
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._healthy = True
+
+    def _lag_seconds(self):
+        if self.engine.dialect.name != "postgresql":
+            return 0.0
+        with self.engine.connect() as conn:
+            lag = conn.execute(text(
+                "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+            )).scalar()
+        return float(lag or 0.0)
+
+    def engine_for_read(self):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked_at > self.LAG_CHECK_INTERVAL:
+                self._checked_at = now
+                try:
+                    self._healthy = self._lag_seconds() <= self.max_staleness
+                except Exception:
+                    self._healthy = False
+                if not self._healthy:
+                    current_app.logger.warning("read replica lagging/unreachable, using primary")
+        # None -> RoutingSession falls back to the primary
+        return self.engine if self._healthy else None
+
+    def after_fork(self) -> None:
+        self._lock = threading.Lock()
+        self.engine.dispose(close=False)
+
+
+def _snapshot_engine(path: str):
+    engine = create_engine(
+        "sqlite:///" + path,
+        connect_args={"check_same_thread": False},
+    )
+
+    @event.listens_for(engine, "connect")
+    def _query_only(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA query_only=ON")
+
+    return engine
+
+
+# =========================
+# SETUP
+# =========================
+def init_read_replica(app) -> None:
+    """Configure the replica from env/app.config (no-op when nothing is configured)."""
+    url = app.config.setdefault("READ_REPLICA_URL", os.environ.get("READ_REPLICA_URL", "").strip() or None)
+    snapshot = app.config.setdefault("READ_REPLICA_SNAPSHOT", os.environ.get("READ_REPLICA_SNAPSHOT", "0") == "1")
+    max_staleness = float(app.config.setdefault(
+        "READ_REPLICA_MAX_STALENESS", os.environ.get("READ_REPLICA_MAX_STALENESS", 60)
+    ))
+
+    primary_uri = app.config["SQLALCHEMY_DATABASE_URI"]
+
+    if url:
+        app.extensions["read_replica"] = UrlReplica(
+            url, max_staleness, app.config.get("SQLALCHEMY_ENGINE_OPTIONS")
+        )
+    elif snapshot and primary_uri.startswith("sqlite:///"):
+        primary_path = primary_uri[len("sqlite:///"):]
+        snapshot_path = os.path.join(app.instance_path, "scholarship.replica.db")
+        app.extensions["read_replica"] = SnapshotReplica(primary_path, snapshot_path, max_staleness, app.logger)
@@ -0,0 +1,441 @@
+"""
+Pre-aggregated admin reports.
+
+Daily rollups live in report_daily and per-key totals in report_total. The
+admin reports page and its CSV only read those small tables, so they cost the
+same however much history there is:
+
+  - daily submission time-series              ("all", day)
+  - per-scholarship acceptance rate/turnaround ("scholarship" totals)
+  - reviewer throughput and turnaround         ("reviewer" daily + totals)
+
+Turnaround = Review.reviewed_at - Application.submitted_at of completed
+reviews. Scholarship rows are keyed by the application's submission day,
+reviewer rows by the day the review was completed.
+
+Updates are incremental: every ORM flush that touches an Application or a
+Review records the affected (dimension, key, day) in report_dirty_key, in the
+same transaction. refresh_rollups() recomputes only those keys from the
+source rows. Moving an application to another day or scholarship also marks
+the reviewer keys of its reviews (their turnaround changes). Bulk Core
+inserts (flask seed-data) bypass the ORM, so they end with rebuild_rollups(),
+which is also available as
+
+    flask --app run:create_app rollup-reports --full
+
+The report views only read. The refresh_rollups job of app.scheduler folds
+the queue in every REPORT_REFRESH_INTERVAL seconds and builds the rollups the
+first time (or run `flask rollup-reports` by hand).
+"""
+import os
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, event, func, inspect, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import Application, Review, ReportDaily, ReportTotal, ReportDirtyKey
+from app.review_workflow import UNDECIDED
+from app.db_retry import run_with_retry
+
+
+COUNTERS = ("submitted", "accepted", "rejected", "reviews", "turnaround_seconds")
+
+ACCEPTED_STATUSES = ("Accepted", "Approved")
+REJECTED_STATUSES = ("Rejected",)
+
+DEFAULT_REFRESH_BATCH = 500
+DEFAULT_WINDOW_DAYS = 30
+DEFAULT_REFRESH_INTERVAL = 60
+
+ALL_KEY = 0
+
+
+def _zero():
+    return dict.fromkeys(COUNTERS, 0)
+
+
+def _day_range(day):
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+
+# =========================
+# DIRTY KEYS (captured on flush)
+# =========================
+def _values(obj, attr, new_default=None):
+    """Current value plus any value it had before this flush."""
+    state = inspect(obj)
+    current = getattr(obj, attr)
+    values = {current if current is not None else new_default}
+    values.update(state.attrs[attr].history.deleted or ())
+    values.discard(None)
+    return values
+
+
+def _as_day(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _moved(session, obj):
+    """A stored application whose submission day or scholarship changed (or that is deleted)."""
+    state = inspect(obj)
+    if state.pending:
+        return False
+    return obj in session.deleted or any(
+        state.attrs[attr].history.has_changes() for attr in ("scholarship_id", "submitted_at")
+    )
+
+
+def _dirty_keys(session):
+    today = datetime.utcnow()
+    keys = set()
+    moved = []
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Application):
+            for sid in _values(obj, "scholarship_id"):
+                for at in _values(obj, "submitted_at", today):
+                    keys.add(("scholarship", sid, _as_day(at)))
+            if _moved(session, obj):
+                moved.append(obj.id)
+        elif isinstance(obj, Review):
+            # resolved to the application's (scholarship, day) when refreshing
+            for app_id in _values(obj, "application_id"):
+                keys.add(("application", app_id, None))
+            for rid in _values(obj, "reviewer_id"):
+                for at in _values(obj, "reviewed_at", today):
+                    keys.add(("reviewer", rid, _as_day(at)))
+
+    if moved:
+        # turnaround of every stored review of a moved application changes too
+        with session.no_autoflush:
+            for rid, reviewed_at in (
+                session.query(Review.reviewer_id, Review.reviewed_at)
+                .filter(Review.application_id.in_(moved), Review.reviewed_at.isnot(None))
+            ):
+                keys.add(("reviewer", rid, _as_day(reviewed_at)))
+    return keys
+
+
+@event.listens_for(Session, "before_flush")
+def _record_dirty_keys(session, flush_context, instances):
+    for dimension, key_id, day in _dirty_keys(session):
+        session.add(ReportDirtyKey(dimension=dimension, key_id=key_id, day=day))
+
+
+# =========================
+# AGGREGATION
+# =========================
+def _aggregate(app_rows, review_rows):
+    """
+    app_rows:    (scholarship_id, submitted_at, status)
+    review_rows: (reviewer_id, reviewed_at, decision, scholarship_id, submitted_at)
+    Returns {(dimension, key_id, day): counters} for "scholarship" and "reviewer".
+    """
+    out = {}
+
+    def bucket(key):
+        counters = out.get(key)
+        if counters is None:
+            counters = out[key] = _zero()
+        return counters
+
+    for sid, submitted_at, status in app_rows:
+        if submitted_at is None:
+            continue
+        c = bucket(("scholarship", sid, submitted_at.date()))
+        c["submitted"] += 1
+        if status in ACCEPTED_STATUSES:
+            c["accepted"] += 1
+        elif status in REJECTED_STATUSES:
+            c["rejected"] += 1
+
+    for rid, reviewed_at, decision, sid, submitted_at in review_rows:
+        if decision in UNDECIDED or reviewed_at is None or submitted_at is None:
+            continue
+        turnaround = max((reviewed_at - submitted_at).total_seconds(), 0.0)
+        for key in (("scholarship", sid, submitted_at.date()), ("reviewer", rid, reviewed_at.date())):
+            c = bucket(key)
+            c["reviews"] += 1
+            c["turnaround_seconds"] += turnaround
+
+    return out
+
+
+def _review_query():
+    return (
+        db.session.query(
+            Review.reviewer_id, Review.reviewed_at, Review.decision,
+            Application.scholarship_id, Application.submitted_at
+        )
+        .join(Application, Application.id == Review.application_id)
+    )
+
+
+def _days_filter(column, days):
+    ranges = [_day_range(d) for d in days]
+    return or_(*[and_(column >= start, column < end) for start, end in ranges])
+
+
+def _recompute(keys):
+    """Fresh counters for exactly the given ("scholarship"|"reviewer", key_id, day) keys."""
+    by_dim = {}
+    for dimension, key_id, day in keys:
+        by_dim.setdefault((dimension, key_id), set()).add(day)
+
+    result = {}
+    for (dimension, key_id), days in by_dim.items():
+        if dimension == "scholarship":
+            app_rows = (
+                db.session.query(Application.scholarship_id, Application.submitted_at, Application.status)
+                .filter(Application.scholarship_id == key_id, _days_filter(Application.submitted_at, days))
+                .all()
+            )
+            review_rows = (
+                _review_query()
+                .filter(Application.scholarship_id == key_id, _days_filter(Application.submitted_at, days))
+                .all()
+            )
+        else:
+            app_rows = []
+            review_rows = (
+                _review_query()
+                .filter(Review.reviewer_id == key_id, _days_filter(Review.reviewed_at, days))
+                .all()
+            )
+        found = _aggregate(app_rows, review_rows)
+        for day in days:
+            result[(dimension, key_id, day)] = found.get((dimension, key_id, day), _zero())
+    return result
+
+
+# =========================
+# STORAGE
+# =========================
+def _store_daily(dimension, key_id, day, counters):
+    row = ReportDaily.query.filter_by(dimension=dimension, key_id=key_id, day=day).first()
+    if not any(counters.values()):
+        if row is not None:
+            db.session.delete(row)
+        return
+    if row is None:
+        row = ReportDaily(dimension=dimension, key_id=key_id, day=day)
+        db.session.add(row)
+    for name in COUNTERS:
+        setattr(row, name, counters[name])
+
+
+def _store_total(dimension, key_id, counters):
+    row = ReportTotal.query.filter_by(dimension=dimension, key_id=key_id).first()
+    if row is None:
+        row = ReportTotal(dimension=dimension, key_id=key_id)
+        db.session.add(row)
+    for name in COUNTERS:
+        setattr(row, name, counters[name])
+
+
+def _sum_counters(model, *filters):
+    columns = [func.coalesce(func.sum(getattr(model, name)), 0) for name in COUNTERS]
+    return dict(zip(COUNTERS, db.session.query(*columns).filter(*filters).one()))
+
+
+def _apply(fresh):
+    """Write recomputed daily rows, then re-sum every total they feed."""
+    for (dimension, key_id, day), counters in fresh.items():
+        _store_daily(dimension, key_id, day, counters)
+    db.session.flush()
+
+    totals = {(dimension, key_id) for dimension, key_id, _ in fresh}
+    all_days = {day for dimension, _, day in fresh if dimension == "scholarship"}
+
+    for day in all_days:
+        _store_daily("all", ALL_KEY, day, _sum_counters(
+            ReportDaily, ReportDaily.dimension == "scholarship", ReportDaily.day == day))
+    for dimension, key_id in totals:
+        _store_total(dimension, key_id, _sum_counters(
+            ReportDaily, ReportDaily.dimension == dimension, ReportDaily.key_id == key_id))
+    if all_days:
+        db.session.flush()
+        _store_total("all", ALL_KEY, _sum_counters(ReportTotal, ReportTotal.dimension == "scholarship"))
+
+
+# =========================
+# PUBLIC API
+# =========================
+def refresh_rollups(limit=None) -> int:
+    """Recompute the keys recorded since the last refresh. Returns the number of queued entries consumed."""
+    limit = limit or current_app.config.get("REPORT_REFRESH_BATCH", DEFAULT_REFRESH_BATCH)
+
+    def work():
+        pending = ReportDirtyKey.query.order_by(ReportDirtyKey.id).limit(limit).all()
+        if not pending:
+            return 0
+
+        keys = {(p.dimension, p.key_id, p.day) for p in pending if p.dimension != "application"}
+        app_ids = {p.key_id for p in pending if p.dimension == "application"}
+        if app_ids:
+            for sid, submitted_at in (
+                db.session.query(Application.scholarship_id, Application.submitted_at)
+                .filter(Application.id.in_(app_ids))
+                .all()
+            ):
+                if submitted_at is not None:
+                    keys.add(("scholarship", sid, submitted_at.date()))
+
+        _apply(_recompute(keys))
+
+        ids = [p.id for p in pending]
+        db.session.query(ReportDirtyKey).filter(ReportDirtyKey.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        return len(ids)
+
+    try:
+        return run_with_retry(work)
+    except IntegrityError:
+        # another worker inserted the same rollup row first; its keys stay queued
+        db.session.rollback()
+        return 0
+
+
+def rebuild_rollups(chunk_size: int = 5000) -> None:
+    """Drop and rebuild every rollup from the source tables (streamed)."""
+    db.session.query(ReportDirtyKey).delete(synchronize_session=False)
+    db.session.query(ReportDaily).delete(synchronize_session=False)
+    db.session.query(ReportTotal).delete(synchronize_session=False)
+
+    app_rows = (
+        db.session.query(Application.scholarship_id, Application.submitted_at, Application.status)
+        .execution_options(yield_per=chunk_size)
+    )
+    review_rows = _review_query().execution_options(yield_per=chunk_size)
+    daily = _aggregate(app_rows, review_rows)
+
+    totals, all_daily = {}, {}
+    for (dimension, key_id, day), counters in daily.items():
+        targets = [totals.setdefault((dimension, key_id), _zero())]
+        if dimension == "scholarship":
+            targets.append(all_daily.setdefault(day, _zero()))
+            targets.append(totals.setdefault(("all", ALL_KEY), _zero()))
+        for target in targets:
+            for name in COUNTERS:
+                target[name] += counters[name]
+    for day, counters in all_daily.items():
+        daily[("all", ALL_KEY, day)] = counters
+    # marks the rollups as built even on an empty database
+    totals.setdefault(("all", ALL_KEY), _zero())
+
+    rows = [dict(dimension=d, key_id=k, day=day, **c) for (d, k, day), c in daily.items()]
+    for i in range(0, len(rows), chunk_size):
+        db.session.execute(ReportDaily.__table__.insert(), rows[i:i + chunk_size])
+    now = datetime.utcnow()
+    db.session.execute(ReportTotal.__table__.insert(), [
+        dict(dimension=d, key_id=k, updated_at=now, **c) for (d, k), c in totals.items()
+    ])
+    db.session.commit()
+
+
+def rollups_built() -> bool:
+    return ReportTotal.query.filter_by(dimension="all", key_id=ALL_KEY).first() is not None
+
+
+def ensure_rollups() -> int:
+    """Build the rollups if they were never built, else fold in every pending change.
+    Run by the refresh_rollups job (app.scheduler) and `flask rollup-reports`, never
+    by the report views. Returns the number of queued entries consumed."""
+    if not rollups_built():
+        rebuild_rollups()
+        return 0
+    done = 0
+    while True:
+        n = refresh_rollups()
+        if not n:
+            return done
+        done += n
+
+
+# =========================
+# READERS (what the reports page shows)
+# =========================
+def _with_rates(counters):
+    decided = counters["accepted"] + counters["rejected"]
+    counters["acceptance_rate"] = round(100.0 * counters["accepted"] / decided, 1) if decided else None
+    counters["avg_turnaround_hours"] = (
+        round(counters["turnaround_seconds"] / counters["reviews"] / 3600, 1) if counters["reviews"] else None
+    )
+    counters["open"] = counters["submitted"] - decided
+    return counters
+
+
+def _counters(row):
+    return {name: getattr(row, name) for name in COUNTERS} if row is not None else _zero()
+
+
+def summary():
+    return _with_rates(_counters(ReportTotal.query.filter_by(dimension="all", key_id=ALL_KEY).first()))
+
+
+def daily_series(days: int, today: date = None):
+    """[(day, counters)] for the last `days` days, oldest first, zero-filled."""
+    today = today or datetime.utcnow().date()
+    start = today - timedelta(days=days - 1)
+    rows = {
+        r.day: _counters(r)
+        for r in ReportDaily.query.filter(
+            ReportDaily.dimension == "all", ReportDaily.key_id == ALL_KEY, ReportDaily.day >= start
+        ).all()
+    }
+    return [(start + timedelta(days=i), rows.get(start + timedelta(days=i), _zero())) for i in range(days)]
+
+
+def totals_for(dimension: str):
+    """{key_id: counters with rates} for every key of a dimension."""
+    return {
+        r.key_id: _with_rates(_counters(r))
+        for r in ReportTotal.query.filter_by(dimension=dimension).all()
+    }
+
+
+def reviewer_window(days: int, today: date = None):
+    """{reviewer_id: reviews completed in the last `days` days}."""
+    today = today or datetime.utcnow().date()
+    start = today - timedelta(days=days - 1)
+    return dict(
+        db.session.query(ReportDaily.key_id, func.sum(ReportDaily.reviews))
+        .filter(ReportDaily.dimension == "reviewer", ReportDaily.day >= start)
+        .group_by(ReportDaily.key_id)
+        .all()
+    )
+
+
+# =========================
+# CLI
+# =========================
+@click.command("rollup-reports")
+@click.option("--full", is_flag=True, help="rebuild every rollup from scratch")
+@with_appcontext
+def rollup_reports_command(full):
+    """Fold pending changes into the report rollups (or rebuild them)."""
+    if full or not rollups_built():
+        rebuild_rollups()
+        click.echo("✅ report rollups rebuilt")
+        return
+
+    done = ensure_rollups()
+    click.echo(f"✅ {done} queued changes folded into the report rollups")
+
+
+def init_report_rollup(app) -> None:
+    app.config.setdefault(
+        "REPORT_REFRESH_BATCH", int(os.environ.get("REPORT_REFRESH_BATCH", DEFAULT_REFRESH_BATCH))
+    )
+    app.config.setdefault(
+        "REPORT_WINDOW_DAYS", int(os.environ.get("REPORT_WINDOW_DAYS", DEFAULT_WINDOW_DAYS))
+    )
+    app.config.setdefault(
+        "REPORT_REFRESH_INTERVAL", int(os.environ.get("REPORT_REFRESH_INTERVAL", DEFAULT_REFRESH_INTERVAL))
+    )
+    app.cli.add_command(rollup_reports_command)
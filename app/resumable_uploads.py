@@ -0,0 +1,267 @@
+"""
+Resumable chunked document uploads (a subset of the tus 1.0 protocol).
+
+    POST  /student/apply/<id>/draft/documents/<field>/uploads
+          Upload-Length: <total bytes>
+          Upload-Metadata: filename <base64 name>
+      -> 201, Location: /student/uploads/<token>
+
+    HEAD  /student/uploads/<token>      -> Upload-Offset / Upload-Length
+    PATCH /student/uploads/<token>
+          Content-Type: application/offset+octet-stream
+          Upload-Offset: <bytes the server already has>
+      -> 204, Upload-Offset: <new offset>
+    DELETE /student/uploads/<token>     -> 204 (abandon)
+
+Chunks are appended to instance/resumable_uploads/<token>.part. After a
+lost connection the client asks HEAD for the offset and continues from
+there, so a flaky network costs one chunk, not the whole 30 MB file. The
+file type is checked when the upload is created (before any byte is sent);
+when the last chunk arrives the file is moved into the upload folder and
+attached to the student's draft (app.drafts), exactly like a direct upload.
+
+The offset is the size of the .part file itself, and PATCH holds a file lock
+(<token>.lock) while it checks, appends and - after the last chunk - moves
+the file and writes the tombstone, so two retries of the same chunk can
+never write it twice or complete it twice. A finished upload keeps its .json
+as a tombstone (offset == length), so when the answer to the last PATCH is
+lost the client's HEAD or retried PATCH still learns the upload is complete.
+Every PATCH re-checks that the scholarship still accepts applications
+(student_routes.resumable_upload). Uploads (and tombstones)
+idle for RESUMABLE_EXPIRY_HOURS are deleted by the purge_uploads job
+(app.scheduler).
+"""
+import base64
+import binascii
+import json
+import os
+import secrets
+import shutil
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app.drafts import attach_document, document_error, document_name, upload_folder
+
+try:
+    import fcntl
+except ImportError:  # Windows: concurrent PATCHes of one upload are not guarded
+    fcntl = None
+
+
+TUS_VERSION = "1.0.0"
+READ_BYTES = 64 * 1024
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+DEFAULT_CHUNK_BYTES = 1024 * 1024
+DEFAULT_EXPIRY_HOURS = 24
+
+
+class UploadError(Exception):
+    """Protocol error: message plus the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def storage_dir() -> str:
+    folder = current_app.config.get("RESUMABLE_UPLOAD_DIR") or os.path.join(
+        current_app.instance_path, "resumable_uploads"
+    )
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _paths(token):
+    if not token or not all(c.isalnum() or c in "-_" for c in token):
+        raise UploadError("Unknown upload.", 404)
+    base = os.path.join(storage_dir(), token)
+    return base + ".json", base + ".part", base + ".lock"
+
+
+def parse_metadata(header) -> dict:
+    """tus Upload-Metadata: "key base64value,key2 base64value2"."""
+    meta = {}
+    for pair in (header or "").split(","):
+        pair = pair.strip()
+        if not pair:
+            continue
+        key, _, value = pair.partition(" ")
+        try:
+            meta[key] = base64.b64decode(value).decode("utf-8") if value else ""
+        except (binascii.Error, UnicodeDecodeError):
+            raise UploadError("Invalid Upload-Metadata.")
+    return meta
+
+
+# =========================
+# STATE
+# =========================
+def create_upload(user_id, scholarship_id, field, length, filename) -> dict:
+    max_bytes = current_app.config["RESUMABLE_MAX_BYTES"]
+    if length is None or length < 0:
+        raise UploadError("Upload-Length is required.")
+    if length == 0:
+        raise UploadError("The file is empty.")
+    if length > max_bytes:
+        raise UploadError(f"File too large (max {max_bytes // (1024 * 1024)} MB).", 413)
+    if not filename:
+        raise UploadError("A filename is required in Upload-Metadata.")
+    error = document_error(field, filename)
+    if error:
+        raise UploadError(error)
+
+    token = secrets.token_urlsafe(16)
+    info = {
+        "token": token, "user_id": user_id, "scholarship_id": scholarship_id,
+        "field": field, "filename": filename, "length": length,
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    meta_path, part_path, _ = _paths(token)
+    open(part_path, "wb").close()
+    _write_info(meta_path, info)
+    return info
+
+
+def load_upload(token, user_id) -> dict:
+    meta_path, part_path, _ = _paths(token)
+    try:
+        with open(meta_path) as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        raise UploadError("Unknown upload.", 404)
+    if info["user_id"] != user_id:
+        raise UploadError("Unknown upload.", 404)
+    if info.get("document"):
+        info["offset"] = info["length"]
+    else:
+        info["offset"] = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    return info
+
+
+def _write_info(meta_path, info):
+    tmp = meta_path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(info, f)
+    os.replace(tmp, meta_path)
+
+
+def expires_at(info) -> datetime:
+    hours = current_app.config["RESUMABLE_EXPIRY_HOURS"]
+    return datetime.fromisoformat(info["created_at"]) + timedelta(hours=hours)
+
+
+@contextmanager
+def _locked(lock_path):
+    # a separate lock file: the .part is moved away and the .json replaced
+    # on completion, so neither can carry the lock
+    with open(lock_path, "a") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def append_chunk(info, offset, stream) -> dict:
+    """
+    Append the request body at `offset`; the last chunk also completes the
+    upload under the same lock. Returns the upload info with its new offset
+    (and "document" once complete).
+    """
+    meta_path, part_path, lock_path = _paths(info["token"])
+    with _locked(lock_path):
+        # state as of now: a retry of the last chunk may have completed it meanwhile
+        info = load_upload(info["token"], info["user_id"])
+        if info.get("document"):
+            if offset != info["length"]:
+                raise UploadError(f"Upload-Offset {offset} does not match {info['length']}.", 409)
+            return info
+
+        with open(part_path, "ab") as part:
+            current = os.fstat(part.fileno()).st_size
+            if offset != current:
+                raise UploadError(f"Upload-Offset {offset} does not match {current}.", 409)
+
+            remaining = info["length"] - current
+            while True:
+                data = stream.read(READ_BYTES)
+                if not data:
+                    break
+                if len(data) > remaining:
+                    # keep what fits; the rest would overrun the declared length
+                    part.write(data[:remaining])
+                    part.flush()
+                    raise UploadError("Chunk exceeds Upload-Length.", 413)
+                part.write(data)
+                remaining -= len(data)
+            part.flush()
+
+        info["offset"] = info["length"] - remaining
+        if not remaining:
+            info["document"] = complete_upload(info)
+        return info
+
+
+def complete_upload(info) -> str:
+    """Move a finished upload into the upload folder and attach it to the draft.
+    The .json stays behind as a tombstone recording the attached document.
+    Called by append_chunk with the upload's lock held."""
+    meta_path, part_path, _ = _paths(info["token"])
+    name = document_name(info["filename"], info["user_id"])
+    shutil.move(part_path, os.path.join(upload_folder(), name))
+    path = f"uploads/{name}"
+    attach_document(info["user_id"], info["scholarship_id"], info["field"], path)
+
+    tombstone = {k: v for k, v in info.items() if k != "offset"}
+    tombstone["document"] = path
+    _write_info(meta_path, tombstone)
+    return path
+
+
+def delete_upload(token) -> None:
+    for path in _paths(token):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def purge_uploads(hours=None) -> int:
+    """Delete unfinished uploads idle for more than `hours`. Returns uploads removed."""
+    hours = hours if hours is not None else current_app.config.get("RESUMABLE_EXPIRY_HOURS", DEFAULT_EXPIRY_HOURS)
+    cutoff = (datetime.utcnow() - timedelta(hours=hours)).timestamp()
+    folder = storage_dir()
+
+    last_activity = {}   # token -> newest mtime of its .json / .part / .lock
+    for name in os.listdir(folder):
+        token, ext = os.path.splitext(name)
+        if ext not in (".json", ".part", ".lock"):
+            continue
+        try:
+            mtime = os.path.getmtime(os.path.join(folder, name))
+        except OSError:
+            continue
+        last_activity[token] = max(mtime, last_activity.get(token, 0))
+
+    removed = 0
+    for token, mtime in last_activity.items():
+        if mtime < cutoff:
+            delete_upload(token)
+            removed += 1
+    return removed
+
+
+def init_resumable_uploads(app) -> None:
+    app.config.setdefault(
+        "RESUMABLE_MAX_BYTES", int(os.environ.get("RESUMABLE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    )
+    app.config.setdefault(
+        "RESUMABLE_CHUNK_BYTES", int(os.environ.get("RESUMABLE_CHUNK_BYTES", DEFAULT_CHUNK_BYTES))
+    )
+    app.config.setdefault(
+        "RESUMABLE_EXPIRY_HOURS", int(os.environ.get("RESUMABLE_EXPIRY_HOURS", DEFAULT_EXPIRY_HOURS))
+    )
@@ -0,0 +1,82 @@
+"""
+Review submission and application status derivation.
+
+The application status is computed from ALL of its reviews instead of being
+overwritten with whatever the last reviewer picked:
+
+  - committee decisions (Accepted / Approved / Rejected) are final and never
+    touched here
+  - no review decided yet          -> "Pending"
+  - some (not all) reviews decided -> "Under Review"
+  - every assigned review decided  -> "Reviewed"
+
+A reviewer's own "Eligible" / "Rejected" is a recommendation stored on the
+Review row; the committee makes the final call.
+"""
+from datetime import datetime
+
+from sqlalchemy.orm.attributes import flag_modified
+
+from app.extensions import db
+from app.models import Application, Review
+from app.db_retry import run_with_retry
+
+
+FINAL_STATUSES = ("Accepted", "Approved", "Rejected")
+
+# statuses that still wait for a committee decision
+OPEN_STATUSES = ("Pending", "Submitted", "Under Review", "Reviewed")
+
+# reviewer form value that means "not decided yet"
+UNDECIDED = (None, "", "Pending")
+
+
+def derive_application_status(current_status, decisions) -> str:
+    """Status for an application given its current status and all review decisions."""
+    if current_status in FINAL_STATUSES:
+        return current_status
+
+    decided = [d for d in decisions if d not in UNDECIDED]
+    if not decisions or not decided:
+        return "Pending"
+    if len(decided) < len(decisions):
+        return "Under Review"
+    return "Reviewed"
+
+
+def submit_review(application_id: int, reviewer_id: int, score, decision, comment):
+    """
+    Save one reviewer's review and re-derive the application status.
+
+    Runs as a short transaction retried on "database is locked" and on
+    optimistic-lock conflicts, so concurrent reviewers of the same application
+    never overwrite each other. Returns the saved Review.
+    """
+    def work():
+        review_row = Review.query.filter_by(
+            application_id=application_id,
+            reviewer_id=reviewer_id
+        ).one()
+
+        review_row.score = score
+        review_row.comment = comment
+        review_row.decision = decision if decision else "Reviewed"
+        review_row.reviewed_at = datetime.utcnow()
+        db.session.flush()
+
+        app_obj = Application.query.get(application_id)
+        decisions = [
+            d for (d,) in db.session.query(Review.decision)
+            .filter(Review.application_id == application_id)
+            .all()
+        ]
+        app_obj.status = derive_application_status(app_obj.status, decisions)
+
+        # always bump the application version, even when the status string is
+        # unchanged, so two concurrent derivations cannot both win
+        flag_modified(app_obj, "status")
+
+        db.session.commit()
+        return review_row
+
+    return run_with_retry(work)
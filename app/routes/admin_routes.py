@@ -1,36 +1,32 @@
-from flask import render_template, redirect, url_for, flash, request, Blueprint, Response
+from flask import render_template, redirect, url_for, flash, request, Blueprint, Response, current_app
 from flask_login import login_required, login_user, current_user
 from werkzeug.security import check_password_hash, generate_password_hash
-from sqlalchemy import func
+from sqlalchemy import func, or_, and_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import joinedload, aliased
+from sqlalchemy.orm.exc import StaleDataError
 
 import csv
 import io
+from datetime import datetime, timedelta
 
 from app.models import db, Scholarship, User, Application, Review, SystemLog
-from app.forms import (
-    ScholarshipForm,
-    RegistrationForm,         # kept (even if not used yet)
-    AssignReviewersForm,
-    ApplicationStatusForm
-)
+from app.db_retry import run_with_retry
+from app.read_replica import use_read_replica
+from app.metrics import registry as metrics_registry
+from app.log_archive import REQUEST_MAX_BATCHES, archive_logs, apply_retention, logs_before, retention_cutoff
+from app.audit import log_event, file_sink_enabled, iter_file_events, read_file_events
+from app.streaming import batched_rows, stream_page
+from app.live_updates import publish
+from app.notifications import queue_notification
+from app.report_rollup import rollups_built, daily_series, totals_for, reviewer_window, summary as rollup_summary
+
+# NOTE: app.forms (WTForms + email validator) is imported inside the views that
+# use it, so importing this blueprint at startup stays cheap.
 
 admin_bp = Blueprint('admin', __name__)
 
-
-# =========================
-# HELPER: LOG EVENTS
-# =========================
-def log_event(level: str, action: str, message: str, user_id=None):
-    try:
-        db.session.add(SystemLog(
-            level=level,
-            action=action,
-            message=message,
-            user_id=user_id
-        ))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
+LOGS_PER_PAGE = 50
 
 
 # =========================
@@ -85,6 +81,8 @@ def dashboard():
 @admin_bp.route('/create_scholarship', methods=['GET', 'POST'])
 @login_required
 def create_scholarship():
+    from app.forms import ScholarshipForm
+
     if current_user.role != 'admin':
         flash("Access denied.", "danger")
         return redirect(url_for('auth.login'))
@@ -133,6 +131,7 @@ def create_scholarship():
 # =========================
 @admin_bp.route('/scholarships')
 @login_required
+@use_read_replica
 def manage_scholarships():
     if current_user.role != 'admin':
         flash("Access denied.", "danger")
@@ -194,6 +193,8 @@ def scholarship_detail(scholarship_id):
 @admin_bp.route('/scholarships/<int:scholarship_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_scholarship(scholarship_id):
+    from app.forms import ScholarshipForm
+
     if current_user.role != 'admin':
         flash("Access denied.", "danger")
         return redirect(url_for('auth.login'))
@@ -247,6 +248,9 @@ def edit_scholarship(scholarship_id):
         scholarship.documents_required = form.documents_required.data
         scholarship.application_deadline = form.application_deadline.data
         scholarship.eligibility_criteria = criteria if criteria else None
+        if scholarship.closed_at and scholarship.accepting_applications():
+            # deadline moved out: open again (close_deadlines re-closes it later)
+            scholarship.closed_at = None
 
         db.session.commit()
 
@@ -317,9 +321,11 @@ def manage_users():
         flash("Invalid action.", "danger")
         return redirect(url_for('admin.manage_users'))
 
-    # LIST USERS (GET)
-    users = User.query.order_by(User.id.asc()).all()
-    return render_template('admin/manage_users.html', users=users)
+    # LIST USERS (GET) - streamed
+    users = batched_rows(
+        db.session.query(User.id, User.username, User.email, User.role).order_by(User.id.asc())
+    )
+    return stream_page('admin/manage_users.html', users=users)
 
 
 @admin_bp.route('/manage_users/<int:user_id>/edit', methods=['POST'])
@@ -406,19 +412,33 @@ def delete_user(user_id):
 @admin_bp.route('/applications')
 @login_required
 def manage_applications():
+    from app.forms import ApplicationStatusForm
+
     if current_user.role != 'admin':
         flash("Access denied.", "danger")
         return redirect(url_for('auth.login'))
 
-    applications = Application.query.order_by(Application.id.desc()).all()
+    # plain columns, streamed: no ORM objects or per-row forms for 50k rows
+    student = aliased(User)
+    applications = batched_rows(
+        db.session.query(
+            Application.id, Application.status, Application.student_id, Application.scholarship_id,
+            student.username.label("student_username"), Scholarship.title.label("scholarship_title")
+        )
+        .outerjoin(student, student.id == Application.student_id)
+        .outerjoin(Scholarship, Scholarship.id == Application.scholarship_id)
+        .order_by(Application.id.desc())
+    )
 
-    forms = {}
-    for a in applications:
-        f = ApplicationStatusForm()
-        f.status.data = a.status if hasattr(a, "status") and a.status else "Submitted"
-        forms[a.id] = f
+    # one form for the CSRF token and choices, rendered before streaming starts
+    form = ApplicationStatusForm()
 
-    return render_template('admin/manage_applications.html', applications=applications, forms=forms)
+    return stream_page(
+        'admin/manage_applications.html',
+        applications=applications,
+        csrf_field=form.hidden_tag(),
+        status_choices=form.status.choices
+    )
 
 
 @admin_bp.route('/applications/<int:application_id>')
@@ -444,16 +464,36 @@ def application_detail(application_id):
 @admin_bp.route('/applications/<int:application_id>/status', methods=['POST'])
 @login_required
 def update_application_status(application_id):
+    from app.forms import ApplicationStatusForm
+
     if current_user.role != 'admin':
         flash("Access denied.", "danger")
         return redirect(url_for('auth.login'))
 
-    app_obj = Application.query.get_or_404(application_id)
+    Application.query.get_or_404(application_id)
     form = ApplicationStatusForm()
 
     if form.validate_on_submit():
-        app_obj.status = form.status.data
-        db.session.commit()
+        new_status = form.status.data
+
+        def work():
+            row = Application.query.get(application_id)
+            if row.status != new_status:
+                queue_notification(
+                    row.student_id, "status",
+                    f"Application #{row.id}: {row.status or 'Submitted'} -> {new_status}",
+                    application_id=row.id
+                )
+            row.status = new_status
+            db.session.commit()
+
+        try:
+            run_with_retry(work)
+        except (OperationalError, StaleDataError):
+            db.session.rollback()
+            flash("This application was changed by someone else. Please try again.", "warning")
+            return redirect(url_for('admin.manage_applications'))
+        publish("status", application_id)
         flash("Application status updated.", "success")
     else:
         flash("Failed to update status.", "danger")
@@ -464,6 +504,8 @@ def update_application_status(application_id):
 @admin_bp.route("/assign_reviewers/<int:application_id>", methods=["GET", "POST"])
 @login_required
 def assign_reviewers(application_id):
+    from app.forms import AssignReviewersForm
+
     if current_user.role != "admin":
         flash("Access denied.", "danger")
         return redirect(url_for("auth.login"))
@@ -476,11 +518,18 @@ def assign_reviewers(application_id):
 
     if form.validate_on_submit():
         selected_ids = form.reviewers.data
+        title = application.scholarship.title if application.scholarship else "Scholarship"
         added = 0
         for reviewer_id in selected_ids:
             exists = Review.query.filter_by(application_id=application.id, reviewer_id=reviewer_id).first()
             if not exists:
                 db.session.add(Review(application_id=application.id, reviewer_id=reviewer_id))
+                # one digest line per reviewer, mailed with their other assignments
+                queue_notification(
+                    reviewer_id, "assignment",
+                    f"Application #{application.id} ({title})",
+                    application_id=application.id
+                )
                 added += 1
 
         db.session.commit()
@@ -504,21 +553,14 @@ def assign_reviewers(application_id):
 # =========================
 @admin_bp.route("/reports")
 @login_required
+@use_read_replica
 def reports():
     if current_user.role != "admin":
         flash("Access denied.", "danger")
         return redirect(url_for("auth.login"))
 
-    total_users = User.query.count()
-    total_scholarships = Scholarship.query.count()
-    total_apps = Application.query.count()
-
-    status_rows = (
-        db.session.query(Application.status, func.count(Application.id))
-        .group_by(Application.status)
-        .all()
-    )
-    status_counts = {status or "Unknown": count for status, count in status_rows}
+    # only pre-aggregated rollup tables are read here (kept current by app.scheduler)
+    days = _report_window()
 
     role_rows = (
         db.session.query(User.role, func.count(User.id))
@@ -529,31 +571,96 @@ def reports():
 
     return render_template(
         "admin/reports.html",
-        total_users=total_users,
-        total_scholarships=total_scholarships,
-        total_apps=total_apps,
-        status_counts=status_counts,
+        total_users=sum(role_counts.values()),
+        total_scholarships=Scholarship.query.count(),
+        summary=rollup_summary(),
+        rollups_built=rollups_built(),
+        days=days,
+        series=daily_series(days),
+        scholarship_rows=_scholarship_report_rows(),
+        reviewer_rows=_reviewer_report_rows(days),
         role_counts=role_counts
     )
 
 
+def _report_window():
+    default = current_app.config.get("REPORT_WINDOW_DAYS", 30)
+    return max(1, min(request.args.get("days", default, type=int) or default, 365))
+
+
+def _scholarship_report_rows():
+    totals = totals_for("scholarship")
+    titles = dict(
+        db.session.query(Scholarship.id, Scholarship.title)
+        .filter(Scholarship.id.in_(list(totals)))
+        .all()
+    ) if totals else {}
+    rows = [dict(id=sid, title=titles.get(sid, f"#{sid}"), **c) for sid, c in totals.items()]
+    rows.sort(key=lambda r: r["submitted"], reverse=True)
+    return rows
+
+
+def _reviewer_report_rows(days):
+    totals = totals_for("reviewer")
+    recent = reviewer_window(days)
+    names = dict(
+        db.session.query(User.id, User.username)
+        .filter(User.id.in_(list(totals)))
+        .all()
+    ) if totals else {}
+    rows = [
+        dict(id=rid, username=names.get(rid, f"#{rid}"), recent=recent.get(rid, 0),
+             per_day=round(recent.get(rid, 0) / days, 2), **c)
+        for rid, c in totals.items()
+    ]
+    rows.sort(key=lambda r: r["reviews"], reverse=True)
+    return rows
+
+
 # =========================
 # EXPORT REPORT CSV
 # =========================
 @admin_bp.route("/reports/export.csv")
 @login_required
+@use_read_replica
 def export_reports_csv():
     if current_user.role != "admin":
         flash("Access denied.", "danger")
         return redirect(url_for("auth.login"))
 
+    days = _report_window()
+    total = rollup_summary()
+
     output = io.StringIO()
     writer = csv.writer(output)
 
     writer.writerow(["Metric", "Value"])
     writer.writerow(["Total Users", User.query.count()])
     writer.writerow(["Total Scholarships", Scholarship.query.count()])
-    writer.writerow(["Total Applications", Application.query.count()])
+    writer.writerow(["Total Applications", total["submitted"]])
+    writer.writerow(["Accepted", total["accepted"]])
+    writer.writerow(["Rejected", total["rejected"]])
+    writer.writerow(["Acceptance Rate (%)", total["acceptance_rate"]])
+    writer.writerow(["Avg Review Turnaround (h)", total["avg_turnaround_hours"]])
+
+    writer.writerow([])
+    writer.writerow(["Day", "Submitted", "Accepted", "Rejected", "Reviews"])
+    for day, c in daily_series(days):
+        writer.writerow([day.isoformat(), c["submitted"], c["accepted"], c["rejected"], c["reviews"]])
+
+    writer.writerow([])
+    writer.writerow(["Scholarship ID", "Scholarship", "Submitted", "Accepted", "Rejected",
+                     "Acceptance Rate (%)", "Avg Turnaround (h)"])
+    for r in _scholarship_report_rows():
+        writer.writerow([r["id"], r["title"], r["submitted"], r["accepted"], r["rejected"],
+                         r["acceptance_rate"], r["avg_turnaround_hours"]])
+
+    writer.writerow([])
+    writer.writerow(["Reviewer ID", "Reviewer", "Reviews", f"Reviews (last {days} days)",
+                     "Reviews/Day", "Avg Turnaround (h)"])
+    for r in _reviewer_report_rows(days):
+        writer.writerow([r["id"], r["username"], r["reviews"], r["recent"], r["per_day"],
+                         r["avg_turnaround_hours"]])
 
     output.seek(0)
 
@@ -564,6 +671,21 @@ def export_reports_csv():
     )
 
 
+# =========================
+# PERFORMANCE METRICS (PROMETHEUS TEXT FORMAT)
+# =========================
+@admin_bp.route("/metrics")
+@login_required
+def metrics():
+    if current_user.role != "admin":
+        return Response("forbidden\n", status=403, mimetype="text/plain")
+
+    return Response(
+        metrics_registry.render_prometheus(),
+        mimetype="text/plain; version=0.0.4"
+    )
+
+
 # =========================
 # SYSTEM LOGS
 # =========================
@@ -574,11 +696,152 @@ def system_logs():
         flash("Access denied.", "danger")
         return redirect(url_for("auth.login"))
 
-    logs = SystemLog.query.order_by(SystemLog.created_at.desc()).limit(200).all()
-    return render_template("admin/logs.html", logs=logs)
+    selected_level = request.args.get("level", "").strip()
+    selected_action = request.args.get("action", "").strip()
+    selected_user = request.args.get("user_id", type=int)
+    date_from = _parse_date(request.args.get("from"))
+    date_to = _parse_date(request.args.get("to"))
+    cursor = request.args.get("before", "").strip()
+
+    try:
+        per_page = max(1, min(int(request.args.get("limit", LOGS_PER_PAGE)), 200))
+    except ValueError:
+        per_page = LOGS_PER_PAGE
+
+    before = _parse_log_cursor(cursor)
+    date_until = date_to + timedelta(days=1) if date_to else None
+
+    if file_sink_enabled():
+        logs, next_cursor, levels, actions = _file_log_page(
+            per_page, selected_level, selected_action, selected_user, date_from, date_until, before
+        )
+        return _render_logs(logs, levels, actions, next_cursor)
+
+    q = SystemLog.query
+    if selected_level:
+        q = q.filter(SystemLog.level == selected_level)
+    if selected_action:
+        q = q.filter(SystemLog.action == selected_action)
+    if selected_user:
+        q = q.filter(SystemLog.user_id == selected_user)
+    if date_from:
+        q = q.filter(SystemLog.created_at >= date_from)
+    if date_until:
+        q = q.filter(SystemLog.created_at < date_until)
+
+    # keyset pagination: rows strictly older than the last row of the previous page
+    if before:
+        before_at, before_id = before
+        q = q.filter(or_(
+            SystemLog.created_at < before_at,
+            and_(SystemLog.created_at == before_at, SystemLog.id < before_id)
+        ))
+
+    rows = (
+        q.options(joinedload(SystemLog.user))
+        .order_by(SystemLog.created_at.desc(), SystemLog.id.desc())
+        .limit(per_page + 1)
+        .all()
+    )
+    logs = rows[:per_page]
+    next_cursor = None
+    if len(rows) > per_page:
+        last = logs[-1]
+        next_cursor = f"{last.created_at.isoformat()}_{last.id}"
+
+    # index-only DISTINCT over (level, ...) / (action, ...)
+    levels = [lv for (lv,) in db.session.query(SystemLog.level).distinct().order_by(SystemLog.level).all()]
+    actions = [ac for (ac,) in db.session.query(SystemLog.action).distinct().order_by(SystemLog.action).all()]
+
+    return _render_logs(logs, levels, actions, next_cursor)
+
+
+def _render_logs(logs, levels, actions, next_cursor):
+    filters = {k: v for k, v in request.args.items() if k != "before" and v}
+
+    return render_template(
+        "admin/logs.html",
+        logs=logs,
+        levels=levels,
+        actions=actions,
+        selected_level=request.args.get("level", "").strip(),
+        selected_action=request.args.get("action", "").strip(),
+        selected_user=request.args.get("user_id", type=int),
+        date_from=request.args.get("from", ""),
+        date_to=request.args.get("to", ""),
+        next_cursor=next_cursor,
+        filters=filters,
+        file_sink=file_sink_enabled(),
+        retention_days=current_app.config.get("LOG_RETENTION_DAYS")
+    )
+
+
+class _FileLog:
+    """A file-sink event shaped like a SystemLog row for admin/logs.html."""
+
+    def __init__(self, ev, user=None):
+        self.id = ev.get("id")
+        self.created_at = ev["created_at"]
+        self.level = ev.get("level")
+        self.action = ev.get("action")
+        self.message = ev.get("message")
+        self.user_id = ev.get("user_id")
+        self.user = user
+
+
+# filter dropdowns in file mode are built from the newest events only
+FILE_LOG_FILTER_SCAN = 5000
+
+
+def _file_log_page(per_page, level, action, user_id, date_from, date_until, before):
+    events = read_file_events(
+        per_page, level=level or None, action=action or None, user_id=user_id,
+        date_from=date_from, date_to=date_until, before=before
+    )
+    page = events[:per_page]
+
+    # one query for every user on the page
+    user_ids = {ev.get("user_id") for ev in page if ev.get("user_id")}
+    users = {u.id: u for u in User.query.filter(User.id.in_(user_ids)).all()} if user_ids else {}
+    logs = [_FileLog(ev, users.get(ev.get("user_id"))) for ev in page]
+
+    next_cursor = None
+    if len(events) > per_page:
+        last = logs[-1]
+        next_cursor = f"{last.created_at.isoformat()}_{last.id}"
+
+    levels, actions = set(), set()
+    for i, ev in enumerate(iter_file_events()):
+        if i >= FILE_LOG_FILTER_SCAN:
+            break
+        levels.add(ev.get("level"))
+        actions.add(ev.get("action"))
+    levels.discard(None)
+    actions.discard(None)
+
+    return logs, next_cursor, sorted(levels), sorted(actions)
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d") if value else None
+    except ValueError:
+        return None
+
+
+def _parse_log_cursor(cursor):
+    """'<created_at iso>_<id>' -> (datetime, id), or None."""
+    if not cursor or "_" not in cursor:
+        return None
+    at, _, log_id = cursor.rpartition("_")
+    try:
+        return datetime.fromisoformat(at), int(log_id)
+    except ValueError:
+        return None
+
 
 # =========================
-# CLEAR LOGS
+# CLEAR LOGS (ARCHIVE IN BATCHES)
 # =========================
 @admin_bp.route("/logs/clear", methods=["POST"])
 @login_required
@@ -587,15 +850,51 @@ def clear_logs():
         flash("Access denied.", "danger")
         return redirect(url_for("auth.login"))
 
+    if file_sink_enabled():
+        flash("Logs are written to rotated files; old files are dropped automatically.", "info")
+        return redirect(url_for("admin.system_logs"))
+
     try:
-        deleted = db.session.query(SystemLog).delete()
-        db.session.commit()
-        flash(f"Cleared {deleted} logs.", "success")
+        # moved to gzip archives batch by batch, never one blocking DELETE,
+        # and only a few batches per request so the worker thread comes back
+        cutoff = datetime.utcnow() + timedelta(seconds=1)
+        moved = archive_logs(cutoff, max_batches=REQUEST_MAX_BATCHES)
+        if logs_before(cutoff):
+            flash(f"Archived and cleared {moved} logs; more remain, press Clear again to continue.", "info")
+        else:
+            flash(f"Archived and cleared {moved} logs.", "success")
 
-        log_event("warning", "CLEAR_LOGS", f"Admin cleared {deleted} logs.", user_id=current_user.id)
+        log_event("warning", "CLEAR_LOGS", f"Admin archived {moved} logs.", user_id=current_user.id)
 
     except Exception:
         db.session.rollback()
         flash("Failed to clear logs.", "danger")
 
     return redirect(url_for("admin.system_logs"))
+
+
+@admin_bp.route("/logs/retention", methods=["POST"])
+@login_required
+def apply_log_retention():
+    if current_user.role != "admin":
+        flash("Access denied.", "danger")
+        return redirect(url_for("auth.login"))
+
+    if file_sink_enabled():
+        flash("Logs are written to rotated files; old files are dropped automatically.", "info")
+        return redirect(url_for("admin.system_logs"))
+
+    try:
+        days = current_app.config.get("LOG_RETENTION_DAYS")
+        moved = apply_retention(max_batches=REQUEST_MAX_BATCHES)
+        if logs_before(retention_cutoff()):
+            flash(f"Archived {moved} logs older than {days} days; "
+                  f"the hourly archive_logs job moves the rest.", "info")
+        else:
+            flash(f"Archived {moved} logs older than {days} days.", "success")
+        log_event("info", "LOG_RETENTION", f"Admin archived {moved} old logs.", user_id=current_user.id)
+    except Exception:
+        db.session.rollback()
+        flash("Failed to archive logs.", "danger")
+
+    return redirect(url_for("admin.system_logs"))
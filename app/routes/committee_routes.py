@@ -1,17 +1,21 @@
 from flask import Blueprint, render_template, request, abort, flash, redirect, url_for
 from flask_login import login_required, current_user
 from sqlalchemy import func, case, or_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
 
 from app.extensions import db
-from app.models import Application, Review, SystemLog
+from app.models import Application, Review, Scholarship, User
+from app.ranking import top_k, rank_of, refresh_scholarship
+from app.score_stats import scholarship_stats
+from app.review_workflow import OPEN_STATUSES
+from app.db_retry import run_with_retry
+from app.read_replica import use_read_replica
+from app.audit import log_event
+from app.streaming import batched_rows, stream_page
+from app.live_updates import publish
 
-# OPTIONAL: if you want to call your simulated notification function
-# If your notifications.py currently uses Flask-Mail and may error (no mail config),
-# we catch exceptions anyway.
-try:
-    from app.notifications import send_notification
-except Exception:
-    send_notification = None
+from app.notifications import queue_notification
 
 
 committee_bp = Blueprint(
@@ -21,22 +25,6 @@ committee_bp = Blueprint(
 )
 
 
-# =========================
-# HELPER: LOG EVENTS
-# =========================
-def log_event(level: str, action: str, message: str, user_id=None):
-    try:
-        db.session.add(SystemLog(
-            level=level,
-            action=action,
-            message=message,
-            user_id=user_id
-        ))
-        db.session.commit()
-    except Exception:
-        db.session.rollback()
-
-
 # =========================
 # DASHBOARD (NOW WITH NUMBERS)
 # =========================
@@ -51,7 +39,7 @@ def dashboard():
     # Treat NULL / "None" as Pending
     pending = Application.query.filter(
         or_(
-            Application.status.in_(["Pending", "Submitted", "Reviewed"]),
+            Application.status.in_(OPEN_STATUSES),
             Application.status.is_(None),
             Application.status == "None"
         )
@@ -74,6 +62,7 @@ def dashboard():
 # =========================
 @committee_bp.route("/applications")
 @login_required
+@use_read_replica
 def applications():
     if current_user.role != "committee":
         abort(403)
@@ -98,13 +87,20 @@ def applications():
         .subquery()
     )
 
+    # plain columns (no ORM objects) so the page can be streamed row by row
     q = (
         db.session.query(
-            Application,
+            Application.id,
+            Application.status,
+            Application.student_id,
+            User.your_id.label("student_your_id"),
+            Scholarship.title.label("scholarship_title"),
             func.coalesce(agg.c.avg_score, 0).label("avg_score"),
             func.coalesce(agg.c.fail_count, 0).label("fail_count")
         )
         .outerjoin(agg, agg.c.app_id == Application.id)
+        .outerjoin(User, User.id == Application.student_id)
+        .outerjoin(Scholarship, Scholarship.id == Application.scholarship_id)
     )
 
     # --- status filter ---
@@ -113,7 +109,7 @@ def applications():
             # include Pending + NULL + string "None"
             q = q.filter(
                 or_(
-                    Application.status.in_(["Submitted", "Pending", "Reviewed"]),
+                    Application.status.in_(OPEN_STATUSES),
                     Application.status.is_(None),
                     Application.status == "None"
                 )
@@ -143,9 +139,10 @@ def applications():
     else:
         q = q.order_by(Application.id.desc())
 
-    rows = q.all()
+    # executed here (still routed to the replica), fetched while streaming
+    rows = batched_rows(q)
 
-    return render_template(
+    return stream_page(
         "committee/applications.html",
         rows=rows
     )
@@ -171,17 +168,94 @@ def view_application(application_id):
         if (r.score is not None and r.score < 50) or r.decision == "Fail"
     )
 
+    rank, rank_total = rank_of(app_obj.id)
+
+    stats = scholarship_stats(app_obj.scholarship_id)
+    app_stats = stats.for_application(app_obj.id) if stats else None
+    reviewer_bias = {r["reviewer_id"]: r for r in stats.reviewers} if stats else {}
+
     return render_template(
         "committee/view_application.html",
         application=app_obj,
         reviews=reviews,
         avg_score=avg_score,
-        fail_count=fail_count
+        fail_count=fail_count,
+        rank=rank,
+        rank_total=rank_total,
+        stats=stats,
+        app_stats=app_stats,
+        reviewer_bias=reviewer_bias
+    )
+
+
+# =========================
+# SCHOLARSHIP RANKING (TOP-K)
+# =========================
+@committee_bp.route("/scholarships/<int:scholarship_id>/ranking")
+@login_required
+def ranking(scholarship_id):
+    if current_user.role != "committee":
+        abort(403)
+
+    scholarship = Scholarship.query.get_or_404(scholarship_id)
+
+    try:
+        k = int(request.args.get("top", 50))
+    except ValueError:
+        k = 50
+    k = max(1, min(k, 1000))
+
+    rows = top_k(scholarship.id, k)
+
+    return render_template(
+        "committee/ranking.html",
+        scholarship=scholarship,
+        rows=rows,
+        top=k
+    )
+
+
+@committee_bp.route("/scholarships/<int:scholarship_id>/ranking/refresh", methods=["POST"])
+@login_required
+def refresh_ranking(scholarship_id):
+    if current_user.role != "committee":
+        abort(403)
+
+    scholarship = Scholarship.query.get_or_404(scholarship_id)
+    n = refresh_scholarship(scholarship.id)
+
+    log_event("info", "ranking_refresh", f"Ranking of scholarship {scholarship.id} rebuilt ({n} applications)", current_user.id)
+    flash(f"Ranking rebuilt for {n} applications.", "success")
+    return redirect(url_for("committee.ranking", scholarship_id=scholarship.id))
+
+
+# =========================
+# SCORE STATISTICS (per scholarship)
+# =========================
+@committee_bp.route("/scholarships/<int:scholarship_id>/stats")
+@login_required
+def score_stats(scholarship_id):
+    if current_user.role != "committee":
+        abort(403)
+
+    scholarship = Scholarship.query.get_or_404(scholarship_id)
+    stats = scholarship_stats(scholarship.id)
+
+    reviewer_ids = [r["reviewer_id"] for r in stats.reviewers] if stats else []
+    names = dict(
+        db.session.query(User.id, User.username).filter(User.id.in_(reviewer_ids)).all()
+    ) if reviewer_ids else {}
+
+    return render_template(
+        "committee/score_stats.html",
+        scholarship=scholarship,
+        stats=stats,
+        names=names
     )
 
 
 # =========================
-# ACCEPT / REJECT + NOTIFY (SIMULATED)
+# ACCEPT / REJECT + NOTIFY (DIGEST)
 # =========================
 @committee_bp.route("/applications/<int:application_id>/decision/<string:decision>", methods=["POST"])
 @login_required
@@ -196,25 +270,30 @@ def decide_application(application_id, decision):
         abort(400)
 
     new_status = "Accepted" if decision == "accept" else "Rejected"
-    app_obj.status = new_status
-    db.session.commit()
+
+    def work():
+        row = Application.query.get(application_id)
+        if row.status != new_status:
+            # mailed with the student's next digest
+            queue_notification(
+                row.student_id, "status",
+                f"Application #{row.id} has been {new_status}.",
+                application_id=row.id
+            )
+        row.status = new_status
+        db.session.commit()
+
+    try:
+        run_with_retry(work)
+    except (OperationalError, StaleDataError):
+        db.session.rollback()
+        flash("This application was changed by someone else. Please try again.", "warning")
+        return redirect(url_for("committee.view_application", application_id=application_id))
+    publish("decision", application_id)
 
     # log event (safe)
     log_event("info", "committee_decision", f"Application {app_obj.id} set to {new_status}", current_user.id)
 
-    # notification (simulated)
-    try:
-        student_email = app_obj.student.email if app_obj.student else None
-        if send_notification and student_email:
-            send_notification(
-                student_email,
-                f"Scholarship Application {new_status}",
-                f"Your application (ID {app_obj.id}) has been {new_status}."
-            )
-            flash(f"✅ Status updated to {new_status}. Email notification sent.", "success")
-        else:
-            flash(f"✅ Status updated to {new_status}. Notification simulated.", "success")
-    except Exception:
-        flash(f"✅ Status updated to {new_status}. Notification simulated (mail not configured).", "warning")
+    flash(f"✅ Status updated to {new_status}. The student is notified in the next digest.", "success")
 
     return redirect(url_for("committee.view_application", application_id=application_id))
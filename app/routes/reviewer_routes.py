@@ -1,7 +1,11 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
 from flask_login import login_required, current_user
-from app.extensions import db
-from app.models import Application, Review
+from app.models import Application, Review, ApplicationRanking
+from app.ranking import refresh_application_safe
+from app.review_workflow import submit_review
+from app.live_updates import publish
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
 
 reviewer_bp = Blueprint(
     "reviewer",
@@ -113,24 +117,30 @@ def review(app_id):
         # score (safe)
         score_raw = request.form.get("score", "").strip()
         try:
-            review_row.score = int(score_raw) if score_raw else None
+            score = int(score_raw) if score_raw else None
         except ValueError:
-            review_row.score = None
-
-        # comment
-        review_row.comment = request.form.get("comment")
+            score = None
 
         # IMPORTANT: main branch uses form field name "status"
-        # (example values: "Pass"/"Fail"/"Reviewed" etc depending on your form)
-        status_val = request.form.get("status")
-        if status_val:
-            review_row.decision = status_val
-            app_obj.status = status_val
-        else:
-            # fallback if no status provided
-            app_obj.status = "Reviewed"
-
-        db.session.commit()
+        # (example values: "Eligible"/"Rejected"/"Pending"). It is stored as
+        # this reviewer's decision; the application status is derived from
+        # all reviews (see app.review_workflow).
+        try:
+            submit_review(
+                app_obj.id,
+                current_user.id,
+                score=score,
+                decision=request.form.get("status"),
+                comment=request.form.get("comment")
+            )
+        except (OperationalError, StaleDataError):
+            flash("The system is busy right now. Please submit your review again.", "warning")
+            return redirect(url_for("reviewer.review", app_id=app_obj.id))
+
+        # keep the scholarship ranking in sync with the new score
+        refresh_application_safe(app_obj.id)
+        publish("review", app_obj.id)
+
         flash("Review submitted successfully", "success")
         return redirect(url_for("reviewer.dashboard"))
 
@@ -174,7 +184,15 @@ def ranking():
 
     reviews = Review.query.filter_by(reviewer_id=current_user.id).order_by(Review.score.desc()).all()
 
+    # global rank (all reviewers combined) for each application this reviewer scored
+    app_ids = [r.application_id for r in reviews]
+    global_ranks = {}
+    if app_ids:
+        rows = ApplicationRanking.query.filter(ApplicationRanking.application_id.in_(app_ids)).all()
+        global_ranks = {row.application_id: row.rank for row in rows}
+
     return render_template(
         "reviewer/ranking.html",
-        reviews=reviews
+        reviews=reviews,
+        global_ranks=global_ranks
     )
@@ -1,27 +1,21 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
 from flask_login import login_required, current_user
 from app.models import Scholarship, Application
 from app.extensions import db
+from app.ranking import refresh_application_safe
+from app.drafts import (
+    DOCUMENT_FIELDS, DraftPatchError, attach_document, document_error, form_data_from_request,
+    get_draft, missing_fields, patch_draft, save_document, save_form_data, submit_draft
+)
+from app.resumable_uploads import (
+    TUS_VERSION, UploadError, append_chunk, create_upload, delete_upload,
+    expires_at, load_upload, parse_metadata
+)
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
 import re
-import os
-import time
 
 student_bp = Blueprint('student', __name__, template_folder='templates/student')
 
-# ✅ allow these file types
-ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "pdf", "doc", "docx"}
-
-def allowed_file(filename: str) -> bool:
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def make_unique_filename(original_filename: str) -> str:
-    # prevent overwrite by adding user_id + timestamp
-    clean = secure_filename(original_filename)
-    return f"{current_user.id}_{int(time.time())}_{clean}"
-
-
 @student_bp.route('/dashboard')
 @login_required
 def dashboard():
@@ -60,119 +54,200 @@ def scholarships():
     return render_template('student/scholarships.html', scholarships=scholarships)
 
 
+def _open_scholarship_or_redirect(scholarship_id):
+    scholarship = Scholarship.query.get_or_404(scholarship_id)
+    # deadline is enforced here, not only by the close_deadlines job
+    if not scholarship.accepting_applications():
+        flash("Applications for this scholarship are closed.", "warning")
+        return scholarship, redirect(url_for('student.scholarships'))
+    return scholarship, None
+
+
 @student_bp.route('/apply/<int:scholarship_id>', methods=['GET', 'POST'])
 @login_required
 def apply(scholarship_id):
-    scholarship = Scholarship.query.get_or_404(scholarship_id)
-
-    # ✅ upload folder (absolute path on disk)
-    UPLOAD_FOLDER = os.path.join(current_app.root_path, 'static', 'uploads')
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+    scholarship, closed = _open_scholarship_or_redirect(scholarship_id)
+    if closed:
+        return closed
 
     if request.method == 'POST':
-        files_to_save = []
+        # classic one-shot POST (no JavaScript): whatever it carries is kept
+        # in the draft, so a rejected file does not cost the rest
+        form_data = form_data_from_request(request.form)
+        save_form_data(current_user.id, scholarship.id, form_data)
 
         # =========================
-        # SAVE FILES (png/jpg/jpeg/pdf/doc/docx)
+        # SAVE FILES (png/jpg/jpeg/pdf/doc/docx; income/CGPA proof PDF only)
         # =========================
-
-        # Passport photo
-        photo = request.files.get('photo')
-        if photo and photo.filename:
-            if not allowed_file(photo.filename):
-                flash("Photo file type not allowed. Allowed: png, jpg, jpeg, pdf, doc, docx", "danger")
+        for field in DOCUMENT_FIELDS:
+            upload = request.files.get(field)
+            if not (upload and upload.filename):
+                continue
+            error = document_error(field, upload.filename)
+            if error:
+                flash(error + " Your other answers and uploads were kept.", "danger")
                 return redirect(request.url)
+            attach_document(current_user.id, scholarship.id, field, save_document(upload, current_user.id))
+
+        return _submit(scholarship)
+
+    draft = get_draft(current_user.id, scholarship.id)
+    return render_template(
+        'student/apply.html',
+        scholarship=scholarship,
+        draft_data=(draft.form_data if draft else None) or {},
+        draft_documents=(draft.documents if draft else None) or {}
+    )
+
+
+def _submit(scholarship):
+    # =========================
+    # CREATE APPLICATION (draft -> application, no file transfer)
+    # =========================
+    draft = get_draft(current_user.id, scholarship.id)
+    if draft is None:
+        flash("This application was already submitted.", "info")
+        return redirect(url_for('student.dashboard'))
 
-            photo_filename = make_unique_filename(photo.filename)
-            photo.save(os.path.join(UPLOAD_FOLDER, photo_filename))
-            files_to_save.append(f"uploads/{photo_filename}")
+    missing = missing_fields(draft)
+    if missing:
+        flash("Please complete: " + ", ".join(m.replace("_", " ") for m in missing), "danger")
+        return redirect(url_for('student.apply', scholarship_id=scholarship.id))
 
-        # Academic document
-        academic_doc = request.files.get('academic_doc')
-        if academic_doc and academic_doc.filename:
-            if not allowed_file(academic_doc.filename):
-                flash("Document type not allowed. Allowed: png, jpg, jpeg, pdf, doc, docx", "danger")
-                return redirect(request.url)
+    new_application = submit_draft(current_user.id, scholarship.id)
+    if new_application is None:
+        flash("This application was already submitted.", "info")
+        return redirect(url_for('student.dashboard'))
 
-            doc_filename = make_unique_filename(academic_doc.filename)
-            academic_doc.save(os.path.join(UPLOAD_FOLDER, doc_filename))
-          
-            files_to_save.append(f"uploads/{doc_filename}")
+    refresh_application_safe(new_application.id)
 
-                # Income proof (PDF only)
-        income_proof = request.files.get('income_proof')
-        if income_proof and income_proof.filename:
-            if not income_proof.filename.lower().endswith('.pdf'):
-                flash("Income proof must be in PDF format.", "danger")
-                return redirect(request.url)
+    flash("Your application has been submitted!", "success")
+    return redirect(url_for('student.dashboard'))
 
-            income_filename = make_unique_filename(income_proof.filename)
-            income_proof.save(os.path.join(UPLOAD_FOLDER, income_filename))
-            files_to_save.append(f"uploads/{income_filename}")
 
-        # CGPA proof (PDF only)
-        cgpa_proof = request.files.get('cgpa_proof')
-        if cgpa_proof and cgpa_proof.filename:
-            if not cgpa_proof.filename.lower().endswith('.pdf'):
-                flash("CGPA proof must be in PDF format.", "danger")
-                return redirect(request.url)
+# =========================
+# DRAFT AUTOSAVE (JSON Patch) / PER-FILE UPLOAD / SUBMIT
+# =========================
+@student_bp.route('/apply/<int:scholarship_id>/draft', methods=['PATCH'])
+@login_required
+def patch_application_draft(scholarship_id):
+    scholarship, closed = _open_scholarship_or_redirect(scholarship_id)
+    if closed:
+        return jsonify(error="Applications for this scholarship are closed."), 409
+    if (request.content_length or 0) > current_app.config.get("DRAFT_MAX_PATCH_BYTES", 65536):
+        return jsonify(error="Patch too large."), 413
 
-            cgpa_filename = make_unique_filename(cgpa_proof.filename)
-            cgpa_proof.save(os.path.join(UPLOAD_FOLDER, cgpa_filename))
-            files_to_save.append(f"uploads/{cgpa_filename}")
+    try:
+        draft = patch_draft(current_user.id, scholarship.id, request.get_json(silent=True))
+    except DraftPatchError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(version=draft.version, saved_at=draft.updated_at.isoformat())
 
 
-        # =========================
-        # FORM DATA
-        # =========================
-        application_data = {
-            "full_name": request.form.get('full_name'),
-            "address": request.form.get('address'),
-            "ic_number": request.form.get('ic_number'),
-            "dob": request.form.get('dob'),
-            "age": request.form.get('age'),
-            "intake": request.form.get('intake'),
-            "programme": request.form.get('programme'),
-            "course": request.form.get('course'),
-            "nationality": request.form.get('nationality'),
-            "race": request.form.get('race'),
-            "sex": request.form.get('sex'),
-            "contact": request.form.get('contact'),
-            "home_contact": request.form.get('home_contact'),
-            "household_income": request.form.get('household_income'),
-            "email": request.form.get('email'),
-            "family_name": request.form.getlist('family_name[]'),
-            "relationship": request.form.getlist('relationship[]'),
-            "family_age": request.form.getlist('family_age[]'),
-            "occupation": request.form.getlist('occupation[]'),
-            "family_income": request.form.getlist('family_income[]'),
-            "school_name": request.form.get('school_name'),
-            "qualification": request.form.get('qualification'),
-            "activity_type": request.form.getlist('activity_type[]'),
-            "level": request.form.getlist('level[]'),
-            "year": request.form.getlist('year[]'),
-            "achievement": request.form.getlist('achievement[]'),
-            "statement": request.form.get('statement')
-        }
+@student_bp.route('/apply/<int:scholarship_id>/draft/documents/<field>', methods=['POST'])
+@login_required
+def upload_draft_document(scholarship_id, field):
+    scholarship, closed = _open_scholarship_or_redirect(scholarship_id)
+    if closed:
+        return jsonify(error="Applications for this scholarship are closed."), 409
 
-        # =========================
-        # CREATE APPLICATION
-        # =========================
-        new_application = Application(
-            student_id=current_user.id,
-            scholarship_id=scholarship.id,
-            documents=",".join(files_to_save),
-            status="Pending",
-            form_data=application_data
-        )
-
-        db.session.add(new_application)
-        db.session.commit()
+    upload = request.files.get('file')
+    if not (upload and upload.filename):
+        return jsonify(error="No file."), 400
+    error = document_error(field, upload.filename)
+    if error:
+        return jsonify(error=error), 400
+
+    path = save_document(upload, current_user.id)
+    draft = attach_document(current_user.id, scholarship.id, field, path)
+    return jsonify(field=field, filename=path.rsplit("/", 1)[-1], version=draft.version)
 
-        flash("Your application has been submitted!", "success")
-        return redirect(url_for('student.dashboard'))
 
-    return render_template('student/apply.html', scholarship=scholarship)
+# =========================
+# RESUMABLE UPLOADS (tus subset, app.resumable_uploads)
+# =========================
+def _tus_response(body="", status=204, **headers):
+    response = current_app.response_class(body, status=status)
+    response.headers["Tus-Resumable"] = TUS_VERSION
+    response.headers["Cache-Control"] = "no-store"
+    for name, value in headers.items():
+        response.headers[name.replace("_", "-")] = str(value)
+    return response
+
+
+def _int_header(name):
+    value = request.headers.get(name, "")
+    return int(value) if value.isdigit() else None
+
+
+@student_bp.route('/apply/<int:scholarship_id>/draft/documents/<field>/uploads', methods=['POST'])
+@login_required
+def create_resumable_upload(scholarship_id, field):
+    scholarship, closed = _open_scholarship_or_redirect(scholarship_id)
+    if closed:
+        return _tus_response("Applications for this scholarship are closed.", 409)
+
+    try:
+        metadata = parse_metadata(request.headers.get("Upload-Metadata"))
+        info = create_upload(current_user.id, scholarship.id, field,
+                             _int_header("Upload-Length"), metadata.get("filename"))
+    except UploadError as e:
+        return _tus_response(str(e), e.status)
+
+    return _tus_response(
+        status=201,
+        Location=url_for('student.resumable_upload', token=info["token"]),
+        Upload_Offset=0,
+        Upload_Expires=expires_at(info).strftime("%a, %d %b %Y %H:%M:%S GMT"),
+    )
+
+
+@student_bp.route('/uploads/<token>', methods=['HEAD', 'PATCH', 'DELETE'])
+@login_required
+def resumable_upload(token):
+    try:
+        info = load_upload(token, current_user.id)
+
+        if request.method == 'HEAD':
+            return _tus_response(Upload_Offset=info["offset"], Upload_Length=info["length"])
+
+        if request.method == 'DELETE':
+            delete_upload(token)
+            return _tus_response()
+
+        if request.mimetype != "application/offset+octet-stream":
+            return _tus_response("Content-Type must be application/offset+octet-stream.", 415)
+        offset = _int_header("Upload-Offset")
+        if offset is None:
+            return _tus_response("Upload-Offset is required.", 400)
+
+        if info.get("document"):
+            # already complete: the answer to the last PATCH was lost
+            if offset != info["length"]:
+                return _tus_response(f"Upload-Offset {offset} does not match {info['length']}.", 409)
+            return _tus_response(Upload_Offset=offset, X_Document_Name=info["document"].rsplit("/", 1)[-1])
+
+        # the deadline may have passed since the upload was created
+        scholarship = Scholarship.query.get(info["scholarship_id"])
+        if scholarship is None or not scholarship.accepting_applications():
+            return _tus_response("Applications for this scholarship are closed.", 409)
+
+        # the last chunk also moves the file into the draft, like a direct upload
+        info = append_chunk(info, offset, request.stream)
+        if not info.get("document"):
+            return _tus_response(Upload_Offset=info["offset"])
+        return _tus_response(Upload_Offset=info["offset"], X_Document_Name=info["document"].rsplit("/", 1)[-1])
+    except UploadError as e:
+        return _tus_response(str(e), e.status)
+
+
+@student_bp.route('/apply/<int:scholarship_id>/submit', methods=['POST'])
+@login_required
+def submit_application_draft(scholarship_id):
+    scholarship, closed = _open_scholarship_or_redirect(scholarship_id)
+    if closed:
+        return closed
+    return _submit(scholarship)
 
 
 @student_bp.route('/profile', methods=['GET', 'POST'])
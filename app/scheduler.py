@@ -0,0 +1,397 @@
+"""
+In-process background job scheduler.
+
+Jobs run in one scheduler thread per process (SCHEDULER_ENABLED=1, set by
+gunicorn.conf.py), never on the request path:
+
+  close_deadlines     every 5 min   mark scholarships past their deadline closed
+  transition_statuses every 10 min  re-derive open application statuses from
+                                    their reviews (app.review_workflow), in batches;
+                                    queues the student's status digest line and
+                                    refreshes the live dashboards
+  send_digests        DIGEST_INTERVAL  notification digests (app.notifications)
+  refresh_rollups     REPORT_REFRESH_INTERVAL  fold queued changes into the
+                                    report rollups, build them on first run
+                                    (app.report_rollup)
+  refresh_rankings    every 10 min  rebuild committee rankings that are missing
+                                    rows or were built in the other
+                                    RANKING_NORMALIZE mode (app.ranking)
+  nightly_rollups     daily at SCHEDULER_NIGHTLY_AT (UTC)  drain the report
+                                    rollup queue (app.report_rollup)
+  archive_logs        hourly        move system logs older than LOG_RETENTION_DAYS
+                                    to the gzip archives (app.log_archive)
+  purge_drafts        hourly        delete abandoned application drafts (app.drafts)
+  purge_uploads       hourly        delete unfinished resumable uploads
+                                    (app.resumable_uploads)
+
+Job state lives in the scheduled_job table: next run, last result/duration,
+run and error counts - it survives restarts and deploys. Every process runs
+the same loop; a job is claimed with one conditional UPDATE (due, and no
+unexpired lease) so exactly one process - on any host sharing the database -
+runs each occurrence. The lease expires after the job's timeout, so a worker
+that dies mid-job only delays the next run.
+
+student_routes.apply checks Scholarship.accepting_applications() itself, so
+a deadline holds even between two close_deadlines runs.
+
+    flask --app run:create_app list-jobs
+    flask --app run:create_app run-job close_deadlines [--force]
+"""
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from app.extensions import db
+from app.models import Application, Review, Scholarship, ScheduledJob
+from app.review_workflow import OPEN_STATUSES, derive_application_status
+from app.db_retry import run_with_retry
+from app.audit import log_event
+from app.live_updates import publish
+from app.notifications import queue_notification
+
+
+DEFAULT_TICK = 15
+DEFAULT_TIMEOUT = 600
+DEFAULT_NIGHTLY_AT = "02:00"
+STATUS_BATCH = 500
+
+
+class Job:
+    """A named callable run every `every` seconds or daily at `at` ("HH:MM", UTC)."""
+
+    def __init__(self, name, func, every=None, at=None, timeout=DEFAULT_TIMEOUT):
+        self.name = name
+        self.func = func
+        self.every = every
+        self.at = at
+        self.timeout = timeout
+
+    def next_after(self, moment):
+        if self.at is None:
+            return moment + timedelta(seconds=self.every)
+        hour, minute = (int(p) for p in self.at.split(":"))
+        candidate = moment.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return candidate if candidate > moment else candidate + timedelta(days=1)
+
+    def first_run(self, now):
+        return now if self.at is None else self.next_after(now)
+
+
+# =========================
+# JOBS
+# =========================
+def close_deadlines():
+    now = datetime.utcnow()
+    candidates = Scholarship.query.filter(
+        Scholarship.closed_at.is_(None),
+        Scholarship.application_deadline.isnot(None),
+        Scholarship.application_deadline <= now,
+    ).all()
+    closed = [s for s in candidates if not s.accepting_applications(now)]
+    for s in closed:
+        s.closed_at = now
+    db.session.commit()
+
+    for s in closed:
+        log_event("info", "SCHOLARSHIP_CLOSED", f"Scholarship closed at its deadline: {s.title} (ID {s.id})")
+    return f"{len(closed)} scholarships closed"
+
+
+def transition_statuses(batch_size=STATUS_BATCH):
+    """Bring every open application's status in line with its reviews."""
+    open_status = or_(Application.status.in_(OPEN_STATUSES), Application.status.is_(None))
+    last_id, changed = 0, 0
+    while True:
+        def work():
+            apps = (
+                Application.query
+                .filter(open_status, Application.id > last_id)
+                .order_by(Application.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not apps:
+                return None, 0
+
+            decisions = {}
+            for app_id, decision in (
+                db.session.query(Review.application_id, Review.decision)
+                .filter(Review.application_id.in_([a.id for a in apps]))
+            ):
+                decisions.setdefault(app_id, []).append(decision)
+
+            moved = []
+            for a in apps:
+                if a.id not in decisions:
+                    continue  # no reviewer assigned yet: leave as submitted
+                status = derive_application_status(a.status, decisions[a.id])
+                if status != a.status:
+                    # same digest line as admin / committee status changes
+                    queue_notification(
+                        a.student_id, "status",
+                        f"Application #{a.id}: {a.status or 'Submitted'} -> {status}",
+                        application_id=a.id
+                    )
+                    a.status = status
+                    moved.append(a.id)
+            db.session.commit()
+            return apps[-1].id, moved
+
+        last_id, moved = run_with_retry(work)
+        if last_id is None:
+            return f"{changed} statuses updated"
+        if moved:
+            changed += len(moved)
+            publish("status")   # once per batch: the dashboards recount anyway
+            log_event("info", "STATUS_TRANSITION",
+                      f"{len(moved)} application statuses re-derived from reviews: "
+                      + ", ".join(f"#{i}" for i in moved[:50]) + (" ..." if len(moved) > 50 else ""))
+
+
+def send_digests():
+    from app.notifications import send_due_digests
+    result = send_due_digests()
+    return f"{result['sent']} digests sent, {result['failed']} failed"
+
+
+def archive_logs():
+    from app.audit import file_sink_enabled
+    from app.log_archive import apply_retention
+    if file_sink_enabled():
+        return "logs go to rotated files, nothing to archive"
+    return f"{apply_retention()} log rows archived"
+
+
+def purge_drafts():
+    from app.drafts import purge_drafts as purge
+    return f"{purge()} stale drafts deleted"
+
+
+def purge_uploads():
+    from app.resumable_uploads import purge_uploads as purge
+    return f"{purge()} unfinished uploads deleted"
+
+
+def refresh_rollups():
+    from app.report_rollup import ensure_rollups
+    return f"{ensure_rollups()} rollup keys refreshed"
+
+
+def refresh_rankings():
+    from app.ranking import refresh_stale_rankings
+    return f"{refresh_stale_rankings()} rankings rebuilt"
+
+
+def nightly_rollups():
+    from app.report_rollup import refresh_rollups
+    total = 0
+    while True:
+        n = refresh_rollups()
+        total += n
+        if not n:
+            return f"{total} rollup keys refreshed"
+
+
+def default_jobs(app):
+    return [
+        Job("close_deadlines", close_deadlines, every=300),
+        Job("transition_statuses", transition_statuses, every=600),
+        Job("send_digests", send_digests, every=app.config.get("DIGEST_INTERVAL", 60)),
+        Job("refresh_rollups", refresh_rollups, every=app.config.get("REPORT_REFRESH_INTERVAL", 60)),
+        Job("refresh_rankings", refresh_rankings, every=600),
+        Job("nightly_rollups", nightly_rollups, at=app.config["SCHEDULER_NIGHTLY_AT"], timeout=3600),
+        Job("archive_logs", archive_logs, every=3600, timeout=3600),
+        Job("purge_drafts", purge_drafts, every=3600),
+        Job("purge_uploads", purge_uploads, every=3600),
+    ]
+
+
+# =========================
+# STATE + LEASES
+# =========================
+def _owner():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def ensure_job_rows(jobs) -> None:
+    existing = {name for (name,) in db.session.query(ScheduledJob.name)}
+    now = datetime.utcnow()
+    for job in jobs:
+        if job.name not in existing:
+            db.session.add(ScheduledJob(name=job.name, next_run_at=job.first_run(now)))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # another process inserted them first
+
+
+def claim(job, now=None, force=False) -> bool:
+    """Take the job's lease if it is due and free. Exactly one process wins."""
+    now = now or datetime.utcnow()
+    q = db.session.query(ScheduledJob).filter(
+        ScheduledJob.name == job.name,
+        or_(ScheduledJob.locked_until.is_(None), ScheduledJob.locked_until < now),
+    )
+    if not force:
+        q = q.filter(ScheduledJob.next_run_at <= now)
+    won = q.update({
+        ScheduledJob.locked_by: _owner(),
+        ScheduledJob.locked_until: now + timedelta(seconds=job.timeout),
+        ScheduledJob.last_started_at: now,
+    }, synchronize_session=False)
+    db.session.commit()
+    return won == 1
+
+
+def run_job(job, force=False):
+    """Claim and run one job. Returns (ran, status, result)."""
+    if not claim(job, force=force):
+        return False, None, None
+
+    t0 = time.perf_counter()
+    try:
+        result, status = job.func(), "ok"
+    except Exception as e:
+        db.session.rollback()
+        result, status = f"{type(e).__name__}: {e}", "error"
+    duration = time.perf_counter() - t0
+
+    finished = datetime.utcnow()
+    row = ScheduledJob.query.filter_by(name=job.name, locked_by=_owner()).first()
+    if row is not None:   # None: lease expired and was taken over meanwhile
+        row.locked_by = None
+        row.locked_until = None
+        row.next_run_at = job.next_after(finished)
+        row.last_finished_at = finished
+        row.last_status = status
+        row.last_result = None if result is None else str(result)[:2000]
+        row.last_duration = duration
+        row.run_count += 1
+        if status == "error":
+            row.error_count += 1
+        db.session.commit()
+
+    if status == "error":
+        log_event("error", "JOB_FAILED", f"Job {job.name} failed: {result}")
+    return True, status, result
+
+
+# =========================
+# SCHEDULER THREAD
+# =========================
+class Scheduler:
+    def __init__(self, app, jobs, tick=DEFAULT_TICK):
+        self.app = app
+        self.jobs = {job.name: job for job in jobs}
+        self.tick = tick
+        self._thread = None
+        self._stop = threading.Event()
+        self._rows_ready = False
+
+    def start(self):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="job-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=30):
+        """Stop and wait for a job in progress (the master calls this before forking)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.tick):
+            with self.app.app_context():
+                try:
+                    if not self._rows_ready:
+                        # not at start: create_app creates the tables after init
+                        ensure_job_rows(self.jobs.values())
+                        self._rows_ready = True
+                    self.run_due()
+                except Exception as e:
+                    db.session.rollback()
+                    self.app.logger.exception("job scheduler tick failed")
+                    log_event("error", "SCHEDULER_FAILED", f"Scheduler tick failed: {type(e).__name__}: {e}")
+                finally:
+                    db.session.remove()
+
+    def run_due(self):
+        now = datetime.utcnow()
+        due = [
+            name for (name,) in db.session.query(ScheduledJob.name).filter(
+                ScheduledJob.next_run_at <= now,
+                or_(ScheduledJob.locked_until.is_(None), ScheduledJob.locked_until < now),
+            )
+        ]
+        for name in due:
+            if self._stop.is_set():
+                break
+            job = self.jobs.get(name)
+            if job is not None:
+                run_job(job)
+
+    def after_fork(self) -> None:
+        """In a forked worker: a fresh scheduler thread (threads do not survive fork)."""
+        self.start()
+
+
+# =========================
+# CLI
+# =========================
+def _registered_jobs():
+    scheduler = current_app.extensions.get("scheduler")
+    return scheduler.jobs if scheduler else {j.name: j for j in default_jobs(current_app)}
+
+
+@click.command("list-jobs")
+@with_appcontext
+def list_jobs_command():
+    """Show scheduled jobs and their last run."""
+    jobs = _registered_jobs()
+    ensure_job_rows(jobs.values())
+    for row in ScheduledJob.query.order_by(ScheduledJob.name).all():
+        if row.name not in jobs:
+            continue
+        last = f"{row.last_status} in {row.last_duration:.2f}s ({row.last_result})" if row.last_status else "never run"
+        lock = f"  🔒 {row.locked_by} until {row.locked_until:%H:%M:%S}" if row.locked_by else ""
+        click.echo(f"{row.name:<20} next {row.next_run_at:%Y-%m-%d %H:%M:%S}  runs {row.run_count} "
+                   f"errors {row.error_count}  last: {last}{lock}")
+
+
+@click.command("run-job")
+@click.argument("name")
+@click.option("--force", is_flag=True, help="run even if it is not due yet")
+@with_appcontext
+def run_job_command(name, force):
+    """Run one scheduled job now (respects the job lease)."""
+    jobs = _registered_jobs()
+    if name not in jobs:
+        raise click.ClickException(f"unknown job {name!r} (choose from {', '.join(sorted(jobs))})")
+    ensure_job_rows(jobs.values())
+    ran, status, result = run_job(jobs[name], force=force)
+    if not ran:
+        raise click.ClickException(f"{name} is not due or is running elsewhere (use --force if not due)")
+    click.echo(f"{'✅' if status == 'ok' else '❌'} {name}: {result}")
+
+
+def init_scheduler(app) -> None:
+    app.config.setdefault("SCHEDULER_ENABLED", os.environ.get("SCHEDULER_ENABLED", "0") == "1")
+    app.config.setdefault("SCHEDULER_TICK", int(os.environ.get("SCHEDULER_TICK", DEFAULT_TICK)))
+    app.config.setdefault("SCHEDULER_NIGHTLY_AT", os.environ.get("SCHEDULER_NIGHTLY_AT", DEFAULT_NIGHTLY_AT))
+
+    if app.config["SCHEDULER_ENABLED"]:
+        scheduler = Scheduler(app, default_jobs(app), tick=app.config["SCHEDULER_TICK"])
+        scheduler.start()
+        app.extensions["scheduler"] = scheduler
+
+    app.cli.add_command(list_jobs_command)
+    app.cli.add_command(run_job_command)
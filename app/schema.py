@@ -0,0 +1,95 @@
+"""
+Small additive schema upgrades.
+
+db.create_all() creates missing tables but never adds columns to tables that
+already exist, so databases created by older versions of the app would break
+when a model gains a column. ensure_columns() adds those columns in place, and
+ensure_indexes() creates indexes declared on models after their table existed.
+
+With SCHEMA_AUTO_CREATE=0 the app does not touch the schema at startup;
+run `flask --app run:create_app init-db` as a deploy/migration step instead.
+"""
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import inspect, text
+
+
+# table -> [(column name, column DDL)]
+ADDED_COLUMNS = {
+    "application": [
+        ("version", "INTEGER NOT NULL DEFAULT 1"),
+    ],
+    "review": [
+        ("version", "INTEGER NOT NULL DEFAULT 1"),
+    ],
+    "scholarship": [
+        ("closed_at", "TIMESTAMP"),
+    ],
+}
+
+
+def ensure_columns(engine) -> list:
+    """Add every column of ADDED_COLUMNS that is missing. Returns the added 'table.column' names."""
+    insp = inspect(engine)
+    tables = set(insp.get_table_names())
+    added = []
+
+    with engine.begin() as conn:
+        for table, columns in ADDED_COLUMNS.items():
+            if table not in tables:
+                continue
+            existing = {c["name"] for c in insp.get_columns(table)}
+            for name, ddl in columns:
+                if name in existing:
+                    continue
+                conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN {name} {ddl}'))
+                added.append(f"{table}.{name}")
+
+    return added
+
+
+def ensure_indexes(engine, metadata) -> list:
+    """Create every model index missing from the database. Returns the created index names."""
+    insp = inspect(engine)
+    tables = set(insp.get_table_names())
+    created = []
+
+    for table in metadata.sorted_tables:
+        if table.name not in tables:
+            continue
+        existing = {ix["name"] for ix in insp.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            # dialect-specific indexes (e.g. the PostgreSQL GIN index)
+            ddl_if = getattr(index, "_ddl_if", None)
+            if ddl_if is not None and ddl_if.dialect and ddl_if.dialect != engine.dialect.name:
+                continue
+            index.create(bind=engine, checkfirst=True)
+            created.append(index.name)
+
+    return created
+
+
+def upgrade_schema(engine, metadata) -> list:
+    """ensure_columns + ensure_indexes (run after create_all)."""
+    return ensure_columns(engine) + ensure_indexes(engine, metadata)
+
+
+# =========================
+# CLI: explicit schema step (used when SCHEMA_AUTO_CREATE=0)
+# =========================
+@click.command("init-db")
+@with_appcontext
+def init_db_command():
+    """Create missing tables, columns and indexes."""
+    from app.extensions import db
+    import app.models  # noqa: F401  (register every model on db.metadata)
+
+    db.create_all()
+    added = upgrade_schema(db.engine, db.metadata)
+    click.echo("✅ schema up to date" + (f" (added {', '.join(added)})" if added else ""))
+
+
+def init_schema_cli(app) -> None:
+    app.cli.add_command(init_db_command)
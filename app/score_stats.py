@@ -0,0 +1,222 @@
+"""
+Score statistics for committee decision support.
+
+All scores of one scholarship are loaded in a single query into NumPy arrays
+and everything is computed vectorized (unique / bincount), so a
+scholarship with 100k reviews is a few milliseconds of array work:
+
+  - overall mean / std / percentiles of review scores
+  - per reviewer: count, mean, std, bias (mean - overall mean), fail rate
+  - inter-reviewer agreement: ICC(1) over applications with 2+ scores and
+    the share of those where every reviewer agrees on pass/fail
+  - outliers: reviews far from the other reviewers' mean of the same
+    application, and reviewers whose bias is extreme among reviewers
+
+Results are cached per scholarship and reused until the scholarship's
+reviews change (count / last reviewed_at / version sum fingerprint).
+NumPy is optional: without it the committee pages simply omit the panel.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import func
+
+from app.extensions import db
+from app.models import Application, Review
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+
+FAIL_SCORE = 50
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# a review is an outlier when it is this many within-application standard
+# deviations away from the mean of the other reviewers of the same application
+OUTLIER_Z = 2.0
+# reviewers need this many scores before their bias can flag them
+MIN_REVIEWER_SCORES = 5
+
+DEFAULT_TTL = 30
+CACHE_SIZE = 64
+
+
+def available() -> bool:
+    return np is not None
+
+
+# =========================
+# COMPUTATION
+# =========================
+class ScoreStats:
+    """Vectorized statistics of one scholarship's review scores."""
+
+    def __init__(self, scholarship_id, app_ids, reviewer_ids, scores):
+        self.scholarship_id = scholarship_id
+        self.count = int(scores.size)
+        self.summary = {"count": self.count, "mean": None, "std": None,
+                        "percentiles": {p: None for p in PERCENTILES}, "fail_rate": None}
+        self.reviewers = []
+        self.agreement = {"icc": None, "unanimous_rate": None, "applications": 0}
+        self.outlier_reviews = {}   # application_id -> {reviewer_id: deviation}
+        self._app_ids = np.empty(0, dtype=np.int64)
+        self._app_means = np.empty(0)
+        self._sorted_means = np.empty(0)
+        if self.count:
+            self._compute(app_ids, reviewer_ids, scores)
+
+    def _compute(self, app_ids, reviewer_ids, scores):
+        mean = scores.mean()
+        fails = scores < FAIL_SCORE
+        self.summary.update(
+            mean=float(mean),
+            std=float(scores.std()),
+            percentiles=dict(zip(PERCENTILES, (float(v) for v in np.percentile(scores, PERCENTILES)))),
+            fail_rate=float(fails.mean()),
+        )
+
+        # ---- per reviewer ----
+        r_ids, r_inv = np.unique(reviewer_ids, return_inverse=True)
+        r_n = np.bincount(r_inv)
+        r_mean = np.bincount(r_inv, weights=scores) / r_n
+        r_var = np.maximum(np.bincount(r_inv, weights=scores * scores) / r_n - r_mean ** 2, 0.0)
+        r_fail = np.bincount(r_inv, weights=fails) / r_n
+        r_bias = r_mean - mean
+
+        eligible = r_n >= MIN_REVIEWER_SCORES
+        bias_z = np.zeros_like(r_bias)
+        if eligible.sum() >= 3:
+            spread = r_bias[eligible].std()
+            if spread > 0:
+                bias_z = (r_bias - r_bias[eligible].mean()) / spread
+        r_outlier = eligible & (np.abs(bias_z) > OUTLIER_Z)
+
+        order = np.argsort(-r_n, kind="stable")
+        self.reviewers = [{
+            "reviewer_id": int(r_ids[i]), "count": int(r_n[i]),
+            "mean": float(r_mean[i]), "std": float(np.sqrt(r_var[i])),
+            "bias": float(r_bias[i]), "fail_rate": float(r_fail[i]),
+            "outlier": bool(r_outlier[i]),
+        } for i in order]
+
+        # ---- per application ----
+        a_ids, a_inv = np.unique(app_ids, return_inverse=True)
+        a_n = np.bincount(a_inv)
+        a_sum = np.bincount(a_inv, weights=scores)
+        a_mean = a_sum / a_n
+        self._app_ids, self._app_means = a_ids, a_mean
+        self._sorted_means = np.sort(a_mean)
+
+        # ---- agreement (one-way random effects ICC(1)) over apps with 2+ scores ----
+        multi = a_n >= 2
+        k = int(multi.sum())
+        self.agreement["applications"] = k
+        in_multi = multi[a_inv]
+        if k >= 2:
+            n_i, m_i = a_n[multi], a_mean[multi]
+            n_total = n_i.sum()
+            grand = (n_i * m_i).sum() / n_total
+            ss_between = (n_i * (m_i - grand) ** 2).sum()
+            ss_within = ((scores[in_multi] - a_mean[a_inv][in_multi]) ** 2).sum()
+            ms_between = ss_between / (k - 1)
+            ms_within = ss_within / (n_total - k) if n_total > k else 0.0
+            n0 = (n_total - (n_i ** 2).sum() / n_total) / (k - 1)
+            denom = ms_between + (n0 - 1) * ms_within
+            self.agreement["icc"] = float((ms_between - ms_within) / denom) if denom > 0 else None
+
+            a_fail = np.bincount(a_inv, weights=fails)[multi]
+            self.agreement["unanimous_rate"] = float(((a_fail == 0) | (a_fail == n_i)).mean())
+
+            # ---- outlier reviews: leave-one-out deviation ----
+            sigma_w = np.sqrt(ms_within)
+            if sigma_w > 0:
+                n_rev = a_n[a_inv]
+                others = np.where(n_rev > 1, (a_sum[a_inv] - scores) / np.maximum(n_rev - 1, 1), np.nan)
+                dev = scores - others
+                limit = OUTLIER_Z * sigma_w * np.sqrt(1 + 1 / np.maximum(n_rev - 1, 1))
+                flagged = np.flatnonzero(in_multi & (np.abs(dev) > limit))
+                for i in flagged:
+                    self.outlier_reviews.setdefault(int(app_ids[i]), {})[int(reviewer_ids[i])] = float(dev[i])
+
+    def for_application(self, application_id):
+        """Mean score, percentile among the scholarship's applications, and outlier reviews."""
+        pos = np.searchsorted(self._app_ids, application_id)
+        if pos >= self._app_ids.size or self._app_ids[pos] != application_id:
+            return None
+        mean = self._app_means[pos]
+        below = np.searchsorted(self._sorted_means, mean, side="left")
+        return {
+            "mean": float(mean),
+            "percentile": round(100.0 * below / self._sorted_means.size, 1),
+            "outlier_reviews": self.outlier_reviews.get(application_id, {}),
+        }
+
+
+def load_arrays(scholarship_id):
+    """(application_ids, reviewer_ids, scores) of every scored review, one query."""
+    rows = (
+        db.session.query(Review.application_id, Review.reviewer_id, Review.score)
+        .join(Application, Application.id == Review.application_id)
+        .filter(Application.scholarship_id == scholarship_id, Review.score.isnot(None))
+        .all()
+    )
+    n = len(rows)
+    return (
+        np.fromiter((r[0] for r in rows), dtype=np.int64, count=n),
+        np.fromiter((r[1] for r in rows), dtype=np.int64, count=n),
+        np.fromiter((r[2] for r in rows), dtype=np.float64, count=n),
+    )
+
+
+# =========================
+# CACHE
+# =========================
+_cache = OrderedDict()   # scholarship_id -> (fingerprint, checked_at, ScoreStats)
+_cache_lock = threading.Lock()
+
+
+def _fingerprint(scholarship_id):
+    return tuple(
+        db.session.query(func.count(Review.id), func.max(Review.reviewed_at), func.sum(Review.version))
+        .join(Application, Application.id == Review.application_id)
+        .filter(Application.scholarship_id == scholarship_id)
+        .one()
+    )
+
+
+def scholarship_stats(scholarship_id):
+    """Cached ScoreStats of a scholarship, or None when NumPy is not installed."""
+    if np is None:
+        return None
+
+    ttl = current_app.config.get("SCORE_STATS_TTL", DEFAULT_TTL)
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _cache.get(scholarship_id)
+    if cached and now - cached[1] < ttl:
+        return cached[2]
+
+    fingerprint = _fingerprint(scholarship_id)
+    if cached and cached[0] == fingerprint:
+        stats = cached[2]
+    else:
+        stats = ScoreStats(scholarship_id, *load_arrays(scholarship_id))
+
+    with _cache_lock:
+        _cache[scholarship_id] = (fingerprint, now, stats)
+        _cache.move_to_end(scholarship_id)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return stats
+
+
+def invalidate(scholarship_id=None) -> None:
+    with _cache_lock:
+        if scholarship_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(scholarship_id, None)
@@ -0,0 +1,277 @@
+"""
+Synthetic data generator and `flask seed-data` command.
+
+Rows are generated in batches and written with Core executemany inserts
+inside large transactions; every seeded account shares one precomputed
+password hash. This is what makes 1M applications take minutes:
+
+    flask --app run:create_app seed-data --applications 1000000 --users 200000
+
+All seeded accounts use the password given by --password (default
+"seed-pass1"). Seeding appends to an existing database: ids continue after
+the current maximum and usernames/emails carry a unique run tag.
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func
+from werkzeug.security import generate_password_hash
+
+from app.extensions import db
+from app.models import User, Scholarship, Application, Review, SystemLog
+from app.report_rollup import rebuild_rollups
+from app.ranking import refresh_stale_rankings
+
+
+DEFAULT_PASSWORD = "seed-pass1"
+
+APPLICATION_STATUSES = ["Pending", "Under Review", "Reviewed", "Accepted", "Rejected"]
+REVIEW_DECISIONS = ["Eligible", "Rejected"]
+
+
+# =========================
+# ROW GENERATORS
+# =========================
+def fake_form_data(rng, i):
+    """form_data shaped exactly like student_routes.apply stores it."""
+    n_family = rng.randint(1, 4)
+    n_activity = rng.randint(0, 3)
+    return {
+        "full_name": f"Student {i}",
+        "address": f"{rng.randint(1, 999)} Jalan Seed {i}, Cyberjaya",
+        "ic_number": f"{rng.randint(100000, 999999)}-{rng.randint(10, 99)}-{rng.randint(1000, 9999)}",
+        "dob": f"{rng.randint(1998, 2006)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+        "age": str(rng.randint(18, 26)),
+        "intake": rng.choice(["2025/2026 T1", "2025/2026 T2", "2025/2026 T3"]),
+        "programme": rng.choice(["Foundation", "Diploma", "Degree"]),
+        "course": rng.choice(["Computer Science", "Engineering", "Business", "Law"]),
+        "nationality": "Malaysian",
+        "race": rng.choice(["Malay", "Chinese", "Indian", "Other"]),
+        "sex": rng.choice(["Male", "Female"]),
+        "contact": f"01{rng.randint(10000000, 99999999)}",
+        "home_contact": f"03{rng.randint(10000000, 99999999)}",
+        "household_income": str(rng.randint(1000, 15000)),
+        "email": f"student{i}@seed.example.com",
+        "family_name": [f"Family {i}-{k}" for k in range(n_family)],
+        "relationship": [rng.choice(["Father", "Mother", "Sibling"]) for _ in range(n_family)],
+        "family_age": [str(rng.randint(10, 70)) for _ in range(n_family)],
+        "occupation": [rng.choice(["Teacher", "Clerk", "Driver", "Student"]) for _ in range(n_family)],
+        "family_income": [str(rng.randint(0, 6000)) for _ in range(n_family)],
+        "school_name": f"SMK Seed {rng.randint(1, 200)}",
+        "qualification": rng.choice(["SPM", "STPM", "A-Level", "UEC"]),
+        "activity_type": [rng.choice(["Sports", "Club", "Volunteer"]) for _ in range(n_activity)],
+        "level": [rng.choice(["School", "State", "National"]) for _ in range(n_activity)],
+        "year": [str(rng.randint(2018, 2025)) for _ in range(n_activity)],
+        "achievement": [rng.choice(["Winner", "Participant", "Leader"]) for _ in range(n_activity)],
+        "statement": "I would like to apply for this scholarship. " * rng.randint(3, 20),
+    }
+
+
+def fake_eligibility(rng):
+    """eligibility_criteria in the structured format admin.create_scholarship writes."""
+    criteria = {
+        "min_cgpa": rng.choice([2.5, 3.0, 3.3, 3.5]),
+        "max_income": rng.choice([4000, 6000, 8000, 10000]),
+    }
+    extra = rng.sample(["Malaysian citizen", "Full-time student", "No other scholarship",
+                        "Active in co-curriculum", "Good conduct"], rng.randint(0, 3))
+    if extra:
+        criteria["required_criteria"] = extra
+    return criteria
+
+
+def _next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# =========================
+# SEEDING
+# =========================
+def seed_database(users=1000, reviewers=50, committee=5, admins=1, scholarships=20,
+                  applications=5000, reviews_per_app=3, logs=10000,
+                  batch_size=10000, commit_every=200000, seed=None,
+                  password=DEFAULT_PASSWORD, echo=None):
+    """
+    Bulk-insert synthetic data. Returns {"emails": {role: first email}, "counts": {...}}.
+    Must run inside an app context.
+    """
+    rng = random.Random(seed)
+    echo = echo or (lambda msg: None)
+    now = datetime.utcnow()
+    tag = f"{int(time.time())}{rng.randint(100, 999)}"
+
+    # one hash for every account: hashing is the slowest part of creating users
+    pw_hash = generate_password_hash(password)
+
+    pending = 0
+
+    def write(model, rows):
+        nonlocal pending
+        table = model.__table__
+        total = 0
+        for batch in _batches(rows, batch_size):
+            # Core insert on the Table -> one executemany, no ORM objects
+            db.session.execute(table.insert(), batch)
+            total += len(batch)
+            pending += len(batch)
+            if pending >= commit_every:
+                db.session.commit()
+                pending = 0
+        return total
+
+    counts = {}
+
+    # ---- users ----
+    first_user = _next_id(User)
+    roles = [("student", users), ("reviewer", reviewers), ("committee", committee), ("admin", admins)]
+    role_ids = {}
+    emails = {}
+
+    def user_rows():
+        uid = first_user
+        for role, n in roles:
+            ids = role_ids.setdefault(role, [])
+            for _ in range(n):
+                email = f"{role}{uid}.{tag}@seed.example.com"
+                emails.setdefault(role, email)
+                ids.append(uid)
+                yield {
+                    "id": uid, "username": f"{role}{uid}_{tag}", "email": email,
+                    "your_id": f"S{tag[-6:]}{uid:08d}"[:20], "password": pw_hash,
+                    "role": role, "created_at": now - timedelta(days=rng.randint(0, 365)),
+                }
+                uid += 1
+
+    counts["users"] = write(User, user_rows())
+    echo(f"users: {counts['users']}")
+
+    # fall back to existing accounts when a role was not seeded this run
+    student_ids = role_ids.get("student") or [
+        u for (u,) in db.session.query(User.id).filter(User.role == "student").all()
+    ]
+    reviewer_ids = role_ids.get("reviewer") or [
+        u for (u,) in db.session.query(User.id).filter(User.role == "reviewer").all()
+    ]
+    if (applications or logs) and not student_ids:
+        raise click.UsageError("no student accounts to attach applications/logs to")
+
+    # ---- scholarships ----
+    first_sch = _next_id(Scholarship)
+    sch_ids = list(range(first_sch, first_sch + scholarships))
+    counts["scholarships"] = write(Scholarship, ({
+        "id": sid, "title": f"Seed Scholarship {sid}",
+        "description": "Synthetic scholarship for load testing.",
+        "eligibility_criteria": fake_eligibility(rng),
+        "application_deadline": now + timedelta(days=rng.randint(-30, 60)),
+        "created_at": now - timedelta(days=rng.randint(30, 400)),
+        "documents_required": "IC, Transcript, Income proof",
+    } for sid in sch_ids))
+    echo(f"scholarships: {counts['scholarships']}")
+
+    if not sch_ids:
+        sch_ids = [s for (s,) in db.session.query(Scholarship.id).all()]
+    if applications and not sch_ids:
+        raise click.UsageError("no scholarships to attach applications to")
+
+    # ---- applications + reviews (generated together, written separately) ----
+    first_app = _next_id(Application)
+    first_review = _next_id(Review)
+    review_id = first_review
+
+    app_batch, review_batch = [], []
+    counts["applications"] = counts["reviews"] = 0
+    for app_id in range(first_app, first_app + applications):
+        submitted = now - timedelta(minutes=rng.randint(0, 60 * 24 * 120))
+        app_batch.append({
+            "id": app_id, "student_id": rng.choice(student_ids), "scholarship_id": rng.choice(sch_ids),
+            "documents": f"uploads/seed_{app_id}_transcript.pdf,uploads/seed_{app_id}_income.pdf",
+            "status": rng.choice(APPLICATION_STATUSES), "submitted_at": submitted,
+            "form_data": fake_form_data(rng, app_id), "version": 1,
+        })
+        for rid in rng.sample(reviewer_ids, min(reviews_per_app, len(reviewer_ids))):
+            decided = rng.random() < 0.8
+            review_batch.append({
+                "id": review_id, "application_id": app_id, "reviewer_id": rid,
+                "score": rng.randint(20, 100) if decided else None,
+                "decision": rng.choice(REVIEW_DECISIONS) if decided else None,
+                "comment": "Synthetic review." if decided else None,
+                "submitted_at": submitted,
+                "reviewed_at": submitted + timedelta(hours=rng.randint(1, 24 * 14)),
+                "version": 1,
+            })
+            review_id += 1
+
+        if len(app_batch) >= batch_size:
+            counts["applications"] += write(Application, app_batch)
+            counts["reviews"] += write(Review, review_batch)
+            app_batch, review_batch = [], []
+            echo(f"applications: {counts['applications']}")
+
+    counts["applications"] += write(Application, app_batch)
+    counts["reviews"] += write(Review, review_batch)
+    echo(f"applications: {counts['applications']}, reviews: {counts['reviews']}")
+
+    # ---- system logs ----
+    counts["logs"] = write(SystemLog, ({
+        "level": rng.choice(["info", "info", "info", "warning", "error"]),
+        "action": rng.choice(["LOGIN", "APPLY", "REVIEW", "CREATE_USER", "committee_decision"]),
+        "message": f"Synthetic log {i}", "user_id": rng.choice(student_ids),
+        "created_at": now - timedelta(seconds=i * 7),
+    } for i in range(logs)))
+    echo(f"logs: {counts['logs']}")
+
+    db.session.commit()
+
+    # Core inserts skip the ORM hooks that keep the report rollups and rankings current
+    rebuild_rollups()
+    echo("report rollups rebuilt")
+    echo(f"rankings built: {refresh_stale_rankings()}")
+    return {"emails": emails, "counts": counts}
+
+
+# =========================
+# CLI
+# =========================
+@click.command("seed-data")
+@click.option("--users", default=1000, show_default=True, help="student accounts")
+@click.option("--reviewers", default=50, show_default=True)
+@click.option("--committee", default=5, show_default=True)
+@click.option("--admins", default=1, show_default=True)
+@click.option("--scholarships", default=20, show_default=True)
+@click.option("--applications", default=5000, show_default=True)
+@click.option("--reviews-per-app", default=3, show_default=True)
+@click.option("--logs", default=10000, show_default=True)
+@click.option("--batch-size", default=10000, show_default=True, help="rows per executemany")
+@click.option("--commit-every", default=200000, show_default=True, help="rows per transaction")
+@click.option("--seed", type=int, default=None, help="random seed for reproducible data")
+@click.option("--password", default=DEFAULT_PASSWORD, show_default=True, help="password of every seeded account")
+@with_appcontext
+def seed_data_command(**opts):
+    """Bulk-generate synthetic users, scholarships, applications, reviews and logs."""
+    t0 = time.perf_counter()
+    result = seed_database(echo=click.echo, **opts)
+    elapsed = time.perf_counter() - t0
+
+    click.echo(f"\n✅ seeded {result['counts']} in {elapsed:.1f}s "
+               f"into {current_app.config['SQLALCHEMY_DATABASE_URI']}")
+    for role, email in result["emails"].items():
+        click.echo(f"   {role:10} login: {email} / {opts['password']}")
+
+
+def init_seed_cli(app) -> None:
+    app.cli.add_command(seed_data_command)
@@ -0,0 +1,46 @@
+"""
+Production serving helpers (see wsgi.py and gunicorn.conf.py).
+
+With a preloading prefork server the app is created once in the master:
+database discovery, create_all/upgrade_schema and the blueprint imports run a
+single time and the workers share those pages copy-on-write. What must NOT be
+shared is live state: pooled database connections (a SQLite or PostgreSQL
+connection used from two processes corrupts its protocol state), locks that
+another thread may have held at fork time, and background threads, which do
+not exist in the child at all. reset_after_fork() handles those in each
+worker, right after the fork.
+"""
+from app.extensions import db
+
+
+# app.extensions keys whose objects implement after_fork()
+FORK_AWARE_EXTENSIONS = ("read_replica", "audit_writer", "live_bus", "scheduler")
+
+
+def reset_after_fork(app) -> None:
+    """Call in every worker process right after it was forked from the master."""
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False: leave the master's sockets/files alone, just forget them
+            engine.dispose(close=False)
+
+    for key in FORK_AWARE_EXTENSIONS:
+        ext = app.extensions.get(key)
+        if ext is not None and hasattr(ext, "after_fork"):
+            ext.after_fork()
+
+
+def prepare_for_fork(app) -> None:
+    """Call in the master before forking: nothing buffered or pooled is inherited."""
+    writer = app.extensions.get("audit_writer")
+    if writer is not None:
+        writer.flush()
+
+    # let a running job finish here; the workers start their own schedulers
+    scheduler = app.extensions.get("scheduler")
+    if scheduler is not None:
+        scheduler.stop()
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
@@ -0,0 +1,354 @@
+"""
+Columnar analytics snapshots: `flask export-snapshot`.
+
+Writes Application (form_data flattened into columns), Review, Scholarship
+and User into Parquet (default) or Arrow IPC files under
+instance/snapshots/<table>/, so analysts can work from compressed columnar
+files instead of scraping admin pages or querying the live database:
+
+    flask --app run:create_app export-snapshot            # incremental
+    flask --app run:create_app export-snapshot --full     # start over
+
+Rows are read with yield_per and written record batch by record batch, so
+memory stays flat whatever the table size.
+
+Incremental runs append a new part file per table with only the rows past
+the previous watermark (application.submitted_at, review.reviewed_at). The
+watermark is a (timestamp, id) keyset, so rows sharing the newest timestamp
+are not lost; rows whose timestamp is NULL are tracked by id alone.
+scholarship and user are small and rewritten whole. A re-submitted review
+gets a newer reviewed_at and so appears again in a later part: readers keep
+the row from the newest part per id. Status changes of older applications
+are only picked up by --full.
+
+pyarrow is optional (pip install pyarrow); it is only imported here.
+
+    import pyarrow.dataset as ds
+    ds.dataset("instance/snapshots/application", format="parquet").to_table()
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, or_
+
+from app.extensions import db
+from app.models import User, Scholarship, Application, Review
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = pq = None
+
+
+DEFAULT_CHUNK_SIZE = 5000
+STATE_FILE = "state.json"
+
+# form_data keys written by student_routes.apply
+FORM_TEXT_FIELDS = (
+    "full_name", "address", "ic_number", "dob", "intake", "programme", "course",
+    "nationality", "race", "sex", "contact", "home_contact", "email",
+    "school_name", "qualification", "statement",
+)
+FORM_LIST_FIELDS = (
+    "family_name", "relationship", "family_age", "occupation", "family_income",
+    "activity_type", "level", "year", "achievement",
+)
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise click.ClickException("pyarrow is not installed: pip install pyarrow")
+
+
+def snapshot_dir() -> str:
+    return current_app.config.get("SNAPSHOT_DIR") or os.path.join(current_app.instance_path, "snapshots")
+
+
+def _number(value, cast=float):
+    try:
+        return cast(str(value).replace(",", "").strip())
+    except (TypeError, ValueError):
+        return None
+
+
+# =========================
+# TABLE DEFINITIONS
+# =========================
+def _application_schema():
+    fields = [
+        ("id", pa.int64()), ("student_id", pa.int64()), ("scholarship_id", pa.int64()),
+        ("reviewer_id", pa.int64()), ("status", pa.string()),
+        ("submitted_at", pa.timestamp("us")), ("version", pa.int64()),
+        ("document_count", pa.int32()),
+        ("age", pa.int32()), ("household_income", pa.float64()),
+        ("family_size", pa.int32()), ("family_income_total", pa.float64()),
+    ]
+    fields += [(f"form_{name}", pa.string()) for name in FORM_TEXT_FIELDS]
+    fields += [(f"form_{name}", pa.list_(pa.string())) for name in FORM_LIST_FIELDS]
+    return pa.schema(fields)
+
+
+def _application_row(a):
+    form = a.form_data if isinstance(a.form_data, dict) else {}
+    family_incomes = [_number(v) for v in form.get("family_income") or []]
+    row = {
+        "id": a.id, "student_id": a.student_id, "scholarship_id": a.scholarship_id,
+        "reviewer_id": a.reviewer_id, "status": a.status, "submitted_at": a.submitted_at,
+        "version": a.version,
+        "document_count": len([d for d in (a.documents or "").split(",") if d]),
+        "age": _number(form.get("age"), int),
+        "household_income": _number(form.get("household_income")),
+        "family_size": len(form.get("family_name") or []),
+        "family_income_total": sum(v for v in family_incomes if v is not None) if family_incomes else None,
+    }
+    for name in FORM_TEXT_FIELDS:
+        value = form.get(name)
+        row[f"form_{name}"] = None if value is None else str(value)
+    for name in FORM_LIST_FIELDS:
+        row[f"form_{name}"] = [str(v) for v in form.get(name) or []]
+    return row
+
+
+def _review_schema():
+    return pa.schema([
+        ("id", pa.int64()), ("application_id", pa.int64()), ("reviewer_id", pa.int64()),
+        ("score", pa.int32()), ("decision", pa.string()), ("comment", pa.string()),
+        ("submitted_at", pa.timestamp("us")), ("reviewed_at", pa.timestamp("us")),
+        ("version", pa.int64()),
+    ])
+
+
+def _review_row(r):
+    return {
+        "id": r.id, "application_id": r.application_id, "reviewer_id": r.reviewer_id,
+        "score": r.score, "decision": r.decision, "comment": r.comment,
+        "submitted_at": r.submitted_at, "reviewed_at": r.reviewed_at, "version": r.version,
+    }
+
+
+def _scholarship_schema():
+    return pa.schema([
+        ("id", pa.int64()), ("title", pa.string()),
+        ("application_deadline", pa.timestamp("us")), ("created_at", pa.timestamp("us")),
+        ("min_cgpa", pa.float64()), ("max_income", pa.float64()),
+        ("eligibility_criteria", pa.string()), ("documents_required", pa.string()),
+    ])
+
+
+def _scholarship_row(s):
+    criteria = s.eligibility_criteria if isinstance(s.eligibility_criteria, dict) else {}
+    return {
+        "id": s.id, "title": s.title,
+        "application_deadline": s.application_deadline, "created_at": s.created_at,
+        "min_cgpa": _number(criteria.get("min_cgpa")), "max_income": _number(criteria.get("max_income")),
+        "eligibility_criteria": json.dumps(s.eligibility_criteria) if s.eligibility_criteria is not None else None,
+        "documents_required": s.documents_required,
+    }
+
+
+def _user_schema():
+    # no password hash, email or IC-style ids in analytics files
+    return pa.schema([
+        ("id", pa.int64()), ("username", pa.string()), ("role", pa.string()),
+        ("created_at", pa.timestamp("us")),
+    ])
+
+
+def _user_row(u):
+    return {"id": u.id, "username": u.username, "role": u.role, "created_at": u.created_at}
+
+
+# name -> (model, schema factory, row function, watermark column or None)
+TABLES = {
+    "application": (Application, _application_schema, _application_row, Application.submitted_at),
+    "review": (Review, _review_schema, _review_row, Review.reviewed_at),
+    "scholarship": (Scholarship, _scholarship_schema, _scholarship_row, None),
+    "user": (User, _user_schema, _user_row, None),
+}
+
+
+# =========================
+# WRITING
+# =========================
+class _BatchWriter:
+    """Parquet or Arrow IPC file written one record batch at a time."""
+
+    def __init__(self, path, schema, fmt, compression):
+        self.schema = schema
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(path, schema, compression=compression)
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=None if compression == "none" else compression)
+            self._sink = pa.OSFile(path, "wb")
+            self._writer = pa.ipc.new_file(self._sink, schema, options=options)
+        self.fmt = fmt
+
+    def write(self, rows):
+        columns = {name: [row[name] for row in rows] for name in self.schema.names}
+        self._writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+        if self.fmt != "parquet":
+            self._sink.close()
+
+
+def _since_filter(model, watermark, since):
+    """Rows past the keyset watermark {"at", "id", "null_id"}."""
+    past = watermark.isnot(None)
+    if since.get("at") is not None:
+        at = datetime.fromisoformat(since["at"])
+        past = and_(past, or_(watermark > at, and_(watermark == at, model.id > since.get("id", 0))))
+    return or_(past, and_(watermark.is_(None), model.id > since.get("null_id", 0)))
+
+
+def _advance(since, obj, watermark):
+    value = getattr(obj, watermark.key)
+    if value is None:
+        since["null_id"] = max(since.get("null_id", 0), obj.id)
+        return
+    current = since.get("at")
+    current = datetime.fromisoformat(current) if current else None
+    if current is None or (value, obj.id) > (current, since.get("id", 0)):
+        since["at"] = value.isoformat()
+        since["id"] = obj.id
+
+
+def export_table(name, folder, since=None, fmt="parquet", compression="zstd",
+                 chunk_size=DEFAULT_CHUNK_SIZE, part=None):
+    """
+    Stream one table into folder/<name>/<part>.<ext>. For incremental tables
+    only rows past the `since` keyset ({"at", "id", "null_id"}) are written.
+    Returns (rows written, the advanced keyset or None).
+    """
+    model, schema_factory, to_row, watermark = TABLES[name]
+    schema = schema_factory()
+    table_dir = os.path.join(folder, name)
+    os.makedirs(table_dir, exist_ok=True)
+
+    query = model.query.order_by(model.id)
+    if watermark is not None and since:
+        query = query.filter(_since_filter(model, watermark, since))
+    query = query.yield_per(chunk_size)
+
+    ext = "parquet" if fmt == "parquet" else "arrow"
+    path = os.path.join(table_dir, f"{part or 'full'}.{ext}")
+    tmp = path + ".tmp"
+
+    written = 0
+    newest = dict(since or {}) if watermark is not None else None
+    writer = _BatchWriter(tmp, schema, fmt, compression)
+    try:
+        batch = []
+        for obj in query:
+            batch.append(to_row(obj))
+            if watermark is not None:
+                _advance(newest, obj, watermark)
+            if len(batch) >= chunk_size:
+                writer.write(batch)
+                written += len(batch)
+                batch = []
+                # ORM objects of the finished chunk are not needed anymore
+                db.session.expunge_all()
+        if batch:
+            writer.write(batch)
+            written += len(batch)
+    finally:
+        writer.close()
+
+    if written or watermark is None:
+        os.replace(tmp, path)
+    else:
+        os.remove(tmp)
+    return written, newest
+
+
+def _load_state(folder):
+    try:
+        with open(os.path.join(folder, STATE_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(folder, state):
+    tmp = os.path.join(folder, STATE_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(folder, STATE_FILE))
+
+
+def export_snapshot(folder=None, full=False, tables=None, fmt="parquet", compression="zstd",
+                    chunk_size=DEFAULT_CHUNK_SIZE, echo=None):
+    """Write one (incremental or full) snapshot. Returns {table: rows written}."""
+    _require_pyarrow()
+    echo = echo or (lambda msg: None)
+    folder = folder or snapshot_dir()
+    tables = tables or list(TABLES)
+
+    if full:
+        for name in tables:
+            shutil.rmtree(os.path.join(folder, name), ignore_errors=True)
+    os.makedirs(folder, exist_ok=True)
+
+    state = _load_state(folder)
+    watermarks = state.get("watermarks", {})
+    if full:
+        for name in tables:
+            watermarks.pop(name, None)
+    elif state.get("format", fmt) != fmt:
+        raise click.ClickException(f"existing snapshot is {state['format']}; use --full to switch format")
+
+    part = datetime.utcnow().strftime("part-%Y%m%dT%H%M%S")
+    counts = {}
+    for name in tables:
+        since = watermarks.get(name)
+        if isinstance(since, str):
+            # state written before the keyset: only a timestamp
+            since = {"at": since, "id": 0}
+        written, newest = export_table(
+            name, folder, since=since, fmt=fmt, compression=compression,
+            chunk_size=chunk_size, part=part if TABLES[name][3] is not None else None,
+        )
+        if newest:
+            watermarks[name] = newest
+        counts[name] = written
+        echo(f"{name}: {written} rows")
+
+    _save_state(folder, {
+        "format": fmt,
+        "watermarks": watermarks,
+        "last_run": datetime.utcnow().isoformat(),
+        "last_counts": counts,
+    })
+    return counts
+
+
+# =========================
+# CLI
+# =========================
+@click.command("export-snapshot")
+@click.option("--out", default=None, help="snapshot folder (default: instance/snapshots)")
+@click.option("--full", is_flag=True, help="drop previous parts and export everything")
+@click.option("--table", "tables", multiple=True, type=click.Choice(list(TABLES)), help="limit to these tables")
+@click.option("--format", "fmt", type=click.Choice(["parquet", "arrow"]), default="parquet", show_default=True)
+@click.option("--compression", default="zstd", show_default=True, help="zstd, snappy, gzip, lz4 or none")
+@click.option("--chunk-size", default=DEFAULT_CHUNK_SIZE, show_default=True, help="rows per yield_per chunk / record batch")
+@with_appcontext
+def export_snapshot_command(out, full, tables, fmt, compression, chunk_size):
+    """Export Application/Review/Scholarship/User into columnar snapshot files."""
+    counts = export_snapshot(
+        folder=out, full=full, tables=list(tables) or None, fmt=fmt,
+        compression=compression, chunk_size=chunk_size, echo=click.echo,
+    )
+    click.echo(f"✅ snapshot written to {out or snapshot_dir()} ({sum(counts.values())} rows)")
+
+
+def init_snapshot_cli(app) -> None:
+    app.cli.add_command(export_snapshot_command)
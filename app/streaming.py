@@ -0,0 +1,120 @@
+"""
+Streamed HTML for large listing pages, plus gzip of dynamic responses.
+
+stream_page() renders a template chunk by chunk while rows are still being
+fetched (batched_rows: the query runs immediately, rows arrive yield_per at a
+time), so the first bytes leave right away and a request never holds the
+whole table or the whole HTML in memory. Listing queries select plain
+columns, not ORM entities, so the session's identity map does not fill up
+either.
+
+Anything that touches the session cookie (flashed messages, the CSRF token)
+must happen before streaming starts, because headers are already sent by
+then: stream_page() pops the flashed messages up front, and views render
+form tokens into strings before calling it.
+
+init_streaming() registers the gzip after_request hook: text responses are
+compressed when the client accepts gzip; streamed bodies are compressed
+chunk by chunk with a sync flush so each chunk still reaches the browser
+immediately.
+"""
+import zlib
+
+from flask import Response, current_app, get_flashed_messages, request, stream_template
+
+
+DEFAULT_BATCH_SIZE = 500
+CHUNK_BYTES = 8192
+
+GZIP_MIMETYPES = {
+    "text/html", "text/plain", "text/css", "text/csv", "text/xml",
+    "application/json", "application/javascript", "application/xml", "image/svg+xml",
+}
+
+
+# =========================
+# STREAMED RENDERING
+# =========================
+def batched_rows(query, batch_size=None):
+    """Run the query now; fetch its rows lazily, batch_size at a time."""
+    batch_size = batch_size or current_app.config.get("STREAM_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+    return iter(query.execution_options(yield_per=batch_size))
+
+
+def _coalesce(chunks, size=CHUNK_BYTES):
+    """Jinja yields tiny pieces; send them in ~size chunks."""
+    buf, length = [], 0
+    for chunk in chunks:
+        buf.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(buf)
+            buf, length = [], 0
+    if buf:
+        yield "".join(buf)
+
+
+def stream_page(template_name, **context):
+    """Streamed equivalent of render_template (for pages with long row iterators)."""
+    # pop flashes now: the session cookie cannot change once streaming starts
+    get_flashed_messages(with_categories=True)
+    return Response(_coalesce(stream_template(template_name, **context)), mimetype="text/html")
+
+
+# =========================
+# GZIP
+# =========================
+def _gzip_stream(chunks, original, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            # sync flush keeps streaming pages streaming
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        if hasattr(original, "close"):
+            original.close()
+
+
+def gzip_response(response):
+    cfg = current_app.config
+    if not cfg.get("RESPONSE_GZIP", True):
+        return response
+    if (
+        response.direct_passthrough
+        or response.status_code < 200
+        or response.status_code in (204, 304)
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in GZIP_MIMETYPES
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    if "gzip" not in request.headers.get("Accept-Encoding", "").lower():
+        return response
+
+    level = cfg.get("RESPONSE_GZIP_LEVEL", 6)
+    if response.is_streamed:
+        # bind the original body now, before response.response is replaced
+        response.response = _gzip_stream(response.iter_encoded(), response.response, level)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < cfg.get("RESPONSE_GZIP_MIN_BYTES", 1024):
+            return response
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        response.set_data(compressor.compress(data) + compressor.flush())
+
+    response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+def init_streaming(app) -> None:
+    app.config.setdefault("RESPONSE_GZIP", True)
+    app.config.setdefault("RESPONSE_GZIP_LEVEL", 6)
+    app.config.setdefault("RESPONSE_GZIP_MIN_BYTES", 1024)
+    app.config.setdefault("STREAM_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+    app.after_request(gzip_response)
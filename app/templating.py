@@ -0,0 +1,160 @@
+"""
+Jinja bytecode cache, template precompilation and a startup template check.
+
+Compiling a template (parse -> Python source -> code object) is the slow part
+of its first render, and every worker process used to do it again for every
+template after each start. With the bytecode cache the compiled code objects
+are stored under instance/jinja_cache/ and reused by every process; a
+template's cache entry is keyed by its source checksum, so editing a template
+simply produces a new entry.
+
+    flask --app run:create_app compile-templates     # deploy step: fill the cache
+
+compile-templates compiles every template (syntax errors fail the command)
+and then runs the target check below.
+
+TEMPLATE_PRELOAD=1 (set by gunicorn.conf.py) loads every template in
+create_app, i.e. in the preloading master, so forked workers start with all
+templates already in Jinja's in-memory cache: the first request of a worker
+is as fast as the later ones.
+
+Startup check: every literal template name passed to render_template /
+stream_template / stream_page in the blueprint modules, and every
+{% extends %} / {% include %} / {% import %} in the templates, must exist.
+Missing ones are printed at startup instead of surfacing as a 500 on the
+first request that hits them.
+"""
+import ast
+import inspect
+import os
+import sys
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from jinja2 import FileSystemBytecodeCache, TemplateSyntaxError, meta
+
+
+CACHE_DIR = "jinja_cache"
+RENDER_FUNCTIONS = {"render_template", "stream_template", "stream_page"}
+
+
+def cache_dir(app=None) -> str:
+    app = app or current_app
+    return app.config.get("TEMPLATE_CACHE_DIR") or os.path.join(app.instance_path, CACHE_DIR)
+
+
+# =========================
+# PRECOMPILE
+# =========================
+def compile_templates(app) -> list:
+    """Load (compile + cache) every template. Returns [(name, error message)]."""
+    errors = []
+    for name in app.jinja_env.list_templates():
+        try:
+            app.jinja_env.get_template(name)
+        except TemplateSyntaxError as e:
+            errors.append((name, f"line {e.lineno}: {e.message}"))
+    return errors
+
+
+# =========================
+# TARGET CHECK
+# =========================
+def _rendered_names(source: str):
+    """(lineno, name) of literal first arguments of render calls in Python source."""
+    for node in ast.walk(ast.parse(source)):
+        if not isinstance(node, ast.Call) or not node.args:
+            continue
+        func = node.func
+        called = func.id if isinstance(func, ast.Name) else getattr(func, "attr", None)
+        first = node.args[0]
+        if called in RENDER_FUNCTIONS and isinstance(first, ast.Constant) and isinstance(first.value, str):
+            yield node.lineno, first.value
+
+
+def _referenced_names(env, name):
+    """Templates a template extends / includes / imports (literal names only)."""
+    source = env.loader.get_source(env, name)[0]
+    for ref in meta.find_referenced_templates(env.parse(source)):
+        if ref is not None:
+            yield ref
+
+
+def missing_templates(app) -> list:
+    """[(where, template name)] of every render target that does not exist."""
+    env = app.jinja_env
+    available = set(env.list_templates())
+    missing = []
+
+    modules = {bp.import_name for bp in app.blueprints.values()}
+    for module_name in sorted(modules):
+        module = sys.modules.get(module_name)
+        path = module and inspect.getsourcefile(module)
+        if not path:
+            continue
+        with open(path, encoding="utf-8") as f:
+            source = f.read()
+        for lineno, name in _rendered_names(source):
+            if name not in available:
+                missing.append((f"{os.path.relpath(path)}:{lineno}", name))
+
+    for template in sorted(available):
+        try:
+            refs = list(_referenced_names(env, template))
+        except TemplateSyntaxError:
+            continue  # reported by compile_templates
+        for ref in refs:
+            if ref not in available:
+                missing.append((template, ref))
+    return missing
+
+
+def check_templates(app) -> list:
+    missing = missing_templates(app)
+    for where, name in missing:
+        print("   ", f"⚠️  missing template {name!r} (used in {where})")
+    return missing
+
+
+# =========================
+# CLI
+# =========================
+@click.command("compile-templates")
+@with_appcontext
+def compile_templates_command():
+    """Compile every template into the bytecode cache and check render targets."""
+    app = current_app._get_current_object()
+    errors = compile_templates(app)
+    for name, message in errors:
+        click.echo(f"❌ {name}: {message}")
+
+    missing = missing_templates(app)
+    for where, name in missing:
+        click.echo(f"❌ missing template {name!r} (used in {where})")
+
+    if errors or missing:
+        raise SystemExit(1)
+    click.echo(f"✅ {len(app.jinja_env.list_templates())} templates compiled into {cache_dir(app)}")
+
+
+def init_templating(app) -> None:
+    app.config.setdefault("TEMPLATE_BYTECODE_CACHE", os.environ.get("TEMPLATE_BYTECODE_CACHE", "1") == "1")
+    app.config.setdefault("TEMPLATE_PRELOAD", os.environ.get("TEMPLATE_PRELOAD", "0") == "1")
+    app.config.setdefault("TEMPLATE_CHECK", os.environ.get("TEMPLATE_CHECK", "1") == "1")
+
+    if app.config["TEMPLATE_BYTECODE_CACHE"]:
+        folder = cache_dir(app)
+        os.makedirs(folder, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(folder)
+
+    app.cli.add_command(compile_templates_command)
+
+
+def warm_templates(app) -> None:
+    """Startup: preload templates (TEMPLATE_PRELOAD) and check render targets (TEMPLATE_CHECK)."""
+    if app.config.get("TEMPLATE_PRELOAD"):
+        for name, message in compile_templates(app):
+            print("   ", f"⚠️  template {name}: {message}")
+    if app.config.get("TEMPLATE_CHECK"):
+        check_templates(app)
@@ -0,0 +1,192 @@
+"""
+Throughput of the production server (gunicorn.conf.py) as workers are added.
+
+Seeds a throw-away SQLite database, then for each worker count starts
+`gunicorn -c gunicorn.conf.py wsgi:app` on it, logs in, and drives the
+server from several load-generator processes (keep-alive HTTP/1.1) for a
+fixed time. Reported per worker count:
+
+  requests/s, p50 / p95 latency, speed-up vs 1 worker, error count
+
+Usage (from the project root, gunicorn installed):
+
+    python benchmarks/bench_server.py                         # 1, 2, 4 .. cores
+    python benchmarks/bench_server.py --workers 1 2 4 8 --duration 20
+    python benchmarks/bench_server.py --path /committee/applications --role committee
+
+Methodology notes:
+  - the load generator runs on the same machine; give it enough processes
+    (--clients, default 2 x cores) and read the results as relative scaling
+  - threads per worker are pinned to 1 (WEB_THREADS) so the numbers show
+    process scaling only
+  - the default path is a read-only, database-backed page
+  - SQLite serializes writers: write-heavy paths will not scale like reads
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BENCH_PASSWORD = "bench-pass1"
+
+
+# =========================
+# SERVER
+# =========================
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers, port, env, workdir):
+    env = dict(env, WEB_CONCURRENCY=str(workers), WEB_THREADS="1",
+               WEB_BIND=f"127.0.0.1:{port}", WEB_PIDFILE=os.path.join(workdir, "gunicorn.pid"),
+               WEB_MAX_REQUESTS="0")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            conn.request("GET", "/healthz")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise SystemExit(f"server with {workers} workers did not come up")
+
+
+def stop_server(proc):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def login_cookie(port, email):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    conn.request("POST", "/auth/login", body=urlencode({"email": email, "password": BENCH_PASSWORD}),
+                 headers={"Content-Type": "application/x-www-form-urlencoded"})
+    resp = conn.getresponse()
+    resp.read()
+    cookies = [v.split(";", 1)[0] for k, v in resp.getheaders() if k.lower() == "set-cookie"]
+    return "; ".join(cookies)
+
+
+# =========================
+# LOAD GENERATOR
+# =========================
+def client_loop(args):
+    port, path, cookie, duration = args
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    headers = {"Cookie": cookie} if cookie else {}
+    latencies, errors = [], 0
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        t0 = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status >= 400:
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - t0)
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.close()
+    return latencies, errors
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+
+def measure(port, path, cookie, clients, duration):
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.map(client_loop, [(port, path, cookie, duration)] * clients)
+    latencies = [lat for lats, _ in results for lat in lats]
+    return {
+        "rps": len(latencies) / duration,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "errors": sum(e for _, e in results),
+    }
+
+
+# =========================
+# MAIN
+# =========================
+def parse_args(argv=None):
+    cores = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, cores} & set(range(1, cores + 1))) or [1]
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    p.add_argument("--clients", type=int, default=2 * cores, help="load generator processes")
+    p.add_argument("--duration", type=float, default=10.0, help="seconds per worker count")
+    p.add_argument("--path", default="/committee/applications")
+    p.add_argument("--role", default="committee", help="account used to log in (empty = anonymous)")
+    p.add_argument("--applications", type=int, default=2000)
+    p.add_argument("--seed", type=int, default=42)
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    opts = parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="scholarship-server-bench-")
+    env = dict(os.environ, DATABASE_URL="sqlite:///" + os.path.join(workdir, "bench.db"),
+               SQLITE_PROFILE="production")
+    os.environ.update(env)
+
+    try:
+        from run import create_app
+        from app.seed import seed_database
+
+        app = create_app()
+        with app.app_context():
+            emails = seed_database(users=500, reviewers=20, committee=2, admins=1, scholarships=20,
+                                   applications=opts.applications, logs=1000, seed=opts.seed,
+                                   password=BENCH_PASSWORD)["emails"]
+
+        print(f"{'workers':>8} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'speed-up':>9} {'errors':>7}")
+        base = None
+        for n in opts.workers:
+            port = free_port()
+            proc = start_server(n, port, env, workdir)
+            try:
+                cookie = login_cookie(port, emails[opts.role]) if opts.role else ""
+                r = measure(port, opts.path, cookie, opts.clients, opts.duration)
+            finally:
+                stop_server(proc)
+            base = base or r["rps"] or 1.0
+            print(f"{n:>8} {r['rps']:>10.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+                  f"{r['rps'] / base:>8.2f}x {r['errors']:>7}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
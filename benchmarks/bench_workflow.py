@@ -0,0 +1,304 @@
+"""
+Benchmark of the scholarship workflow.
+
+Seeds a throw-away SQLite database with synthetic data, then drives the real
+Flask app through the test client over the hot flows (login, student
+scholarships/apply, reviewer dashboard, committee applications with every
+sort/filter, admin applications/reports) and reports per flow:
+
+  p50 / p95 / p99 latency, SQL queries per request, peak Python memory
+
+Every response is checked against the status (and redirect target) the flow
+expects: a redirect to the login page, a 4xx or a 429 from admission control
+is not a fast page. Such responses are left out of the timings, reported in
+the "errors" column and make the run fail.
+
+Usage (from the project root):
+
+    python benchmarks/bench_workflow.py --applications 5000 --iterations 30
+    python benchmarks/bench_workflow.py --save-baseline      # store baseline
+    python benchmarks/bench_workflow.py                      # compare with it
+
+Exit code is 1 when a flow got unexpected responses, is slower than
+baseline * --tolerance or runs more queries than in the baseline.
+"""
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+BENCH_PASSWORD = "bench-pass1"
+
+
+# =========================
+# FLOWS
+# =========================
+def login(client, email):
+    return client.post("/auth/login", data={"email": email, "password": BENCH_PASSWORD})
+
+
+def apply_payload(rng):
+    from app.seed import fake_form_data
+
+    data = {k: v for k, v in fake_form_data(rng, rng.randint(1, 10 ** 6)).items() if not isinstance(v, list)}
+    data["family_name[]"] = ["Bench Parent"]
+    data["photo"] = (io.BytesIO(b"\x89PNG\r\n" + b"0" * 20000), "photo.png")
+    data["academic_doc"] = (io.BytesIO(b"%PDF-1.4\n" + b"0" * 50000), "transcript.pdf")
+    data["income_proof"] = (io.BytesIO(b"%PDF-1.4\n" + b"0" * 50000), "income.pdf")
+    data["cgpa_proof"] = (io.BytesIO(b"%PDF-1.4\n" + b"0" * 50000), "cgpa.pdf")
+    return data
+
+
+# (status, redirect path prefix or None) a flow must answer with
+PAGE = (200, None)
+
+
+def build_flows(clients, emails, opts, rng):
+    """name -> (client, callable(client) -> response, expected (status, location))"""
+    flows = {
+        "login": (clients["anon"], lambda c: login(c, emails["student"]), (302, "/student/dashboard")),
+        "student.scholarships": (clients["student"], lambda c: c.get("/student/scholarships"), PAGE),
+        "student.apply": (clients["student"], lambda c: c.post(
+            f"/student/apply/{rng.randint(1, opts.scholarships)}",
+            data=apply_payload(rng), content_type="multipart/form-data"), (302, "/student/dashboard")),
+        "reviewer.dashboard": (clients["reviewer"], lambda c: c.get("/reviewer/dashboard"), PAGE),
+        "committee.applications": (clients["committee"], lambda c: c.get("/committee/applications"), PAGE),
+        "admin.manage_applications": (clients["admin"], lambda c: c.get("/admin/applications"), PAGE),
+        "admin.reports": (clients["admin"], lambda c: c.get("/admin/reports"), PAGE),
+    }
+    for status in ("Submitted", "Reviewed", "Accepted", "Rejected"):
+        flows[f"committee.applications?status={status}"] = (
+            clients["committee"], lambda c, s=status: c.get(f"/committee/applications?status={s}"), PAGE)
+    flows["committee.applications?fail=1"] = (
+        clients["committee"], lambda c: c.get("/committee/applications?fail=1"), PAGE)
+    for sort in ("avg_score_desc", "avg_score_asc"):
+        flows[f"committee.applications?sort={sort}"] = (
+            clients["committee"], lambda c, s=sort: c.get(f"/committee/applications?sort={s}"), PAGE)
+    return flows
+
+
+def unexpected(resp, expected):
+    """None when the response is what the flow expects, else a short description."""
+    status, location = expected
+    got = resp.headers.get("Location", "")
+    path = urlsplit(got).path
+    if resp.status_code != status:
+        return f"HTTP {resp.status_code}" + (f" -> {path}" if got else "")
+    if location is not None and not path.startswith(location):
+        return f"HTTP {resp.status_code} -> {path or '(no Location)'}"
+    return None
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def call(fn, client):
+    """Run one flow and read the whole body: streamed pages (app.streaming)
+    run most of their queries while the body is produced."""
+    resp = fn(client)
+    resp.get_data()
+    resp.close()
+    return resp
+
+
+def run_flows(flows, counter, iterations, warmup):
+    results = {}
+    for name, (client, fn, expected) in flows.items():
+        for _ in range(warmup):
+            call(fn, client)
+
+        latencies, queries, errors = [], [], {}
+        for _ in range(iterations):
+            before = counter.count
+            t0 = time.perf_counter()
+            resp = call(fn, client)
+            elapsed = (time.perf_counter() - t0) * 1000
+            error = unexpected(resp, expected)
+            if error:
+                errors[error] = errors.get(error, 0) + 1
+                continue
+            latencies.append(elapsed)
+            queries.append(counter.count - before)
+        if not latencies:
+            raise SystemExit(f"{name}: no expected response in {iterations} calls: {errors}")
+
+        # one extra call with tracemalloc on, so timings above stay clean
+        tracemalloc.start()
+        call(fn, client)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = {
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "mean_ms": round(statistics.mean(latencies), 3),
+            "queries": round(statistics.mean(queries), 1),
+            "peak_kib": round(peak / 1024, 1),
+            "errors": sum(errors.values()),
+            "error_kinds": errors,
+        }
+    return results
+
+
+# =========================
+# REPORT / BASELINE
+# =========================
+def print_report(results, baseline=None):
+    header = (f"{'flow':45} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'peak KiB':>9} "
+              f"{'errors':>7}")
+    print(header)
+    print("-" * len(header))
+    for name, r in results.items():
+        line = (f"{name:45} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['p99_ms']:9.2f} "
+                f"{r['queries']:8.1f} {r['peak_kib']:9.1f} {r['errors']:7d}")
+        if baseline and name in baseline:
+            b = baseline[name]
+            ratio = r["p95_ms"] / b["p95_ms"] if b["p95_ms"] else 1.0
+            line += f"   p95 x{ratio:.2f} vs baseline"
+        print(line)
+
+
+def failures(results):
+    return [
+        f"{name}: {r['errors']} unexpected responses ("
+        + ", ".join(f"{n} x {kind}" for kind, n in r["error_kinds"].items()) + ")"
+        for name, r in results.items() if r["errors"]
+    ]
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, r in results.items():
+        b = baseline.get(name)
+        if not b:
+            continue
+        if b["p95_ms"] and r["p95_ms"] > b["p95_ms"] * tolerance:
+            regressions.append(f"{name}: p95 {r['p95_ms']:.2f} ms > {b['p95_ms']:.2f} ms x {tolerance}")
+        if r["queries"] > b["queries"]:
+            regressions.append(f"{name}: {r['queries']} queries > {b['queries']}")
+    return regressions
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--users", type=int, default=500, help="student accounts")
+    p.add_argument("--reviewers", type=int, default=20)
+    p.add_argument("--scholarships", type=int, default=20)
+    p.add_argument("--applications", type=int, default=2000)
+    p.add_argument("--reviews-per-app", type=int, default=3)
+    p.add_argument("--logs", type=int, default=5000)
+    p.add_argument("--iterations", type=int, default=20)
+    p.add_argument("--warmup", type=int, default=2)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--baseline", default=DEFAULT_BASELINE)
+    p.add_argument("--save-baseline", action="store_true")
+    p.add_argument("--tolerance", type=float, default=1.25, help="allowed p95 slowdown factor")
+    p.add_argument("--json", help="also write the results to this file")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    opts = parse_args(argv)
+    rng = random.Random(opts.seed)
+
+    workdir = tempfile.mkdtemp(prefix="scholarship-bench-")
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(workdir, "bench.db")
+
+    try:
+        from run import create_app
+        from app.extensions import db
+        from app.seed import seed_database
+        from sqlalchemy import event
+
+        app = create_app()
+        app.config["UPLOAD_FOLDER"] = os.path.join(workdir, "uploads")
+        app.config["METRICS_SLOW_SAMPLE_RATE"] = 0.0
+
+        with app.app_context():
+            t0 = time.perf_counter()
+            emails = seed_database(
+                users=opts.users, reviewers=opts.reviewers, committee=2, admins=1,
+                scholarships=opts.scholarships, applications=opts.applications,
+                reviews_per_app=opts.reviews_per_app, logs=opts.logs,
+                seed=opts.seed, password=BENCH_PASSWORD
+            )["emails"]
+            print(f"seeded in {time.perf_counter() - t0:.1f}s "
+                  f"({opts.users} students, {opts.applications} applications)\n")
+
+            counter = QueryCounter()
+            event.listen(db.engine, "before_cursor_execute", counter)
+
+        clients = {"anon": app.test_client()}
+        for role in ("student", "reviewer", "committee", "admin"):
+            clients[role] = app.test_client()
+            login(clients[role], emails[role])
+
+        results = run_flows(build_flows(clients, emails, opts, rng), counter, opts.iterations, opts.warmup)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = None
+    if os.path.exists(opts.baseline) and not opts.save_baseline:
+        with open(opts.baseline) as f:
+            baseline = json.load(f)
+
+    print_report(results, baseline)
+
+    if opts.json:
+        with open(opts.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = failures(results)
+    if failed:
+        # timings of a run with refused / redirected requests are not comparable
+        print("\nUNEXPECTED RESPONSES:")
+        for f in failed:
+            print("  " + f)
+        return 1
+
+    if opts.save_baseline:
+        with open(opts.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nbaseline saved to {opts.baseline}")
+        return 0
+
+    if baseline:
+        regressions = compare(results, baseline, opts.tolerance)
+        if regressions:
+            print("\nREGRESSIONS:")
+            for r in regressions:
+                print("  " + r)
+            return 1
+        print("\nno regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
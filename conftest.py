@@ -0,0 +1 @@
+# repository root on sys.path, so tests import the app package
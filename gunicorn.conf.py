@@ -0,0 +1,88 @@
+"""
+gunicorn configuration: preforked workers with a preloaded app.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+preload_app = True: wsgi.py (create_app: database discovery, create_all,
+schema upgrades, blueprint imports) runs ONCE in the master and the workers
+are forked from it. post_fork resets the inherited connection pools, locks
+and background threads (app.server.reset_after_fork).
+
+Environment:
+  WEB_BIND            address to listen on          (default 0.0.0.0:8000)
+  WEB_CONCURRENCY     worker processes              (default 2 x CPU cores + 1)
+  WEB_THREADS         threads per worker (gthread)  (default 4)
+  WEB_TIMEOUT         worker timeout in seconds     (default 60)
+  WEB_MAX_REQUESTS    recycle a worker after N requests (default 2000, 0 = never)
+
+Thread budget per worker (WEB_THREADS = T, every share at least 1):
+  apply writes running     T // 4  ADMISSION_APPLY_CONCURRENCY (app/admission.py)
+  apply writes queued      T // 4  ADMISSION_APPLY_QUEUE (they wait in a thread)
+  live dashboard streams   T // 4  LIVE_MAX_STREAMS, at most 16 (app/live_updates.py)
+  everything else          the remaining quarter or more
+Raising WEB_THREADS raises all three limits with it; set them explicitly
+only to shift the split. Requests over a limit get 503 + Retry-After at
+once instead of holding a thread.
+
+Deploy step before (re)starting: `flask --app run:create_app compile-templates`
+fills instance/jinja_cache/, so even the master compiles nothing.
+
+Zero-downtime reload
+--------------------
+Because the code is preloaded in the master, HUP only restarts workers from
+the master's (old) code. To deploy new code without dropping requests:
+
+    kill -USR2 $(cat gunicorn.pid)          # new master + workers on the new code
+                                            # (old pidfile moves to gunicorn.pid.oldbin)
+    kill -WINCH $(cat gunicorn.pid.oldbin)  # old master: stop its workers gracefully
+    kill -QUIT $(cat gunicorn.pid.oldbin)   # old master: exit once they are done
+
+Both generations listen on the same socket during the switch, so no
+connection is refused; in-flight requests get graceful_timeout to finish.
+Worker-only changes (config, leaked memory) just need `kill -HUP`.
+
+Throughput scaling: benchmarks/bench_server.py.
+"""
+import multiprocessing
+import os
+
+# compile every template in the master so forked workers inherit them (app/templating.py)
+os.environ.setdefault("TEMPLATE_PRELOAD", "1")
+# background jobs in the workers: deadlines, digests, rollups (app/scheduler.py)
+os.environ.setdefault("SCHEDULER_ENABLED", "1")
+
+bind = os.environ.get("WEB_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", 4))
+
+preload_app = True
+pidfile = os.environ.get("WEB_PIDFILE", "gunicorn.pid")
+
+timeout = int(os.environ.get("WEB_TIMEOUT", 60))
+graceful_timeout = 30
+keepalive = 5
+
+# recycle workers now and then (jitter so they do not all restart together)
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+
+accesslog = "-"
+errorlog = "-"
+
+
+def _app():
+    # already imported (preloaded) in the master, so this is the same object
+    from wsgi import app
+    return app
+
+
+def pre_fork(server, worker):
+    from app.server import prepare_for_fork
+    prepare_for_fork(_app())
+
+
+def post_fork(server, worker):
+    from app.server import reset_after_fork
+    reset_after_fork(_app())
+    server.log.info("worker %s ready (connections reset after fork)", worker.pid)
@@ -1,14 +1,37 @@
 import os
 import sqlite3
 from flask import Flask
+from app.startup import StartupProfile
 from app.extensions import db, login_manager
-from app.models import User
-
-from app.routes.auth_routes import auth_bp
-from app.routes.student_routes import student_bp
-from app.routes.reviewer_routes import reviewer_bp
-from app.routes.committee_routes import committee_bp
-from app.routes.admin_routes import admin_bp
+from app.schema import upgrade_schema, init_schema_cli
+from app.read_replica import init_read_replica
+from app.metrics import init_metrics
+from app.seed import init_seed_cli
+from app.query_profiler import init_query_profiler_cli
+from app.log_archive import init_log_archive_cli
+from app.audit import init_audit
+from app.report_rollup import init_report_rollup
+from app.snapshot_export import init_snapshot_cli
+from app.assets import init_assets
+from app.streaming import init_streaming
+from app.templating import init_templating, warm_templates
+from app.live_updates import init_live_updates
+from app.notifications import init_notifications
+from app.scheduler import init_scheduler
+from app.resumable_uploads import init_resumable_uploads
+from app.admission import init_admission
+from app.db_backend import configured_database_url, backend_name, postgres_engine_options
+from app.db_profile import is_sqlite_uri, resolve_profile, engine_options, install_pragmas, check_profile, pragma_report
+
+# (module, blueprint attribute, url prefix) - imported inside create_app so
+# importing this module stays cheap (tests, CLI, worker forks)
+BLUEPRINTS = [
+    ("app.routes.auth_routes", "auth_bp", "/auth"),
+    ("app.routes.student_routes", "student_bp", "/student"),
+    ("app.routes.reviewer_routes", "reviewer_bp", "/reviewer"),
+    ("app.routes.committee_routes", "committee_bp", "/committee"),
+    ("app.routes.admin_routes", "admin_bp", "/admin"),
+]
 
 
 def _count_rows(db_file: str) -> int:
@@ -68,7 +91,9 @@ def _find_best_db(project_root: str, instance_db: str) -> str:
 
 
 def create_app():
+    profile = StartupProfile()
     app = Flask(__name__, template_folder="app/templates")
+    app.extensions["startup_profile"] = profile
 
     # =====================
     # BASIC CONFIG
@@ -76,47 +101,115 @@ def create_app():
     app.config["SECRET_KEY"] = "digital-system"
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+    # ranking: z-score normalize each reviewer's scores within a scholarship
+    app.config["RANKING_NORMALIZE"] = os.environ.get("RANKING_NORMALIZE", "0") == "1"
+
+    # SCHEMA_AUTO_CREATE=0: skip create_all at startup, run `flask init-db` instead
+    app.config["SCHEMA_AUTO_CREATE"] = os.environ.get("SCHEMA_AUTO_CREATE", "1") == "1"
+
     # =====================
-    # DATABASE (AUTO PICK)
+    # DATABASE (DATABASE_URL, else AUTO PICK SQLITE)
     # =====================
     os.makedirs(app.instance_path, exist_ok=True)
-    instance_db = os.path.join(app.instance_path, "scholarship.db")
 
-    project_root = os.path.dirname(os.path.abspath(__file__))
-    chosen_db = _find_best_db(project_root, instance_db)
+    database_url = configured_database_url()
+    if database_url:
+        app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+    else:
+        instance_db = os.path.join(app.instance_path, "scholarship.db")
+
+        project_root = os.path.dirname(os.path.abspath(__file__))
+        with profile.phase("database discovery"):
+            chosen_db = _find_best_db(project_root, instance_db)
 
-    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + chosen_db
+        app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + chosen_db
 
-    print("\n==============================")
-    print("✅ USING DATABASE FILE:")
-    print("   ", chosen_db)
-    print("   ", "Application rows =", _count_rows(chosen_db))
-    print("==============================\n")
+        print("\n==============================")
+        print("✅ USING DATABASE FILE:")
+        print("   ", chosen_db)
+        print("   ", "Application rows =", _count_rows(chosen_db))
+        print("==============================\n")
+
+    backend = backend_name(app.config["SQLALCHEMY_DATABASE_URI"])
+
+    # =====================
+    # ENGINE OPTIONS (SQLITE PROFILE / POSTGRES POOL)
+    # =====================
+    app.config.setdefault("SQLITE_PROFILE", os.environ.get("SQLITE_PROFILE", "production"))
+    sqlite_profile = None
+    if is_sqlite_uri(app.config["SQLALCHEMY_DATABASE_URI"]):
+        sqlite_profile = resolve_profile(app.config["SQLITE_PROFILE"], app.config)
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(sqlite_profile)
+    elif backend == "postgresql":
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = postgres_engine_options()
+        print("\n✅ USING DATABASE BACKEND: postgresql\n")
 
     # =====================
     # INIT EXTENSIONS
     # =====================
-    db.init_app(app)
-    login_manager.init_app(app)
+    with profile.phase("init extensions"):
+        db.init_app(app)
+
+        if sqlite_profile:
+            with app.app_context():
+                install_pragmas(db.engine, sqlite_profile["pragmas"])
+
+        init_read_replica(app)
+
+        login_manager.init_app(app)
+        init_metrics(app)
+        init_seed_cli(app)
+        init_query_profiler_cli(app)
+        init_schema_cli(app)
+        init_log_archive_cli(app)
+        init_audit(app)
+        init_report_rollup(app)
+        init_snapshot_cli(app)
+        init_assets(app)
+        init_streaming(app)
+        init_templating(app)
+        init_live_updates(app)
+        init_notifications(app)
+        init_resumable_uploads(app)
+        init_admission(app)
+        init_scheduler(app)
 
     @login_manager.user_loader
     def load_user(user_id):
+        from app.models import User
         return User.query.get(int(user_id))
 
     # =====================
     # REGISTER BLUEPRINTS
     # =====================
-    app.register_blueprint(auth_bp, url_prefix="/auth")
-    app.register_blueprint(student_bp, url_prefix="/student")
-    app.register_blueprint(reviewer_bp, url_prefix="/reviewer")
-    app.register_blueprint(committee_bp, url_prefix="/committee")
-    app.register_blueprint(admin_bp, url_prefix="/admin")
+    for module_name, attr, prefix in BLUEPRINTS:
+        module = profile.import_module(module_name)
+        app.register_blueprint(getattr(module, attr), url_prefix=prefix)
+
+    # =====================
+    # TEMPLATES (preload into the master, check render targets)
+    # =====================
+    with profile.phase("templates"):
+        warm_templates(app)
 
     # =====================
-    # CREATE TABLES (SAFE)
+    # CREATE TABLES (SAFE, unless deferred to `flask init-db`)
     # =====================
     with app.app_context():
-        db.create_all()
+        if app.config["SCHEMA_AUTO_CREATE"]:
+            with profile.phase("create_all + upgrade_schema"):
+                db.create_all()
+                upgrade_schema(db.engine, db.metadata)
+
+        # startup self-check: show the PRAGMAs that are really active
+        if sqlite_profile:
+            with profile.phase("sqlite self-check"):
+                active = pragma_report(db.engine)
+            print("✅ SQLITE PROFILE:", app.config["SQLITE_PROFILE"])
+            for key, value in active.items():
+                print("   ", f"{key} = {value}")
+            for key, wanted, have in check_profile(db.engine, sqlite_profile["pragmas"]):
+                print("   ", f"⚠️  {key}: wanted {wanted}, got {have}")
 
     # =====================
     # HOME ROUTE
@@ -135,6 +228,21 @@ def create_app():
                 return '<script>window.location.href="/admin/dashboard"</script>'
         return '<script>window.location.href="/auth/login"</script>'
 
+    # =====================
+    # HEALTH CHECK (load balancers, zero-downtime reloads)
+    # =====================
+    @app.route("/healthz")
+    def healthz():
+        from sqlalchemy import text
+        try:
+            db.session.execute(text("SELECT 1"))
+        except Exception:
+            return "database unavailable\n", 503, {"Content-Type": "text/plain"}
+        return "ok\n", 200, {"Content-Type": "text/plain"}
+
+    if os.environ.get("STARTUP_PROFILE", "0") == "1":
+        print(profile.report())
+
     return app
 
 
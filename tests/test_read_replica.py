@@ -0,0 +1,68 @@
+import os
+import sqlite3
+import threading
+import time
+from unittest import mock
+
+from app.read_replica import SnapshotReplica
+
+
+def _make_db(path):
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+    con.commit()
+    con.close()
+
+
+def _wait_for_refresh(replica, timeout=5):
+    end = time.monotonic() + timeout
+    while replica._refreshing and time.monotonic() < end:
+        time.sleep(0.01)
+
+
+def test_fresh_snapshot_is_used(tmp_path):
+    primary, snapshot = str(tmp_path / "primary.db"), str(tmp_path / "replica.db")
+    _make_db(primary)
+    _make_db(snapshot)
+    replica = SnapshotReplica(primary, snapshot, max_staleness=60)
+
+    assert replica.engine_for_read() is not None
+
+
+def test_stale_snapshot_reads_primary_while_refreshing(tmp_path):
+    primary, snapshot = str(tmp_path / "primary.db"), str(tmp_path / "replica.db")
+    _make_db(primary)
+    _make_db(snapshot)
+    old = time.time() - 3600
+    os.utime(snapshot, (old, old))
+
+    replica = SnapshotReplica(primary, snapshot, max_staleness=60)
+    release = threading.Event()
+    real_refresh = replica.refresh
+    replica.refresh = lambda: (release.wait(5), real_refresh())
+
+    assert replica.engine_for_read() is None   # stale: primary, refresh started
+    release.set()
+    _wait_for_refresh(replica)
+    assert replica.engine_for_read() is not None
+
+
+def test_failed_refresh_keeps_reading_primary(tmp_path):
+    primary, snapshot = str(tmp_path / "primary.db"), str(tmp_path / "replica.db")
+    _make_db(primary)
+    _make_db(snapshot)
+    old = time.time() - 3600
+    os.utime(snapshot, (old, old))
+
+    logger = mock.Mock()
+    replica = SnapshotReplica(primary, snapshot, max_staleness=60, logger=logger)
+    replica.refresh = mock.Mock(side_effect=sqlite3.OperationalError("disk I/O error"))
+
+    assert replica.engine_for_read() is None
+    _wait_for_refresh(replica)
+    logger.exception.assert_called_once()
+
+    # the stale copy is never served, however long the refresh keeps failing
+    assert replica.engine_for_read() is None
+    _wait_for_refresh(replica)
+    assert replica.refresh.call_count == 2
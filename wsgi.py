@@ -0,0 +1,10 @@
+"""
+WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+run.py's `python run.py` stays the development server (debugger, reloader).
+"""
+from run import create_app
+
+app = create_app()